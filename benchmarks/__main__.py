@@ -0,0 +1,177 @@
+"""Seed a throwaway database and replay a request mix against the app.
+
+    python -m benchmarks run --target asgi --users 20 --notes 200
+    python -m benchmarks run --target uvicorn --workers 4 --mix read
+    python -m benchmarks compare results/a.json results/b.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(url: str, process: subprocess.Popen,
+                      timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited before becoming ready")
+        try:
+            if httpx.get(f"{url}/health").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"uvicorn did not answer on {url} within {timeout}s")
+
+
+async def _run_asgi(users, mix, args):
+    from src.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport,
+                                 base_url="http://bench") as client:
+        return await _replay(client, users, mix, args)
+
+
+async def _replay(client, users, mix, args):
+    from benchmarks.workload import run_workload
+
+    return await run_workload(client, users, mix, args.requests,
+                              args.concurrency, args.seed)
+
+
+def _run_uvicorn(users, mix, args):
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port",
+         str(port), "--workers", str(args.workers), "--log-level", "warning"],
+        env=os.environ.copy())
+    try:
+        _wait_until_ready(url, process)
+
+        async def replay():
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=url,
+                                         limits=limits,
+                                         timeout=60) as client:
+                return await _replay(client, users, mix, args)
+
+        return asyncio.run(replay())
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def run(args) -> None:
+    # Settings are read at import time, so the database path has to be in the
+    # environment before anything under src is imported.
+    workdir = tempfile.mkdtemp(prefix="notes-bench-")
+    os.environ["DB_URL"] = os.path.join(workdir, "bench.sqlite")
+    os.environ.setdefault("BCRYPT_ROUNDS", str(args.bcrypt_rounds))
+    # Virtual users are far above any per-user budget by design.
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    if args.shards:
+        os.environ["DB_SHARDS"] = ",".join(
+            f"shard{index}={os.path.join(workdir, f'shard{index}.sqlite')}"
+            for index in range(args.shards))
+
+    from benchmarks.report import build_meta, format_summary, save_result, summarize
+    from benchmarks.seed import seed_database
+    from benchmarks.workload import parse_mix
+    from src.config.cfg import SETTINGS
+    from src.database.shards import SHARDS
+
+    mix = parse_mix(args.mix)
+    started = time.perf_counter()
+    users = seed_database(os.environ["DB_URL"], args.users, args.notes,
+                          args.seed, shards=SHARDS)
+    print(f"seeded {args.users} users x {args.notes} notes in "
+          f"{time.perf_counter() - started:.1f}s")
+
+    if args.target == "asgi":
+        samples, elapsed = asyncio.run(_run_asgi(users, mix, args))
+    else:
+        samples, elapsed = _run_uvicorn(users, mix, args)
+
+    options = {name: value for name, value in vars(args).items()
+               if name not in ("command", "handler", "output")}
+    options["mix"] = mix
+    settings = {
+        name: getattr(SETTINGS, name)
+        for name in ("DB_MODE", "DB_JOURNAL_MODE", "DB_SYNCHRONOUS",
+                     "CACHE_BACKEND", "BCRYPT_ROUNDS", "HASH_WORKERS",
+                     "RATE_LIMIT_ENABLED", "DB_SHARDS", "GROUP_COMMIT")
+    }
+    result = {
+        "meta": build_meta(args.target, options, settings),
+        "summary": summarize(samples, elapsed),
+    }
+    print(format_summary(result))
+    if args.output:
+        print(f"saved {save_result(result, args.output)}")
+
+
+def compare_results(args) -> None:
+    from benchmarks.report import compare
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    candidate = json.loads(Path(args.candidate).read_text())
+    print(compare(baseline, candidate))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="seed and run a workload")
+    run_parser.add_argument("--target", choices=("asgi", "uvicorn"),
+                            default="asgi")
+    run_parser.add_argument("--users", type=int, default=10)
+    run_parser.add_argument("--notes", type=int, default=100,
+                            help="notes per user")
+    run_parser.add_argument("--requests", type=int, default=2000)
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument("--mix", default="default",
+                            help="named mix or op=weight,... "
+                            "(ops: login, list, get, search, create, update)")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--workers", type=int, default=1,
+                            help="uvicorn workers (uvicorn target only)")
+    run_parser.add_argument("--shards", type=int, default=0,
+                            help="spread notes over this many SQLite files")
+    run_parser.add_argument("--bcrypt-rounds", type=int, default=12,
+                            help="used unless BCRYPT_ROUNDS is already set")
+    run_parser.add_argument("--output", default=str(RESULTS_DIR),
+                            help="directory for the JSON result, '' to skip")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare",
+                                         help="diff two saved results")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.set_defaults(handler=compare_results)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
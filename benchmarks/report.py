@@ -0,0 +1,119 @@
+import json
+import math
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    # Nearest-rank, so every reported latency is one that was observed.
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_samples(samples: list[tuple[float, int]],
+                      elapsed: float) -> dict:
+    latencies = sorted(latency * 1000 for latency, _ in samples)
+    summary = {
+        "requests": len(samples),
+        "errors": sum(1 for _, status in samples if not 200 <= status < 400),
+        "rps": len(samples) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+        "max_ms": latencies[-1] if latencies else 0.0,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = percentile(latencies, pct)
+    return summary
+
+
+def summarize(samples: dict[str, list], elapsed: float) -> dict:
+    combined = [sample for values in samples.values() for sample in values]
+    return {
+        "elapsed_s": elapsed,
+        "total": summarize_samples(combined, elapsed),
+        "operations": {
+            name: summarize_samples(values, elapsed)
+            for name, values in samples.items() if values
+        },
+    }
+
+
+def git_revision() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"],
+                                capture_output=True,
+                                text=True,
+                                check=True).stdout.strip()
+        dirty = bool(
+            subprocess.run(["git", "status", "--porcelain", "--", "src"],
+                           capture_output=True,
+                           text=True,
+                           check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def save_result(result: dict, directory: str | Path) -> Path:
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    meta = result["meta"]
+    stamp = datetime.fromisoformat(meta["started_at"]).strftime("%Y%m%dT%H%M%S")
+    commit = (meta["git"]["commit"] or "unknown")[:10]
+    path = directory / f"{stamp}-{commit}-{meta['target']}.json"
+    path.write_text(json.dumps(result, indent=2))
+    return path
+
+
+def build_meta(target: str, options: dict, settings: dict) -> dict:
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "target": target,
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": options,
+        "settings": settings,
+    }
+
+
+def format_summary(result: dict) -> str:
+    header = (f"{'operation':<10} {'count':>7} {'errors':>6} {'req/s':>9} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    rows = [header, "-" * len(header)]
+    summary = result["summary"]
+    for name, stats in [*summary["operations"].items(),
+                        ("total", summary["total"])]:
+        rows.append(f"{name:<10} {stats['requests']:>7} {stats['errors']:>6} "
+                    f"{stats['rps']:>9.1f} {stats['p50_ms']:>8.2f} "
+                    f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+    return "\n".join(rows)
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def compare(baseline: dict, candidate: dict) -> str:
+    """Tabulate how the candidate run moved against the baseline."""
+    header = (f"{'operation':<10} {'metric':<7} {'baseline':>10} "
+              f"{'candidate':>10} {'change':>8}")
+    rows = [header, "-" * len(header)]
+    before_ops = {**baseline["summary"]["operations"],
+                  "total": baseline["summary"]["total"]}
+    after_ops = {**candidate["summary"]["operations"],
+                 "total": candidate["summary"]["total"]}
+    for name in [name for name in after_ops if name in before_ops]:
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            before = before_ops[name][metric]
+            after = after_ops[name][metric]
+            rows.append(f"{name:<10} {metric:<7} {before:>10.2f} "
+                        f"{after:>10.2f} {_change(before, after):>8}")
+    return "\n".join(rows)
@@ -0,0 +1,111 @@
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy import insert
+from sqlmodel import SQLModel
+
+from src.config.cfg import SETTINGS
+from src.database.db import build_engine
+from src.database.shards import HashRing
+from src.models.note import NoteModel as Note
+from src.models.user import UserModel as User
+from src.utils.security_utils import hash_password
+
+WORDS = (
+    "meeting", "agenda", "budget", "review", "draft", "idea", "todo",
+    "release", "sprint", "backlog", "design", "api", "latency", "cache",
+    "index", "query", "report", "summary", "customer", "invoice", "travel",
+    "recipe", "garden", "book", "chapter", "lecture", "exam", "project",
+    "deadline", "bug", "feature", "deploy", "server", "client", "database",
+    "schema", "migration", "note", "reminder", "weekly", "monthly",
+    "quarterly", "plan", "goal", "habit", "workout", "journal", "research",
+    "paper", "review", "outline", "kernel", "python", "rust", "sqlite",
+    "fastapi", "async", "thread",
+)
+
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class SeededUser:
+    id: UUID
+    username: str
+    password: str
+    note_ids: list[UUID] = field(default_factory=list)
+
+
+def _uuid(rng: random.Random) -> UUID:
+    return UUID(int=rng.getrandbits(128), version=4)
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def generate_users(rng: random.Random, count: int) -> list[SeededUser]:
+    return [
+        SeededUser(id=_uuid(rng),
+                   username=f"bench_user_{index}",
+                   password=f"bench-password-{index}") for index in range(count)
+    ]
+
+
+def generate_notes(rng: random.Random, user: SeededUser, count: int,
+                   content_words: tuple[int, int]) -> list[dict]:
+    notes = []
+    for index in range(count):
+        timestamp = BASE_TIME + timedelta(minutes=rng.randrange(525600))
+        note_id = _uuid(rng)
+        user.note_ids.append(note_id)
+        notes.append({
+            "id": note_id,
+            "title": f"{sentence(rng, 3)} {index}",
+            "content": sentence(rng, rng.randint(*content_words)),
+            "created_at": timestamp,
+            "updated_at": timestamp,
+            "owner_id": user.id,
+            "version": 1,
+        })
+    return notes
+
+
+def seed_database(path: str,
+                  users: int,
+                  notes_per_user: int,
+                  seed: int = 0,
+                  content_words: tuple[int, int] = (20, 400),
+                  shards: dict[str, str] | None = None) -> list[SeededUser]:
+    """Create ``users`` x ``notes_per_user`` rows in a fresh database.
+
+    The same arguments always produce the same users, ids and note bodies,
+    so runs against different commits read and write the same data. With
+    ``shards`` ({name: path}), notes go to each owner's shard as the app
+    would place them.
+    """
+    rng = random.Random(seed)
+    engine = build_engine(path)
+    SQLModel.metadata.create_all(engine)
+    ring = HashRing(shards, SETTINGS.DB_SHARD_VNODES) if shards else None
+    shard_engines = {name: build_engine(shard_path)
+                     for name, shard_path in (shards or {}).items()}
+    for shard_engine in shard_engines.values():
+        SQLModel.metadata.create_all(shard_engine)
+    seeded = generate_users(rng, users)
+    with engine.begin() as connection:
+        connection.execute(insert(User.__table__), [{
+            "id": user.id,
+            "username": user.username,
+            "email": f"{user.username}@example.com",
+            "password": hash_password(user.password),
+        } for user in seeded])
+    for user in seeded:
+        notes = generate_notes(rng, user, notes_per_user, content_words)
+        target = shard_engines[ring.shard_for(user.id)] if ring else engine
+        if notes:
+            with target.begin() as connection:
+                connection.execute(insert(Note.__table__), notes)
+    for built in (engine, *shard_engines.values()):
+        built.dispose()
+    return seeded
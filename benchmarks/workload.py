@@ -0,0 +1,151 @@
+import asyncio
+import itertools
+import random
+import time
+from collections.abc import Awaitable, Callable
+from uuid import UUID
+
+import httpx
+
+from benchmarks.seed import WORDS, SeededUser, sentence
+
+MIXES = {
+    "default": {
+        "list": 30,
+        "get": 30,
+        "search": 15,
+        "create": 10,
+        "update": 10,
+        "login": 5,
+    },
+    "read": {
+        "list": 45,
+        "get": 40,
+        "search": 15,
+    },
+    "write": {
+        "create": 50,
+        "update": 40,
+        "get": 10,
+    },
+    "login": {
+        "login": 100,
+    },
+}
+
+
+def parse_mix(spec: str) -> dict[str, int]:
+    """Accepts a named mix or ``op=weight,op=weight``."""
+    if spec in MIXES:
+        return MIXES[spec]
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+class VirtualUser:
+    """One client session replaying a mix of operations as a seeded user."""
+
+    def __init__(self, client: httpx.AsyncClient, user: SeededUser,
+                 rng: random.Random, number: int):
+        self.client = client
+        self.user = user
+        self.rng = rng
+        self.number = number
+        self.note_ids = list(user.note_ids)
+        self.created = itertools.count()
+        self.headers: dict[str, str] = {}
+
+    async def login(self) -> httpx.Response:
+        response = await self.client.post(
+            "/users/login", auth=(self.user.username, self.user.password))
+        if response.status_code == 200:
+            self.headers = {"Authorization": response.headers["Authorization"]}
+        return response
+
+    async def list(self) -> httpx.Response:
+        return await self.client.get("/me/notes",
+                                     params={"limit": 20},
+                                     headers=self.headers)
+
+    async def get(self) -> httpx.Response:
+        note_id = self.rng.choice(self.note_ids)
+        return await self.client.get(f"/me/notes/{note_id}",
+                                     headers=self.headers)
+
+    async def search(self) -> httpx.Response:
+        return await self.client.get("/me/notes/search",
+                                     params={"q": self.rng.choice(WORDS)},
+                                     headers=self.headers)
+
+    async def create(self) -> httpx.Response:
+        response = await self.client.post(
+            "/me/notes",
+            json={
+                "title": f"bench {self.number}-{next(self.created)}",
+                "content": sentence(self.rng, self.rng.randint(20, 400)),
+            },
+            headers=self.headers)
+        if response.status_code == 200:
+            self.note_ids.append(UUID(response.json()["id"]))
+        return response
+
+    async def update(self) -> httpx.Response:
+        note_id = self.rng.choice(self.note_ids)
+        return await self.client.put(
+            f"/me/notes/{note_id}",
+            json={
+                "title": f"edited {note_id.hex}",
+                "content": sentence(self.rng, self.rng.randint(20, 400)),
+            },
+            headers=self.headers)
+
+
+Operation = Callable[[VirtualUser], Awaitable[httpx.Response]]
+
+OPERATIONS: dict[str, Operation] = {
+    "login": VirtualUser.login,
+    "list": VirtualUser.list,
+    "get": VirtualUser.get,
+    "search": VirtualUser.search,
+    "create": VirtualUser.create,
+    "update": VirtualUser.update,
+}
+
+
+async def run_workload(client: httpx.AsyncClient, users: list[SeededUser],
+                       mix: dict[str, int], requests: int, concurrency: int,
+                       seed: int = 0) -> tuple[dict[str, list], float]:
+    """Replay ``requests`` operations from ``concurrency`` virtual users.
+
+    Returns per-operation ``(latency_seconds, status_code)`` samples and the
+    wall-clock time of the run. The initial logins are not measured.
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    remaining = itertools.count(requests, -1)
+    samples: dict[str, list] = {name: [] for name in names}
+    virtual_users = [
+        VirtualUser(client, users[number % len(users)],
+                    random.Random(f"{seed}-{number}"), number)
+        for number in range(concurrency)
+    ]
+    await asyncio.gather(*(user.login() for user in virtual_users))
+
+    async def worker(user: VirtualUser) -> None:
+        while next(remaining) > 0:
+            name = user.rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                status = (await OPERATIONS[name](user)).status_code
+            except httpx.HTTPError:
+                status = 0
+            samples[name].append((time.perf_counter() - started, status))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(user) for user in virtual_users))
+    return samples, time.perf_counter() - started
@@ -6,5 +6,108 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
   DB_URL:str = str(os.getenv("DB_URL"))
   SECRET_KEY:str = str(os.getenv("SECRET_KEY", "secret"))
+  # "async" serves requests through aiosqlite, "sync" runs the blocking
+  # driver in the threadpool. Both expose the same awaitable session API.
+  DB_MODE:str = str(os.getenv("DB_MODE", "async"))
+  DB_ECHO:bool = os.getenv("DB_ECHO", "false").lower() == "true"
+  DB_JOURNAL_MODE:str = str(os.getenv("DB_JOURNAL_MODE", "WAL"))
+  DB_SYNCHRONOUS:str = str(os.getenv("DB_SYNCHRONOUS", "NORMAL"))
+  DB_BUSY_TIMEOUT_MS:int = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+  DB_MMAP_SIZE:int = int(os.getenv("DB_MMAP_SIZE", 256 * 1024 * 1024))
+  # Negative values are KiB, as in PRAGMA cache_size.
+  DB_CACHE_SIZE:int = int(os.getenv("DB_CACHE_SIZE", -64 * 1024))
+  DB_POOL_SIZE:int = int(os.getenv("DB_POOL_SIZE", 5))
+  DB_MAX_OVERFLOW:int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+  DB_READ_POOL_SIZE:int = int(os.getenv("DB_READ_POOL_SIZE", 10))
+  # Notes and everything keyed by owner (tags, change feed, blobs) are spread
+  # over DB_SHARDS, "name=path,..." placed by consistent hashing of the
+  # owner id; users stay in DB_URL. Empty keeps everything in DB_URL.
+  # Changing either setting moves some owners: run src.database.rebalance.
+  DB_SHARDS:str = str(os.getenv("DB_SHARDS", ""))
+  DB_SHARD_VNODES:int = int(os.getenv("DB_SHARD_VNODES", 64))
+  BULK_CHUNK_SIZE:int = int(os.getenv("BULK_CHUNK_SIZE", 500))
+  EXPORT_BATCH_SIZE:int = int(os.getenv("EXPORT_BATCH_SIZE", 500))
+  TOMBSTONE_RETENTION_DAYS:int = int(os.getenv("TOMBSTONE_RETENTION_DAYS", 30))
+  # "memory" keeps user and note entries per worker, "redis" shares them
+  # (and their invalidations) between workers through CACHE_URL.
+  CACHE_BACKEND:str = str(os.getenv("CACHE_BACKEND", "memory"))
+  CACHE_URL:str = str(os.getenv("CACHE_URL", "redis://localhost:6379/0"))
+  CACHE_MAX_ENTRIES:int = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+  USER_CACHE_TTL:float = float(os.getenv("USER_CACHE_TTL", 300))
+  NOTE_CACHE_TTL:float = float(os.getenv("NOTE_CACHE_TTL", 30))
+  # Notes are only cached with the redis backend, where every worker sees
+  # invalidations; set this to cache them in memory on a single worker.
+  # Bodies stored as blobs (NOTE_BLOB_THRESHOLD) are never cached.
+  NOTE_CACHE_LOCAL:bool = os.getenv("NOTE_CACHE_LOCAL", "false").lower() == "true"
+  TOKEN_CACHE_SIZE:int = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+  TOKEN_CACHE_TTL:float = float(os.getenv("TOKEN_CACHE_TTL", 300))
+  COMPRESSION_MINIMUM_SIZE:int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
+  # Preference order; "br" is skipped unless the brotli extra is installed.
+  COMPRESSION_ENCODINGS:str = str(os.getenv("COMPRESSION_ENCODINGS", "br,gzip"))
+  COMPRESSION_GZIP_LEVEL:int = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+  COMPRESSION_BROTLI_QUALITY:int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+  # Set METRICS_DIR when running several uvicorn workers: each one writes its
+  # histograms there every METRICS_FLUSH_INTERVAL seconds and /metrics merges
+  # them. Empty means metrics are reported for the answering process only.
+  METRICS_DIR:str = str(os.getenv("METRICS_DIR", ""))
+  METRICS_FLUSH_INTERVAL:float = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+  METRICS_MAX_STATEMENTS:int = int(os.getenv("METRICS_MAX_STATEMENTS", 500))
+  # A PROFILER_SAMPLE_RATE fraction of requests is stack-sampled every
+  # PROFILER_INTERVAL_MS; those slower than PROFILER_THRESHOLD_MS are kept,
+  # the last PROFILER_CAPTURES of them, for GET /admin/profiles.
+  PROFILER_SAMPLE_RATE:float = float(os.getenv("PROFILER_SAMPLE_RATE", 0.01))
+  PROFILER_THRESHOLD_MS:float = float(os.getenv("PROFILER_THRESHOLD_MS", 500))
+  PROFILER_INTERVAL_MS:float = float(os.getenv("PROFILER_INTERVAL_MS", 5))
+  PROFILER_CAPTURES:int = int(os.getenv("PROFILER_CAPTURES", 50))
+  PROFILER_MAX_STATEMENTS:int = int(os.getenv("PROFILER_MAX_STATEMENTS", 200))
+  # Required in the X-Admin-Token header by /admin routes, which are
+  # disabled while it is empty.
+  ADMIN_TOKEN:str = str(os.getenv("ADMIN_TOKEN", ""))
+  # Note bodies of NOTE_BLOB_THRESHOLD bytes or more are compressed into
+  # noteblobmodel. "zstd" needs the zstandard extra and falls back to zlib.
+  NOTE_BLOB_THRESHOLD:int = int(os.getenv("NOTE_BLOB_THRESHOLD", 4096))
+  NOTE_BLOB_CODEC:str = str(os.getenv("NOTE_BLOB_CODEC", "zstd"))
+  NOTE_BLOB_LEVEL:int = int(os.getenv("NOTE_BLOB_LEVEL", 6))
+  RATE_LIMIT_ENABLED:bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+  # "memory" keeps buckets per worker, "redis" shares them through
+  # RATE_LIMIT_URL so the budgets hold for the whole server.
+  RATE_LIMIT_BACKEND:str = str(os.getenv("RATE_LIMIT_BACKEND", "memory"))
+  RATE_LIMIT_URL:str = str(os.getenv("RATE_LIMIT_URL", "redis://localhost:6379/1"))
+  RATE_LIMIT_MAX_KEYS:int = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+  # Per-user budgets, in requests per second and bucket size. Per-IP
+  # buckets get RATE_LIMIT_IP_FACTOR times as much.
+  RATE_LIMIT_AUTH_RATE:float = float(os.getenv("RATE_LIMIT_AUTH_RATE", 0.2))
+  RATE_LIMIT_AUTH_BURST:float = float(os.getenv("RATE_LIMIT_AUTH_BURST", 10))
+  RATE_LIMIT_READ_RATE:float = float(os.getenv("RATE_LIMIT_READ_RATE", 20))
+  RATE_LIMIT_READ_BURST:float = float(os.getenv("RATE_LIMIT_READ_BURST", 200))
+  RATE_LIMIT_WRITE_RATE:float = float(os.getenv("RATE_LIMIT_WRITE_RATE", 5))
+  RATE_LIMIT_WRITE_BURST:float = float(os.getenv("RATE_LIMIT_WRITE_BURST", 100))
+  RATE_LIMIT_IP_FACTOR:float = float(os.getenv("RATE_LIMIT_IP_FACTOR", 5))
+  # In-flight requests per user and worker; 0 disables the quota.
+  RATE_LIMIT_MAX_CONCURRENT:int = int(os.getenv("RATE_LIMIT_MAX_CONCURRENT", 8))
+  RATE_LIMIT_TRUST_FORWARDED:bool = os.getenv(
+    "RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+  # Queue single-note writes per worker and commit them together, every
+  # GROUP_COMMIT_MAX_DELAY_MS or GROUP_COMMIT_MAX_BATCH operations.
+  GROUP_COMMIT:bool = os.getenv("GROUP_COMMIT", "false").lower() == "true"
+  GROUP_COMMIT_MAX_BATCH:int = int(os.getenv("GROUP_COMMIT_MAX_BATCH", 64))
+  GROUP_COMMIT_MAX_DELAY_MS:float = float(os.getenv("GROUP_COMMIT_MAX_DELAY_MS", 2))
+  # GET /me/notes/events pushes note changes to the owner's open streams.
+  # "memory" reaches streams on the writing worker only, "redis" relays
+  # events to every worker through EVENTS_URL. A stream more than
+  # EVENTS_QUEUE_SIZE events behind is dropped, and each one is closed after
+  # EVENTS_MAX_DURATION seconds so clients reconnect and re-authenticate.
+  EVENTS_BACKEND:str = str(os.getenv("EVENTS_BACKEND", "memory"))
+  EVENTS_URL:str = str(os.getenv("EVENTS_URL", "redis://localhost:6379/2"))
+  EVENTS_QUEUE_SIZE:int = int(os.getenv("EVENTS_QUEUE_SIZE", 100))
+  # Open streams per user and worker.
+  EVENTS_MAX_STREAMS:int = int(os.getenv("EVENTS_MAX_STREAMS", 4))
+  EVENTS_HEARTBEAT:float = float(os.getenv("EVENTS_HEARTBEAT", 15))
+  EVENTS_MAX_DURATION:float = float(os.getenv("EVENTS_MAX_DURATION", 600))
+  BCRYPT_ROUNDS:int = int(os.getenv("BCRYPT_ROUNDS", 12))
+  # bcrypt runs on a dedicated pool; requests beyond HASH_QUEUE_DEPTH
+  # in-flight hashes are rejected with 503 instead of queueing.
+  HASH_WORKERS:int = int(os.getenv("HASH_WORKERS", os.cpu_count() or 1))
+  HASH_QUEUE_DEPTH:int = int(os.getenv("HASH_QUEUE_DEPTH", 32))
 
 SETTINGS = Settings()
@@ -0,0 +1,140 @@
+import hashlib
+import zlib
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config.cfg import SETTINGS
+from src.models.blob import NoteBlobModel as Blob
+
+try:
+    import zstandard
+except ImportError:  # zstandard is an optional extra
+    zstandard = None
+
+# A blob is dropped with the last note that references it, whichever write
+# path removed or replaced that note's body.
+BLOB_DDL = (
+    """
+    CREATE TRIGGER IF NOT EXISTS notemodel_blob_delete AFTER DELETE ON notemodel
+    WHEN old.content_hash IS NOT NULL
+    BEGIN
+        DELETE FROM noteblobmodel WHERE hash = old.content_hash
+        AND NOT EXISTS (SELECT 1 FROM notemodel
+                        WHERE content_hash = old.content_hash);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notemodel_blob_update
+    AFTER UPDATE OF content_hash ON notemodel
+    WHEN old.content_hash IS NOT NULL
+        AND old.content_hash IS NOT new.content_hash
+    BEGIN
+        DELETE FROM noteblobmodel WHERE hash = old.content_hash
+        AND NOT EXISTS (SELECT 1 FROM notemodel
+                        WHERE content_hash = old.content_hash);
+    END
+    """,
+)
+
+
+def compress(data: bytes) -> tuple[str, bytes]:
+    if SETTINGS.NOTE_BLOB_CODEC == "zstd" and zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=SETTINGS.NOTE_BLOB_LEVEL)
+        return "zstd", compressor.compress(data)
+    return "zlib", zlib.compress(data, SETTINGS.NOTE_BLOB_LEVEL)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd note blobs require the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def note_body(codec: str, data: bytes) -> str:
+    return decompress(codec, data).decode("utf-8")
+
+
+def register_functions(dbapi_connection, _connection_record) -> None:
+    # The search triggers index blob-backed bodies through note_body(), so
+    # every connection that writes notes needs it.
+    dbapi_connection.create_function("note_body", 2, note_body,
+                                     deterministic=True)
+
+
+def split_content(content: str) -> tuple[dict, dict | None]:
+    """Returns the notemodel values for ``content`` and the blob to store.
+
+    Bodies under NOTE_BLOB_THRESHOLD bytes stay inline; larger ones are
+    replaced by an empty string and the hash of their compressed blob.
+    """
+    data = content.encode("utf-8")
+    if len(data) < SETTINGS.NOTE_BLOB_THRESHOLD:
+        return {"content": content, "content_hash": None}, None
+    digest = hashlib.sha256(data).hexdigest()
+    codec, compressed = compress(data)
+    return ({"content": "", "content_hash": digest},
+            {"hash": digest, "codec": codec, "size": len(data),
+             "data": compressed})
+
+
+async def store_blobs(session: AsyncSession, blobs: list[dict]) -> None:
+    if blobs:
+        await session.execute(
+            insert(Blob.__table__).on_conflict_do_nothing(
+                index_elements=["hash"]),
+            params=blobs)
+
+
+async def discard_unreferenced(session: AsyncSession,
+                               hashes: set[str]) -> None:
+    """Drops blobs stored for notes that were then not written."""
+    if hashes:
+        await session.execute(
+            text("DELETE FROM noteblobmodel WHERE hash IN :hashes AND NOT "
+                 "EXISTS (SELECT 1 FROM notemodel "
+                 "WHERE content_hash = noteblobmodel.hash)").bindparams(
+                     bindparam("hashes", expanding=True)),
+            params={"hashes": list(hashes)})
+
+
+async def resolve_contents(session: AsyncSession, notes: list[dict]) -> list[dict]:
+    """Replaces each note's ``content_hash`` with its decompressed body."""
+    hashes = {note["content_hash"] for note in notes if note.get("content_hash")}
+    contents = {}
+    if hashes:
+        rows = (await session.exec(
+            select(Blob.hash, Blob.codec, Blob.data).where(
+                Blob.hash.in_(hashes)))).all()
+        contents = {row.hash: note_body(row.codec, row.data) for row in rows}
+    for note in notes:
+        content_hash = note.pop("content_hash", None)
+        if content_hash:
+            note["content"] = contents[content_hash]
+    return notes
+
+
+def create_blob_triggers(connection: Connection) -> None:
+    for statement in BLOB_DDL:
+        connection.execute(text(statement))
+
+
+def move_large_contents(connection: Connection) -> None:
+    rows = connection.execute(
+        text("SELECT id, content FROM notemodel WHERE content_hash IS NULL "
+             "AND length(CAST(content AS BLOB)) >= :threshold"),
+        {"threshold": SETTINGS.NOTE_BLOB_THRESHOLD}).all()
+    for row in rows:
+        values, blob = split_content(row.content)
+        connection.execute(
+            insert(Blob.__table__).on_conflict_do_nothing(
+                index_elements=["hash"]), blob)
+        connection.execute(
+            text("UPDATE notemodel SET content = :content, "
+                 "content_hash = :content_hash WHERE id = :id"),
+            {**values, "id": row.id})
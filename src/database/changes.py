@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy import delete, text, update
+from sqlalchemy.engine import Connection
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.database import blobs
+from src.models.change import ChangeSequenceModel as Sequence
+from src.models.change import NoteTombstoneModel as Tombstone
+from src.models.note import NoteModel as Note
+from src.models.types import SQLITE_NOW
+
+NEXT_SEQ = """
+    INSERT INTO changesequencemodel (owner_id, seq, purged_seq)
+    VALUES ({owner}, 1, 0)
+    ON CONFLICT (owner_id) DO UPDATE SET seq = seq + 1;
+"""
+
+_CURRENT_SEQ = "(SELECT seq FROM changesequencemodel WHERE owner_id = {owner})"
+
+# Every write path (single, bulk or batched) goes through notemodel, so the
+# per-owner change sequence is maintained here rather than in each route.
+CHANGES_DDL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS notemodel_seq_insert AFTER INSERT ON notemodel
+    BEGIN
+        {NEXT_SEQ.format(owner="new.owner_id")}
+        UPDATE notemodel SET seq = {_CURRENT_SEQ.format(owner="new.owner_id")}
+        WHERE rowid = new.rowid;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS notemodel_seq_update
+    AFTER UPDATE OF title, content, updated_at, version ON notemodel
+    BEGIN
+        {NEXT_SEQ.format(owner="new.owner_id")}
+        UPDATE notemodel SET seq = {_CURRENT_SEQ.format(owner="new.owner_id")}
+        WHERE rowid = new.rowid;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS notemodel_seq_delete AFTER DELETE ON notemodel
+    BEGIN
+        {NEXT_SEQ.format(owner="old.owner_id")}
+        INSERT OR REPLACE INTO notetombstonemodel
+            (note_id, owner_id, seq, deleted_at)
+        VALUES (old.id, old.owner_id,
+                {_CURRENT_SEQ.format(owner="old.owner_id")},
+                {SQLITE_NOW.text});
+    END
+    """,
+)
+
+
+def create_change_triggers(connection: Connection) -> None:
+    for statement in CHANGES_DDL:
+        connection.execute(text(statement))
+
+
+def backfill_change_sequence(connection: Connection) -> None:
+    connection.execute(text("""
+        UPDATE notemodel SET seq = ranked.seq
+        FROM (SELECT id, row_number() OVER (
+                  PARTITION BY owner_id ORDER BY updated_at, id) AS seq
+              FROM notemodel) AS ranked
+        WHERE ranked.id = notemodel.id
+    """))
+    connection.execute(text("""
+        INSERT INTO changesequencemodel (owner_id, seq, purged_seq)
+        SELECT owner_id, max(seq), 0 FROM notemodel WHERE true
+        GROUP BY owner_id
+        ON CONFLICT (owner_id) DO NOTHING
+    """))
+
+
+class ChangesPurgedError(Exception):
+    pass
+
+
+async def current_seq(session: AsyncSession, owner_id: UUID) -> tuple[int, int]:
+    row = (await session.exec(
+        select(Sequence.seq, Sequence.purged_seq).where(
+            Sequence.owner_id == owner_id))).first()
+    return (row.seq, row.purged_seq) if row else (0, 0)
+
+
+async def purge_tombstones(session: AsyncSession, owner_id: UUID,
+                           retention_days: int) -> None:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    purged = (await session.execute(
+        delete(Tombstone).where(Tombstone.owner_id == owner_id,
+                                Tombstone.deleted_at < cutoff).returning(
+                                    Tombstone.seq))).scalars().all()
+    if purged:
+        await session.execute(
+            update(Sequence).where(Sequence.owner_id == owner_id).values(
+                purged_seq=func.max(Sequence.purged_seq, max(purged))))
+
+
+async def list_changes(session: AsyncSession, owner_id: UUID, since: int,
+                       limit: int, fields: tuple[str, ...]) -> dict:
+    seq, purged_seq = await current_seq(session, owner_id)
+    if 0 < since < purged_seq:
+        raise ChangesPurgedError(purged_seq)
+    if "content" in fields:
+        fields = fields + ("content_hash",)
+    upserts = (await session.exec(
+        select(Note.seq, *[getattr(Note, name) for name in fields]).where(
+            Note.owner_id == owner_id,
+            Note.seq > since).order_by(Note.seq).limit(limit + 1))).all()
+    notes = await blobs.resolve_contents(
+        session, [{name: row._mapping[name] for name in fields}
+                  for row in upserts])
+    deletes = (await session.exec(
+        select(Tombstone.seq, Tombstone.note_id, Tombstone.deleted_at).where(
+            Tombstone.owner_id == owner_id, Tombstone.seq > since).order_by(
+                Tombstone.seq).limit(limit + 1))).all()
+    changes = sorted(
+        [{"seq": row.seq, "op": "upsert", "note": note}
+         for row, note in zip(upserts, notes, strict=True)] +
+        [{"seq": row.seq, "op": "delete", "id": row.note_id,
+          "deleted_at": row.deleted_at} for row in deletes],
+        key=lambda change: change["seq"])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    cursor = changes[-1]["seq"] if has_more else max(seq, since)
+    return {"changes": changes, "cursor": cursor, "has_more": has_more}
@@ -1,12 +1,165 @@
+from contextlib import asynccontextmanager
+from functools import partial
+
+from authx.schema import TokenPayload
+from fastapi import Depends
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.config.cfg import SETTINGS
+from src.database import (
+  migrations,  # noqa: F401  registers create_all hook
+  shards,
+)
+from src.database.blobs import register_functions
+from src.database.sessions import ThreadedSession
+from src.database.shards import shard_path
+from src.utils import profiler
+from src.utils.auth import access_token_required
+from src.utils.metrics import (
+  TimedAsyncAdaptedQueuePool,
+  TimedQueuePool,
+  instrument_engine,
+)
+
+
+def apply_pragmas(dbapi_connection, _connection_record, read_only=False):
+  cursor = dbapi_connection.cursor()
+  cursor.execute(f"PRAGMA journal_mode = {SETTINGS.DB_JOURNAL_MODE}")
+  cursor.execute(f"PRAGMA synchronous = {SETTINGS.DB_SYNCHRONOUS}")
+  cursor.execute(f"PRAGMA busy_timeout = {SETTINGS.DB_BUSY_TIMEOUT_MS:d}")
+  cursor.execute(f"PRAGMA mmap_size = {SETTINGS.DB_MMAP_SIZE:d}")
+  cursor.execute(f"PRAGMA cache_size = {SETTINGS.DB_CACHE_SIZE:d}")
+  if read_only:
+    cursor.execute("PRAGMA query_only = ON")
+  cursor.close()
+
+def _pool_size(read_only):
+  if read_only:
+    return {"pool_size": SETTINGS.DB_READ_POOL_SIZE, "max_overflow": 0,
+            "pool_logging_name": "read"}
+  return {"pool_size": SETTINGS.DB_POOL_SIZE,
+          "max_overflow": SETTINGS.DB_MAX_OVERFLOW,
+          "pool_logging_name": "write"}
+
+# pysqlite and aiosqlite only BEGIN before DML, so a leading SAVEPOINT opens
+# a transaction of its own and its RELEASE commits it. Group commit relies on
+# savepoints, so its engine takes over BEGIN (IMMEDIATE: it only writes).
+def _use_explicit_begin(engine):
+  def disable_implicit_begin(dbapi_connection, _connection_record):
+    dbapi_connection.isolation_level = None
+
+  def begin(connection):
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+  event.listen(engine, "connect", disable_implicit_begin)
+  event.listen(engine, "begin", begin)
+
+def build_engine(path, read_only=False, explicit_begin=False):
+  engine = create_engine(f"sqlite:///{path}", echo=SETTINGS.DB_ECHO,
+                         connect_args={"check_same_thread": False},
+                         poolclass=TimedQueuePool,
+                         **_pool_size(read_only))
+  event.listen(engine, "connect", partial(apply_pragmas, read_only=read_only))
+  event.listen(engine, "connect", register_functions)
+  instrument_engine(engine)
+  profiler.instrument_engine(engine)
+  if explicit_begin:
+    _use_explicit_begin(engine)
+  return engine
+
+def build_async_engine(path, read_only=False, explicit_begin=False):
+  engine = create_async_engine(f"sqlite+aiosqlite:///{path}",
+                               echo=SETTINGS.DB_ECHO,
+                               poolclass=TimedAsyncAdaptedQueuePool,
+                               **_pool_size(read_only))
+  event.listen(engine.sync_engine, "connect",
+               partial(apply_pragmas, read_only=read_only))
+  event.listen(engine.sync_engine, "connect", register_functions)
+  instrument_engine(engine.sync_engine)
+  profiler.instrument_engine(engine.sync_engine)
+  if explicit_begin:
+    _use_explicit_begin(engine.sync_engine)
+  return engine
+
+
+_engines: dict[tuple, Engine | AsyncEngine] = {}
+
+# Engines are built on first use, one set per database file: the directory
+# (DB_URL) and each shard.
+def get_engine(*, shard=None, read_only=False):
+  key = ("sync", shard_path(shard), read_only)
+  if key not in _engines:
+    _engines[key] = build_engine(key[1], read_only)
+  return _engines[key]
 
-_engine = create_engine( f"sqlite:///{SETTINGS.DB_URL}", echo=True)
+def get_async_engine(*, shard=None, read_only=False):
+  key = ("async", shard_path(shard), read_only)
+  if key not in _engines:
+    _engines[key] = build_async_engine(key[1], read_only)
+  return _engines[key]
+
+def get_group_commit_engine(*, shard=None):
+  key = ("group", shard_path(shard))
+  if key not in _engines:
+    build = build_async_engine if SETTINGS.DB_MODE == "async" else build_engine
+    _engines[key] = build(key[1], explicit_begin=True)
+  return _engines[key]
 
 def create_db_and_tables():
-  SQLModel.metadata.create_all(_engine)
+  SQLModel.metadata.create_all(get_engine())
+  for shard in shards.SHARDS:
+    SQLModel.metadata.create_all(get_engine(shard=shard))
+
+@asynccontextmanager
+async def _open_session(engine, shard):
+  if SETTINGS.DB_MODE == "async":
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+      session.info["shard"] = shard
+      yield session
+  else:
+    session = ThreadedSession(Session(engine, expire_on_commit=False))
+    session.info["shard"] = shard
+    try:
+      yield session
+    finally:
+      await session.close()
+
+def session_scope(*, shard=None, read_only=False):
+  if SETTINGS.DB_MODE == "async":
+    return _open_session(get_async_engine(shard=shard, read_only=read_only),
+                         shard)
+  return _open_session(get_engine(shard=shard, read_only=read_only), shard)
+
+def group_commit_scope(*, shard=None):
+  return _open_session(get_group_commit_engine(shard=shard), shard)
+
+# Users live in the directory database; everything a token's owner reads or
+# writes lives on the owner's shard.
+async def get_directory_session():
+  async with session_scope(read_only=False) as session:
+    yield session
 
-def get_session():
-  with Session(_engine) as session:
+async def get_directory_read_session():
+  async with session_scope(read_only=True) as session:
     yield session
+
+async def get_async_session(
+    payload: TokenPayload = Depends(access_token_required)):
+  async with session_scope(shard=shards.shard_for(payload.sub)) as session:
+    yield session
+
+async def get_async_read_session(
+    payload: TokenPayload = Depends(access_token_required)):
+  async with session_scope(read_only=True,
+                           shard=shards.shard_for(payload.sub)) as session:
+    yield session
+
+# Streaming responses outlive yield dependencies, so they open their own
+# session from this factory once the body is being sent.
+def get_async_read_session_factory(
+    payload: TokenPayload = Depends(access_token_required)):
+  return partial(session_scope, read_only=True,
+                 shard=shards.shard_for(payload.sub))
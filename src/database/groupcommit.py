@@ -0,0 +1,164 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from contextlib import AbstractAsyncContextManager
+from functools import partial
+from typing import Any, TypeVar
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config.cfg import SETTINGS
+from src.database.db import group_commit_scope
+from src.database.shards import SHARDS
+
+T = TypeVar("T")
+
+Operation = Callable[[AsyncSession], Awaitable[T]]
+
+# Queued by stop(): everything submitted before it is still committed.
+_STOP = object()
+
+
+class GroupCommitter:
+    """Runs queued write operations together in one transaction.
+
+    Operations collected within ``max_delay`` seconds (or until
+    ``max_batch`` are pending) share a transaction, each inside its own
+    SAVEPOINT so a failing one is rolled back alone and its caller gets the
+    exception. Callers are only answered once the batch is committed, so a
+    client that sees its write acknowledged can read it back from any worker.
+    The app lifespan starts the flusher and stops it on shutdown.
+    """
+
+    def __init__(self,
+                 session_factory: Callable[[], AbstractAsyncContextManager],
+                 max_batch: int,
+                 max_delay: float):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.operations = 0
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> asyncio.Queue:
+        # Bound to the running loop; writes submitted outside the lifespan
+        # (as in tests) start the flusher on first use.
+        loop = asyncio.get_running_loop()
+        if (self._queue is None or self._task is None or self._task.done() or
+                self._task.get_loop() is not loop):
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    async def stop(self) -> None:
+        """Commits the operations already queued, then ends the flusher."""
+        task, self._task = self._task, None
+        queue, self._queue = self._queue, None
+        if task is None or queue is None or task.done():
+            return
+        if task.get_loop() is not asyncio.get_running_loop():
+            task.cancel()
+            return
+        queue.put_nowait(_STOP)
+        await task
+
+    async def submit(self, operation: Operation[T]) -> T:
+        future = asyncio.get_running_loop().create_future()
+        self.start().put_nowait((operation, future))
+        return await future
+
+    async def _collect(self, queue: asyncio.Queue) -> list:
+        batch = [await queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch and batch[-1] is not _STOP:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = await self._collect(queue)
+            operations = [item for item in batch if item is not _STOP]
+            if operations:
+                await self.flush(operations)
+            if len(operations) < len(batch):
+                return
+
+    async def flush(self, batch: list[tuple[Operation, asyncio.Future]]) -> None:
+        outcomes: list[tuple[asyncio.Future, Any, BaseException | None]] = []
+        try:
+            async with self.session_factory() as session:
+                for operation, future in batch:
+                    try:
+                        async with session.begin_nested():
+                            result = await operation(session)
+                    except Exception as ex:
+                        outcomes.append((future, None, ex))
+                    else:
+                        outcomes.append((future, result, None))
+                await session.commit()
+        except Exception as ex:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(ex)
+            return
+        self.batches += 1
+        self.operations += len(batch)
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+committer = GroupCommitter(group_commit_scope, SETTINGS.GROUP_COMMIT_MAX_BATCH,
+                           SETTINGS.GROUP_COMMIT_MAX_DELAY_MS / 1000)
+# Shards have a write lock each, so each gets its own queue and batches.
+_shard_committers: dict[str, GroupCommitter] = {}
+
+
+def committer_for(shard: str | None) -> GroupCommitter:
+    if shard is None:
+        return committer
+    if shard not in _shard_committers:
+        _shard_committers[shard] = GroupCommitter(
+            partial(group_commit_scope, shard=shard), committer.max_batch,
+            committer.max_delay)
+    return _shard_committers[shard]
+
+
+def start_committers() -> None:
+    for shard in SHARDS or (None,):
+        committer_for(shard).start()
+
+
+async def stop_committers() -> None:
+    for shard_committer in (committer, *_shard_committers.values()):
+        await shard_committer.stop()
+
+
+async def run_write(session: AsyncSession, operation: Operation[T]) -> T:
+    """Runs ``operation`` and commits it, through the group committer of the
+    session's shard when GROUP_COMMIT is on, else directly on ``session``."""
+    if SETTINGS.GROUP_COMMIT:
+        return await committer_for(session.info.get("shard")).submit(operation)
+    try:
+        result = await operation(session)
+    except Exception:
+        # Nothing of a failed operation may reach a later commit.
+        await session.rollback()
+        raise
+    await session.commit()
+    return result
@@ -0,0 +1,218 @@
+from collections.abc import Callable
+from datetime import datetime, timezone
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection
+from sqlmodel import SQLModel
+
+from src.database import blobs, changes, search, tags
+from src.models.types import SQLITE_NOW, SQLITE_NOW_FORMAT
+
+Migration = Callable[[Connection], None]
+
+MIGRATIONS: list[tuple[str, Migration]] = []
+
+
+def migration(name: str) -> Callable[[Migration], Migration]:
+
+    def register(apply: Migration) -> Migration:
+        MIGRATIONS.append((name, apply))
+        return apply
+
+    return register
+
+
+def run_migrations(connection: Connection) -> list[str]:
+    connection.execute(
+        text("CREATE TABLE IF NOT EXISTS schema_migrations ("
+             "name VARCHAR PRIMARY KEY, applied_at VARCHAR NOT NULL)"))
+    applied = set(
+        connection.execute(text("SELECT name FROM schema_migrations")).scalars())
+    pending = [(name, apply) for name, apply in MIGRATIONS if name not in applied]
+    for name, apply in pending:
+        apply(connection)
+        connection.execute(
+            text("INSERT INTO schema_migrations (name, applied_at) "
+                 "VALUES (:name, :applied_at)"),
+            {"name": name, "applied_at": datetime.now(timezone.utc).isoformat()})
+    return [name for name, _ in pending]
+
+
+# create_all only creates missing tables, so every call is followed by the
+# migrations that bring existing databases up to date.
+@event.listens_for(SQLModel.metadata, "after_create")
+def _migrate_after_create(_target, connection: Connection, **_kw) -> None:
+    run_migrations(connection)
+
+
+@migration("0001_note_search_index")
+def create_note_search_index(connection: Connection) -> None:
+    search.create_search_index(connection)
+    search.rebuild_search_index(connection)
+
+
+@migration("0002_note_owner_indexes")
+def create_note_owner_indexes(connection: Connection) -> None:
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_notemodel_owner_id_updated_at "
+             "ON notemodel (owner_id, updated_at, id)"))
+
+
+def _has_column(connection: Connection, table: str, column: str) -> bool:
+    columns = connection.execute(text(f"PRAGMA table_info('{table}')"))
+    return any(row.name == column for row in columns)
+
+
+def _has_unique_index(connection: Connection, table: str,
+                      columns: list[str]) -> bool:
+    for index in connection.execute(text(f"PRAGMA index_list('{table}')")):
+        if not index.unique:
+            continue
+        info = connection.execute(text(f"PRAGMA index_info('{index.name}')"))
+        if [column.name for column in info] == columns:
+            return True
+    return False
+
+
+@migration("0003_note_title_unique_per_owner")
+def scope_note_title_uniqueness(connection: Connection) -> None:
+    # SQLite cannot drop the inline UNIQUE (title) constraint, so the table
+    # is rebuilt. rowid is copied across to keep note_fts aligned.
+    if _has_unique_index(connection, "notemodel", ["title"]):
+        connection.execute(text("""
+            CREATE TABLE notemodel_new (
+                id CHAR(32) NOT NULL,
+                title VARCHAR NOT NULL,
+                content VARCHAR NOT NULL,
+                created_at VARCHAR NOT NULL,
+                updated_at VARCHAR NOT NULL,
+                owner_id CHAR(32) NOT NULL,
+                PRIMARY KEY (id),
+                FOREIGN KEY(owner_id) REFERENCES usermodel (id)
+            )
+        """))
+        connection.execute(text(
+            "INSERT INTO notemodel_new (rowid, id, title, content, created_at, "
+            "updated_at, owner_id) SELECT rowid, id, title, content, "
+            "created_at, updated_at, owner_id FROM notemodel"))
+        connection.execute(text("DROP TABLE notemodel"))
+        connection.execute(text("ALTER TABLE notemodel_new RENAME TO notemodel"))
+        create_note_owner_indexes(connection)
+        search.create_search_index(connection)
+    connection.execute(
+        text("CREATE UNIQUE INDEX IF NOT EXISTS ux_notemodel_owner_id_title "
+             "ON notemodel (owner_id, title)"))
+
+
+@migration("0004_note_version")
+def add_note_version(connection: Connection) -> None:
+    if not _has_column(connection, "notemodel", "version"):
+        connection.execute(text("ALTER TABLE notemodel "
+                                "ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+
+@migration("0005_note_change_sequence")
+def add_note_change_sequence(connection: Connection) -> None:
+    if not _has_column(connection, "notemodel", "seq"):
+        connection.execute(text("ALTER TABLE notemodel "
+                                "ADD COLUMN seq INTEGER NOT NULL DEFAULT 0"))
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_notemodel_owner_id_seq "
+             "ON notemodel (owner_id, seq)"))
+    changes.backfill_change_sequence(connection)
+    changes.create_change_triggers(connection)
+
+
+@migration("0006_note_blob_storage")
+def add_note_blob_storage(connection: Connection) -> None:
+    if not _has_column(connection, "notemodel", "content_hash"):
+        connection.execute(text("ALTER TABLE notemodel "
+                                "ADD COLUMN content_hash VARCHAR"))
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_notemodel_content_hash "
+             "ON notemodel (content_hash)"))
+    search.upgrade_search_triggers(connection)
+    blobs.create_blob_triggers(connection)
+    blobs.move_large_contents(connection)
+
+
+def _column_default(connection: Connection, table: str, column: str):
+    columns = connection.execute(text(f"PRAGMA table_info('{table}')"))
+    return next(row.dflt_value for row in columns if row.name == column)
+
+
+@migration("0007_note_datetime_columns")
+def convert_note_timestamps(connection: Connection) -> None:
+    # Adding the server defaults needs a rebuild as well. Minute strings
+    # ("2024-01-01 10:00") and any other format SQLite can parse become
+    # the microsecond UTC text UTCDateTime reads. rowid is kept for note_fts.
+    if _column_default(connection, "notemodel", "created_at") is None:
+        timestamp = ("coalesce(strftime('{format}', {column}), "
+                     "strftime('{format}', 'now'))")
+        created_at, updated_at = (
+            timestamp.format(format=SQLITE_NOW_FORMAT, column=column)
+            for column in ("created_at", "updated_at"))
+        connection.execute(text(f"""
+            CREATE TABLE notemodel_new (
+                id CHAR(32) NOT NULL,
+                title VARCHAR NOT NULL,
+                content VARCHAR NOT NULL,
+                created_at DATETIME DEFAULT {SQLITE_NOW.text} NOT NULL,
+                updated_at DATETIME DEFAULT {SQLITE_NOW.text} NOT NULL,
+                owner_id CHAR(32) NOT NULL,
+                version INTEGER NOT NULL DEFAULT 1,
+                seq INTEGER NOT NULL DEFAULT 0,
+                content_hash VARCHAR,
+                PRIMARY KEY (id),
+                FOREIGN KEY(owner_id) REFERENCES usermodel (id)
+            )
+        """))
+        connection.execute(text(
+            "INSERT INTO notemodel_new (rowid, id, title, content, created_at, "
+            "updated_at, owner_id, version, seq, content_hash) "
+            f"SELECT rowid, id, title, content, {created_at}, {updated_at}, "
+            "owner_id, version, seq, content_hash FROM notemodel"))
+        connection.execute(text("DROP TABLE notemodel"))
+        connection.execute(text("ALTER TABLE notemodel_new RENAME TO notemodel"))
+        create_note_owner_indexes(connection)
+        connection.execute(
+            text("CREATE UNIQUE INDEX ux_notemodel_owner_id_title "
+                 "ON notemodel (owner_id, title)"))
+        connection.execute(
+            text("CREATE INDEX ix_notemodel_owner_id_seq "
+                 "ON notemodel (owner_id, seq)"))
+        connection.execute(
+            text("CREATE INDEX ix_notemodel_content_hash "
+                 "ON notemodel (content_hash)"))
+        search.create_search_index(connection)
+        search.upgrade_search_triggers(connection)
+        changes.create_change_triggers(connection)
+        blobs.create_blob_triggers(connection)
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_notemodel_owner_id_created_at "
+             "ON notemodel (owner_id, created_at, id)"))
+
+
+@migration("0008_note_tags")
+def add_note_tags(connection: Connection) -> None:
+    # The tables are new, so create_all has made them; only the triggers
+    # and counts need setting up.
+    tags.create_tag_triggers(connection)
+    tags.recount_tags(connection)
+
+
+@migration("0009_tombstone_datetime")
+def convert_tombstone_timestamps(connection: Connection) -> None:
+    # Tombstones were written as second-precision text; rewrite them in the
+    # format UTCDateTime reads and recreate the trigger that inserts them.
+    connection.execute(text(
+        f"UPDATE notetombstonemodel SET deleted_at = coalesce("
+        f"strftime('{SQLITE_NOW_FORMAT}', deleted_at), {SQLITE_NOW.text})"))
+    connection.execute(text("DROP TRIGGER IF EXISTS notemodel_seq_delete"))
+    changes.create_change_triggers(connection)
+
+
+@migration("0010_note_search_external_content")
+def use_external_content_search_index(connection: Connection) -> None:
+    # Only the index is kept; bodies are read back from notemodel.
+    search.create_external_content_index(connection)
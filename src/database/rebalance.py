@@ -0,0 +1,144 @@
+"""Move owners whose shard changed after DB_SHARDS or DB_SHARD_VNODES did.
+
+    DB_SHARDS=a=/data/a.sqlite,b=/data/b.sqlite \\
+        python -m src.database.rebalance --previous a=/data/a.sqlite
+
+--previous is the old DB_SHARDS value ("" when everything was in DB_URL).
+Run it while the app is stopped: each owner's rows are copied to the new
+shard in one transaction and then deleted from the old one in another.
+Copies skip rows that already exist, so an interrupted run can be repeated.
+"""
+import argparse
+from dataclasses import dataclass
+from uuid import UUID
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import SQLModel
+
+from src.config.cfg import SETTINGS
+from src.database import shards
+from src.database.db import build_engine
+from src.database.shards import HashRing
+from src.models.blob import NoteBlobModel as Blob
+from src.models.change import ChangeSequenceModel as Sequence
+from src.models.change import NoteTombstoneModel as Tombstone
+from src.models.note import NoteModel as Note
+from src.models.tag import NoteTagModel as NoteTag
+from src.models.tag import TagModel as Tag
+from src.models.user import UserModel as User
+
+
+@dataclass(frozen=True)
+class Move:
+    owner_id: UUID
+    source: str
+    target: str
+
+
+def _locate(layout: dict[str, str], vnodes: int):
+    ring = HashRing(layout, vnodes) if layout else None
+
+    def locate(owner_id: UUID) -> str:
+        return layout[ring.shard_for(owner_id)] if ring else SETTINGS.DB_URL
+
+    return locate
+
+
+def plan_moves(owner_ids: list[UUID], previous: dict[str, str],
+               current: dict[str, str], previous_vnodes: int,
+               vnodes: int) -> list[Move]:
+    """Pairs each owner whose database file changed with its old and new
+    location. Layouts are {shard name: path}; {} means DB_URL only."""
+    before = _locate(previous, previous_vnodes)
+    after = _locate(current, vnodes)
+    return [Move(owner_id, before(owner_id), after(owner_id))
+            for owner_id in owner_ids if before(owner_id) != after(owner_id)]
+
+
+def _copy(source: Connection, target: Connection, table, query) -> int:
+    rows = [dict(row._mapping) for row in source.execute(query)]
+    if rows:
+        target.execute(insert(table).on_conflict_do_nothing(), rows)
+    return len(rows)
+
+
+def copy_owner(source: Connection, target: Connection, owner_id: UUID) -> int:
+    # The sequence row goes first so the note insert triggers number the
+    # copies after every cursor a client may hold; clients then re-read the
+    # moved notes as upserts.
+    _copy(source, target, Sequence.__table__,
+          select(Sequence.__table__).where(Sequence.owner_id == owner_id))
+    _copy(source, target, Blob.__table__,
+          select(Blob.__table__).where(Blob.hash.in_(
+              select(Note.content_hash).where(Note.owner_id == owner_id))))
+    notes = Note.__table__
+    copied = _copy(source, target, notes,
+                   select(*[column for column in notes.columns
+                            if column.name != "seq"]).where(
+                                Note.owner_id == owner_id))
+    _copy(source, target, Tombstone.__table__,
+          select(Tombstone.__table__).where(Tombstone.owner_id == owner_id))
+    # Counts are rebuilt by the link triggers on the target.
+    tags = Tag.__table__
+    _copy(source, target, tags,
+          select(*[column for column in tags.columns
+                   if column.name != "note_count"]).where(
+                       Tag.owner_id == owner_id))
+    _copy(source, target, NoteTag.__table__,
+          select(NoteTag.__table__).where(NoteTag.tag_id.in_(
+              select(Tag.id).where(Tag.owner_id == owner_id))))
+    return copied
+
+
+def purge_owner(connection: Connection, owner_id: UUID) -> None:
+    connection.execute(
+        delete(NoteTag).where(NoteTag.tag_id.in_(
+            select(Tag.id).where(Tag.owner_id == owner_id))))
+    connection.execute(delete(Tag).where(Tag.owner_id == owner_id))
+    # Blobs go with their last note through the notemodel triggers.
+    connection.execute(delete(Note).where(Note.owner_id == owner_id))
+    connection.execute(delete(Tombstone).where(Tombstone.owner_id == owner_id))
+    connection.execute(delete(Sequence).where(Sequence.owner_id == owner_id))
+
+
+def rebalance(previous: dict[str, str], previous_vnodes: int) -> list[Move]:
+    engines: dict[str, Engine] = {}
+
+    def engine(path: str) -> Engine:
+        if path not in engines:
+            engines[path] = build_engine(path)
+            SQLModel.metadata.create_all(engines[path])
+        return engines[path]
+
+    with engine(SETTINGS.DB_URL).connect() as directory:
+        owner_ids = list(directory.execute(select(User.id)).scalars())
+    moves = plan_moves(owner_ids, previous, shards.SHARDS, previous_vnodes,
+                       SETTINGS.DB_SHARD_VNODES)
+    for move in moves:
+        with (engine(move.source).connect() as source,
+              engine(move.target).begin() as target):
+            copied = copy_owner(source, target, move.owner_id)
+        with engine(move.source).begin() as source:
+            purge_owner(source, move.owner_id)
+        print(f"moved {move.owner_id} ({copied} notes): "
+              f"{move.source} -> {move.target}")
+    for built in engines.values():
+        built.dispose()
+    return moves
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.database.rebalance")
+    parser.add_argument("--previous", required=True,
+                        help="the DB_SHARDS value the data was written with")
+    parser.add_argument("--previous-vnodes", type=int,
+                        default=SETTINGS.DB_SHARD_VNODES)
+    args = parser.parse_args(argv)
+    moves = rebalance(shards.parse_shards(args.previous), args.previous_vnodes)
+    print(f"{len(moves)} owners moved")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.types import UTCDateTime
+
+# note_fts shares its rowid with notemodel so the triggers can keep both in
+# sync without scanning the index. owner_id is an indexed column so MATCH can
+# scope a query to one owner before ranking.
+SEARCH_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS note_fts USING fts5(
+        title, content, owner_id, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notemodel_fts_insert AFTER INSERT ON notemodel
+    BEGIN
+        INSERT INTO note_fts (rowid, title, content, owner_id)
+        VALUES (new.rowid, new.title, new.content, new.owner_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notemodel_fts_delete AFTER DELETE ON notemodel
+    BEGIN
+        DELETE FROM note_fts WHERE rowid = old.rowid;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notemodel_fts_update
+    AFTER UPDATE OF title, content, owner_id ON notemodel
+    BEGIN
+        DELETE FROM note_fts WHERE rowid = old.rowid;
+        INSERT INTO note_fts (rowid, title, content, owner_id)
+        VALUES (new.rowid, new.title, new.content, new.owner_id);
+    END
+    """,
+)
+
+_INDEXED_CONTENT = """CASE WHEN {row}.content_hash IS NULL THEN {row}.content
+        ELSE (SELECT note_body(codec, data) FROM noteblobmodel
+              WHERE hash = {row}.content_hash) END"""
+
+# Replace the SEARCH_DDL triggers once bodies can be stored in noteblobmodel,
+# so the index keeps the full text whichever way a note is stored.
+BLOB_AWARE_TRIGGERS = (
+    ("notemodel_fts_insert", f"""
+    CREATE TRIGGER notemodel_fts_insert AFTER INSERT ON notemodel
+    BEGIN
+        INSERT INTO note_fts (rowid, title, content, owner_id)
+        VALUES (new.rowid, new.title, {_INDEXED_CONTENT.format(row="new")},
+                new.owner_id);
+    END
+    """),
+    ("notemodel_fts_update", f"""
+    CREATE TRIGGER notemodel_fts_update
+    AFTER UPDATE OF title, content, content_hash, owner_id ON notemodel
+    BEGIN
+        DELETE FROM note_fts WHERE rowid = old.rowid;
+        INSERT INTO note_fts (rowid, title, content, owner_id)
+        VALUES (new.rowid, new.title, {_INDEXED_CONTENT.format(row="new")},
+                new.owner_id);
+    END
+    """),
+)
+
+# note_fts keeps its own copy of every indexed body, which for blob-stored
+# notes undoes the compression. As an external-content table it stores only
+# the index and reads bodies back (for snippet and highlight) through this
+# view, which decompresses blobs with note_body(). Deleting from such a table
+# needs the indexed values, so old rows are removed BEFORE the write, while
+# the blob they point to still exists.
+EXTERNAL_CONTENT_DDL = (
+    f"""
+    CREATE VIEW note_fts_source AS
+    SELECT rowid AS note_rowid, title,
+        {_INDEXED_CONTENT.format(row="notemodel")} AS content, owner_id
+    FROM notemodel
+    """,
+    """
+    CREATE VIRTUAL TABLE note_fts USING fts5(
+        title, content, owner_id,
+        content = 'note_fts_source', content_rowid = 'note_rowid',
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER notemodel_fts_insert AFTER INSERT ON notemodel
+    BEGIN
+        INSERT INTO note_fts (rowid, title, content, owner_id)
+        VALUES (new.rowid, new.title, {_INDEXED_CONTENT.format(row="new")},
+                new.owner_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER notemodel_fts_delete BEFORE DELETE ON notemodel
+    BEGIN
+        INSERT INTO note_fts (note_fts, rowid, title, content, owner_id)
+        VALUES ('delete', old.rowid, old.title,
+                {_INDEXED_CONTENT.format(row="old")}, old.owner_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER notemodel_fts_update_before
+    BEFORE UPDATE OF title, content, content_hash, owner_id ON notemodel
+    BEGIN
+        INSERT INTO note_fts (note_fts, rowid, title, content, owner_id)
+        VALUES ('delete', old.rowid, old.title,
+                {_INDEXED_CONTENT.format(row="old")}, old.owner_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER notemodel_fts_update
+    AFTER UPDATE OF title, content, content_hash, owner_id ON notemodel
+    BEGIN
+        INSERT INTO note_fts (rowid, title, content, owner_id)
+        VALUES (new.rowid, new.title, {_INDEXED_CONTENT.format(row="new")},
+                new.owner_id);
+    END
+    """,
+)
+
+SEARCH_QUERY = text("""
+    SELECT notemodel.id, notemodel.title, notemodel.updated_at,
+           highlight(note_fts, 0, '<mark>', '</mark>') AS title_highlight,
+           snippet(note_fts, 1, '<mark>', '</mark>', '...', :snippet_tokens)
+               AS snippet,
+           bm25(note_fts, :title_weight, 1.0, 0.0) AS score
+    FROM note_fts JOIN notemodel ON notemodel.rowid = note_fts.rowid
+    WHERE note_fts MATCH :match AND notemodel.owner_id = :owner_id
+    ORDER BY score, notemodel.id
+    LIMIT :limit OFFSET :offset
+""").columns(updated_at=UTCDateTime)
+
+TITLE_WEIGHT = 10.0
+SNIPPET_TOKENS = 16
+
+
+def create_search_index(connection: Connection) -> None:
+    for statement in SEARCH_DDL:
+        connection.execute(text(statement))
+
+
+def _has_external_content(connection: Connection) -> bool:
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master "
+             "WHERE type = 'view' AND name = 'note_fts_source'")).first() is not None
+
+
+def upgrade_search_triggers(connection: Connection) -> None:
+    # The external-content triggers already index blob bodies.
+    if _has_external_content(connection):
+        return
+    for name, statement in BLOB_AWARE_TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        connection.execute(text(statement))
+
+
+def create_external_content_index(connection: Connection) -> None:
+    """Replaces a content-storing note_fts and its triggers, then rebuilds
+    the index from notemodel."""
+    for name in ("notemodel_fts_insert", "notemodel_fts_delete",
+                 "notemodel_fts_update", "notemodel_fts_update_before"):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+    connection.execute(text("DROP TABLE IF EXISTS note_fts"))
+    connection.execute(text("DROP VIEW IF EXISTS note_fts_source"))
+    for statement in EXTERNAL_CONTENT_DDL:
+        connection.execute(text(statement))
+    connection.execute(text("INSERT INTO note_fts (note_fts) VALUES ('rebuild')"))
+
+
+def rebuild_search_index(connection: Connection) -> None:
+    connection.execute(text("DELETE FROM note_fts"))
+    connection.execute(
+        text("INSERT INTO note_fts (rowid, title, content, owner_id) "
+             "SELECT rowid, title, content, owner_id FROM notemodel"))
+
+
+def build_match(owner_id: UUID, query: str) -> str:
+    # User input is matched as plain terms: every token is quoted so FTS5
+    # operators cannot be injected, and a trailing * keeps prefix search.
+    terms = []
+    for token in query.split():
+        prefix = token.endswith("*") and len(token) > 1
+        token = token.rstrip("*").replace('"', '""')
+        if token:
+            terms.append(f'"{token}"' + ("*" if prefix else ""))
+    if not terms:
+        raise ValueError("Empty search query")
+    return f'owner_id : "{owner_id.hex}" AND ({" ".join(terms)})'
+
+
+async def search_notes(session: AsyncSession, owner_id: UUID, query: str,
+                       limit: int, offset: int = 0) -> list[dict]:
+    rows = (await session.execute(
+        SEARCH_QUERY,
+        params={
+            "match": build_match(owner_id, query),
+            "owner_id": owner_id.hex,
+            "title_weight": TITLE_WEIGHT,
+            "snippet_tokens": SNIPPET_TOKENS,
+            "limit": limit,
+            "offset": offset,
+        },
+    )).all()
+    return [{
+        "id": UUID(row.id),
+        "title": row.title,
+        "updated_at": row.updated_at,
+        "title_highlight": row.title_highlight,
+        "snippet": row.snippet,
+        "score": row.score,
+    } for row in rows]
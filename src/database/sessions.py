@@ -0,0 +1,109 @@
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from typing import Any, TypeVar
+
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+
+T = TypeVar("T")
+
+_BUFFERED = {"prebuffer_rows": True}
+
+
+class ThreadedResult:
+
+    def __init__(self, result: Any):
+        self.sync_result = result
+
+    async def partitions(self, size: int) -> AsyncIterator[list[Any]]:
+        try:
+            while rows := await run_in_threadpool(self.sync_result.fetchmany,
+                                                  size):
+                yield rows
+        finally:
+            await run_in_threadpool(self.sync_result.close)
+
+
+class ThreadedSession:
+    """Awaitable facade over a blocking ``Session``.
+
+    Mirrors the subset of ``AsyncSession`` used by the routers so they can
+    be written once and served by either engine mode. Every call that may
+    touch the database runs in the threadpool, and results are buffered
+    there so iterating them never blocks the event loop.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    @property
+    def info(self) -> dict:
+        return self.sync_session.info
+
+    def add(self, instance: Any) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances: list[Any]) -> None:
+        self.sync_session.add_all(instances)
+
+    async def run_sync(self, fn: Callable[..., T], *args: Any,
+                       **kwargs: Any) -> T:
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def exec(self, statement: Any, *, params: Any = None,
+                   execution_options: dict | None = None) -> Any:
+        options = {**(execution_options or {}), **_BUFFERED}
+        return await run_in_threadpool(self.sync_session.exec,
+                                       statement,
+                                       params=params,
+                                       execution_options=options)
+
+    async def execute(self, statement: Any, params: Any = None, *,
+                      execution_options: dict | None = None) -> Any:
+        options = {**(execution_options or {}), **_BUFFERED}
+        return await run_in_threadpool(self.sync_session.execute,
+                                       statement,
+                                       params,
+                                       execution_options=options)
+
+    async def stream(self, statement: Any, params: Any = None, *,
+                     execution_options: dict | None = None) -> ThreadedResult:
+        options = {**(execution_options or {}), "stream_results": True}
+        result = await run_in_threadpool(self.sync_session.execute,
+                                         statement,
+                                         params,
+                                         execution_options=options)
+        return ThreadedResult(result)
+
+    async def get(self, entity: Any, ident: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.get, entity, ident,
+                                       **kwargs)
+
+    async def delete(self, instance: Any) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    @asynccontextmanager
+    async def begin_nested(self) -> AsyncIterator[Any]:
+        transaction = await run_in_threadpool(self.sync_session.begin_nested)
+        try:
+            yield transaction
+        except BaseException:
+            await run_in_threadpool(transaction.rollback)
+            raise
+        else:
+            await run_in_threadpool(transaction.commit)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance: Any, **kwargs: Any) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, **kwargs)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
@@ -0,0 +1,57 @@
+import bisect
+import hashlib
+from uuid import UUID
+
+from src.config.cfg import SETTINGS
+
+
+def _point(key: str) -> int:
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class HashRing:
+    """Consistent hashing of owners onto shard names.
+
+    Each shard sits at ``vnodes`` points of the ring, so adding a shard
+    moves about 1/N of the owners, and only onto the new shard.
+    """
+
+    def __init__(self, shards, vnodes: int):
+        self.shards = tuple(shards)
+        self._points = sorted((_point(f"{shard}#{index}"), shard)
+                              for shard in self.shards
+                              for index in range(vnodes))
+        self._keys = [point for point, _ in self._points]
+
+    def shard_for(self, owner_id: UUID | str) -> str:
+        key = _point(UUID(str(owner_id)).hex)
+        index = bisect.bisect(self._keys, key) % len(self._keys)
+        return self._points[index][1]
+
+
+def parse_shards(value: str) -> dict[str, str]:
+    """Parses DB_SHARDS, "name=path,name=path", into {name: path}."""
+    shards = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        name, separator, path = (part.strip() for part in entry.partition("="))
+        if not separator or not name or not path:
+            raise ValueError(f"DB_SHARDS entries are name=path, got {entry!r}")
+        shards[name] = path
+    return shards
+
+
+SHARDS = parse_shards(SETTINGS.DB_SHARDS)
+ring = HashRing(SHARDS, SETTINGS.DB_SHARD_VNODES) if SHARDS else None
+
+
+def shard_for(owner_id: UUID | str) -> str | None:
+    """Returns the owner's shard, or None (the directory database) while
+    sharding is off."""
+    return ring.shard_for(owner_id) if ring else None
+
+
+def shard_path(shard: str | None) -> str:
+    return SETTINGS.DB_URL if shard is None else SHARDS[shard]
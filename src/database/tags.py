@@ -0,0 +1,86 @@
+from uuid import UUID, uuid4
+
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Connection
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.database.changes import NEXT_SEQ
+from src.models.tag import NoteTagModel as NoteTag
+from src.models.tag import TagModel as Tag
+
+_TAG_OWNER = "(SELECT owner_id FROM tagmodel WHERE id = {tag})"
+
+# Counts follow the link table whichever path changed it, including the
+# cascade from a deleted note. Tag changes also advance the owner's change
+# sequence, which keys the ETag of GET /me/notes?tag=.
+TAGS_DDL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS notetagmodel_count_insert
+    AFTER INSERT ON notetagmodel
+    BEGIN
+        UPDATE tagmodel SET note_count = note_count + 1 WHERE id = new.tag_id;
+        {NEXT_SEQ.format(owner=_TAG_OWNER.format(tag="new.tag_id"))}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS notetagmodel_count_delete
+    AFTER DELETE ON notetagmodel
+    BEGIN
+        UPDATE tagmodel SET note_count = note_count - 1 WHERE id = old.tag_id;
+        {NEXT_SEQ.format(owner=_TAG_OWNER.format(tag="old.tag_id"))}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notemodel_tags_delete
+    AFTER DELETE ON notemodel
+    BEGIN
+        DELETE FROM notetagmodel WHERE note_id = old.id;
+    END
+    """,
+)
+
+
+def create_tag_triggers(connection: Connection) -> None:
+    for statement in TAGS_DDL:
+        connection.execute(text(statement))
+
+
+def recount_tags(connection: Connection) -> None:
+    connection.execute(text("""
+        UPDATE tagmodel SET note_count = (
+            SELECT count(*) FROM notetagmodel WHERE tag_id = tagmodel.id)
+    """))
+
+
+async def note_tags(session: AsyncSession, note_id: UUID) -> list[str]:
+    return list((await session.exec(
+        select(Tag.name).join(NoteTag, NoteTag.tag_id == Tag.id).where(
+            NoteTag.note_id == note_id).order_by(Tag.name))).all())
+
+
+async def set_note_tags(session: AsyncSession, owner_id: UUID, note_id: UUID,
+                        names: list[str]) -> list[str]:
+    """Replaces the tags of ``note_id``, creating missing tags."""
+    if names:
+        await session.execute(
+            insert(Tag).values([{
+                "id": uuid4(),
+                "owner_id": owner_id,
+                "name": name,
+            } for name in names]).on_conflict_do_nothing(
+                index_elements=["owner_id", "name"]))
+    tag_ids = (await session.exec(
+        select(Tag.id).where(Tag.owner_id == owner_id,
+                             Tag.name.in_(names)))).all()
+    await session.execute(
+        delete(NoteTag).where(NoteTag.note_id == note_id,
+                              NoteTag.tag_id.not_in(tag_ids)))
+    if tag_ids:
+        await session.execute(
+            insert(NoteTag).values([{
+                "note_id": note_id,
+                "tag_id": tag_id,
+            } for tag_id in tag_ids]).on_conflict_do_nothing())
+    return sorted(names)
@@ -1,13 +1,41 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 
+from src.config.cfg import SETTINGS
+from src.database import groupcommit
 from src.database.db import create_db_and_tables
-from src.routers import health, notes, users
+from src.routers import admin, health, notes, tags, users
 from src.utils.auth import security
+from src.utils.compression import CompressionMiddleware
+from src.utils.metrics import MetricsMiddleware
+from src.utils.profiler import ProfilerMiddleware
+from src.utils.ratelimit import RateLimitMiddleware
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    if SETTINGS.GROUP_COMMIT:
+        groupcommit.start_committers()
+    yield
+    # Queued writes are committed and answered before the worker exits.
+    await groupcommit.stop_committers()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(CompressionMiddleware,
+                   minimum_size=SETTINGS.COMPRESSION_MINIMUM_SIZE,
+                   encodings=tuple(SETTINGS.COMPRESSION_ENCODINGS.split(",")),
+                   gzip_level=SETTINGS.COMPRESSION_GZIP_LEVEL,
+                   brotli_quality=SETTINGS.COMPRESSION_BROTLI_QUALITY)
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilerMiddleware)
+app.include_router(admin.router)
 app.include_router(health.router)
 app.include_router(notes.router)
+app.include_router(tags.router)
 app.include_router(users.router)
 security.handle_errors(app)
 
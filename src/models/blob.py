@@ -0,0 +1,9 @@
+from sqlmodel import Field, SQLModel
+
+
+class NoteBlobModel(SQLModel, table=True):
+    # Content-addressed: notes with identical bodies share one row.
+    hash: str = Field(primary_key=True)
+    codec: str
+    size: int
+    data: bytes
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from pydantic.types import UUID4
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+from src.models.types import UTCDateTime
+
+
+class ChangeSequenceModel(SQLModel, table=True):
+    owner_id: UUID4 = Field(default=None,
+                            primary_key=True,
+                            foreign_key="usermodel.id")
+    seq: int = Field(default=0)
+    # Tombstones up to this sequence have been purged.
+    purged_seq: int = Field(default=0)
+
+
+class NoteTombstoneModel(SQLModel, table=True):
+    __table_args__ = (Index("ix_notetombstonemodel_owner_id_seq", "owner_id",
+                            "seq"),)
+
+    note_id: UUID4 = Field(default=None, primary_key=True)
+    owner_id: UUID4 = Field(default=None, foreign_key="usermodel.id")
+    seq: int
+    deleted_at: datetime = Field(sa_type=UTCDateTime)
@@ -1,18 +1,51 @@
-from datetime import datetime, timezone
+from datetime import datetime
 
 from pydantic.types import UUID4
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 from sqlmodel.main import Relationship
 
+from src.models.types import SQLITE_NOW, UTCDateTime, sqlite_now
 from src.models.user import UserModel
 
 
 class NoteModel(SQLModel, table=True):
+    # Serves owner-scoped lookups through its owner_id prefix and the
+    # keyset orderings and updated_after ranges of GET /me/notes.
+    __table_args__ = (
+        Index("ix_notemodel_owner_id_updated_at", "owner_id", "updated_at",
+              "id"),
+        Index("ix_notemodel_owner_id_created_at", "owner_id", "created_at",
+              "id"),
+        Index("ux_notemodel_owner_id_title", "owner_id", "title", unique=True),
+        Index("ix_notemodel_owner_id_seq", "owner_id", "seq"),
+        Index("ix_notemodel_content_hash", "content_hash"),
+    )
+
     id: UUID4 = Field(default=None, primary_key=True)
-    title: str = Field(default=None, unique=True)
+    title: str = Field(default=None)
     content: str
-    created_at: str = Field(default=datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M"))
-    updated_at: str = Field(default=datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M"))
+    # Set by SQLite per row, on insert and on every update.
+    created_at: datetime = Field(
+        default=None,
+        sa_type=UTCDateTime,
+        sa_column_kwargs={"server_default": SQLITE_NOW})
+    updated_at: datetime = Field(
+        default=None,
+        sa_type=UTCDateTime,
+        sa_column_kwargs={"server_default": SQLITE_NOW,
+                          "onupdate": sqlite_now()})
     owner_id:UUID4 = Field(default=None, foreign_key="usermodel.id")
+    version: int = Field(default=1)
+    # Assigned by the change triggers, so it is never part of an insert and
+    # is only exposed through the change feed.
+    seq: int = Field(default=0, exclude=True,
+                     sa_column_kwargs={"server_default": "0"})
+    # Set when the body is stored in noteblobmodel, in which case content is
+    # empty. Resolved by src.database.blobs, never exposed.
+    content_hash: str | None = Field(default=None, exclude=True)
     owner: UserModel | None = Relationship(back_populates='notes')
 
+    # Reads the server-set timestamps back with RETURNING after each flush.
+    __mapper_args__ = {"eager_defaults": True}
+
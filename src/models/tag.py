@@ -0,0 +1,28 @@
+from pydantic.types import UUID4
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+
+class TagModel(SQLModel, table=True):
+    __table_args__ = (Index("ux_tagmodel_owner_id_name", "owner_id", "name",
+                            unique=True),)
+
+    id: UUID4 = Field(default=None, primary_key=True)
+    owner_id: UUID4 = Field(default=None, foreign_key="usermodel.id")
+    name: str
+    # Maintained by the notetagmodel triggers, so listing tags never counts
+    # the owner's notes.
+    note_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+
+
+class NoteTagModel(SQLModel, table=True):
+    # Clustered on (note_id, tag_id) without a rowid; the reverse index
+    # answers "notes with this tag" from the index alone.
+    __table_args__ = (Index("ix_notetagmodel_tag_id_note_id", "tag_id",
+                            "note_id"),
+                      {"sqlite_with_rowid": False})
+
+    note_id: UUID4 = Field(default=None, primary_key=True,
+                           foreign_key="notemodel.id")
+    tag_id: UUID4 = Field(default=None, primary_key=True,
+                          foreign_key="tagmodel.id")
@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, func, text
+from sqlalchemy.types import TypeDecorator
+
+# SQLite has no datetime type. Timestamps are stored as UTC text in the
+# format SQLAlchemy writes ("YYYY-MM-DD HH:MM:SS.ffffff"), so values set in
+# Python and by SQLite itself sort and compare alike.
+SQLITE_NOW_FORMAT = "%Y-%m-%d %H:%M:%f000"
+SQLITE_NOW = text(f"(strftime('{SQLITE_NOW_FORMAT}', 'now'))")
+
+
+def sqlite_now():
+    return func.strftime(SQLITE_NOW_FORMAT, "now")
+
+
+class UTCDateTime(TypeDecorator):
+    """Stores aware datetimes as naive UTC and loads them back as UTC."""
+
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value: datetime | None, _dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def process_result_value(self, value: datetime | None, _dialect):
+        if value is not None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
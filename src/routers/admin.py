@@ -0,0 +1,48 @@
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from starlette import status
+
+from src.config.cfg import SETTINGS
+from src.utils.profiler import Capture, profiler
+
+
+def admin_required(x_admin_token: str = Header(default="")) -> None:
+    if not SETTINGS.ADMIN_TOKEN or not hmac.compare_digest(
+            x_admin_token.encode(), SETTINGS.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Admin token required")
+
+
+router = APIRouter(prefix="/admin",
+                   tags=["Admin"],
+                   dependencies=[Depends(admin_required)],
+                   default_response_class=ORJSONResponse)
+
+
+def _get_capture(capture_id: int) -> Capture:
+    capture = profiler.get(capture_id)
+    if capture is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Profile not found")
+    return capture
+
+
+@router.get("/profiles")
+def list_profiles():
+    return ORJSONResponse({
+        "sample_rate": profiler.sample_rate,
+        "threshold_ms": profiler.threshold_ms,
+        "profiles": [capture.summary() for capture in reversed(profiler.captures)],
+    })
+
+
+@router.get("/profiles/{capture_id}")
+def get_profile(capture_id: int):
+    return ORJSONResponse(_get_capture(capture_id).to_dict())
+
+
+@router.get("/profiles/{capture_id}/folded", response_class=PlainTextResponse)
+def get_profile_folded(capture_id: int):
+    return PlainTextResponse(_get_capture(capture_id).folded())
@@ -1,9 +1,28 @@
 
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.utils.auth import token_cache
+from src.utils.cache import note_cache, user_cache
+from src.utils.metrics import CONTENT_TYPE, collect, render
 
 router = APIRouter()
 
 
 @router.get("/health")
 def app_health():
-    return {"Message": "Service running"}
\ No newline at end of file
+    return {"Message": "Service running"}
+
+
+@router.get("/health/cache")
+def cache_stats():
+    return {
+        "token": token_cache.stats(),
+        "user": user_cache.stats(),
+        "note": note_cache.stats(),
+    }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render(collect()), media_type=CONTENT_TYPE)
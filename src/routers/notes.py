@@ -1,72 +1,389 @@
+import asyncio
 from datetime import datetime, timezone
-from uuid import uuid4
+from typing import Literal, get_args
+from uuid import UUID, uuid4
 
 from authx.exceptions import MissingTokenError
 from authx.schema import TokenPayload
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import ValidationError
 from pydantic.types import UUID4
+from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.exc import IntegrityError, NoResultFound
-from sqlmodel import Session, select
+from sqlmodel import and_, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.database.db import get_session
+from src.config.cfg import SETTINGS
+from src.database import blobs, changes, search
+from src.database.db import (
+    get_async_read_session,
+    get_async_read_session_factory,
+    get_async_session,
+    get_directory_read_session,
+)
+from src.database.groupcommit import run_write
 from src.models.note import NoteModel as Note
+from src.models.tag import NoteTagModel as NoteTag
+from src.models.tag import TagModel as Tag
 from src.models.user import UserModel as User
-from src.schemas.notes import CreateNoteSchema, UpdateNoteSchema
-from src.utils.auth import security
+from src.schemas.notes import (
+    BatchGetSchema,
+    BatchSchema,
+    CreateNoteSchema,
+    PatchNoteSchema,
+    UpdateNoteSchema,
+)
+from src.utils import ndjson
+from src.utils.auth import access_token_required
+from src.utils.cache import note_cache, user_cache
+from src.utils.conditional import (
+    collection_etag,
+    etag_matches_strong,
+    has_conditions,
+    http_date,
+    is_not_modified,
+    note_etag,
+)
+from src.utils.events import MEDIA_TYPE, TooManyStreamsError, format_event, note_events
+from src.utils.pagination import decode_cursor, encode_cursor, parse_fields
+from src.utils.textedit import apply_edits
 
-router = APIRouter(prefix="/me", tags=["Notes"])
+router = APIRouter(prefix="/me",
+                   tags=["Notes"],
+                   default_response_class=ORJSONResponse)
 
+MAX_PAGE_SIZE = 200
+NOTE_FIELDS = ("id", "title", "content", "created_at", "updated_at",
+               "owner_id", "version")
+Sort = Literal["-updated_at", "updated_at", "-created_at", "created_at"]
+SORTS = get_args(Sort)
 
-@router.get("/notes", dependencies=[Depends(security.access_token_required)])
+
+def _cache_headers(note_id: UUID, version: int,
+                   updated_at: datetime | str) -> dict:
+    return {
+        "ETag": note_etag(note_id, version),
+        "Last-Modified": http_date(updated_at),
+    }
+
+
+async def _get_user(session: AsyncSession, user_id: str) -> dict | None:
+    user = await user_cache.get(user_id)
+    if user is None:
+        row = (await session.exec(
+            select(User.id, User.username,
+                   User.email).where(User.id == user_id))).first()
+        if row is None:
+            return None
+        user = {"id": str(row.id), "username": row.username, "email": row.email}
+        await user_cache.set(user_id, user)
+    return user
+
+
+@router.get("/notes", dependencies=[Depends(access_token_required)])
 async def get_all_notes(
-        payload: TokenPayload = Depends(security.access_token_required),
-        session: Session = Depends(get_session),
+        request: Request,
+        payload: TokenPayload = Depends(access_token_required),
+        session: AsyncSession = Depends(get_async_read_session),
+        directory: AsyncSession = Depends(get_directory_read_session),
+        limit: int = Query(default=50, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = None,
+        fields: str | None = None,
+        updated_after: datetime | None = None,
+        sort: Sort = "-updated_at",
+        tag: str | None = None,
 ):
     try:
-        user = session.exec(select(User).where(User.id == payload.sub)).first()
-        if user:
-            return {
-                "message": f"All notes from {user.username}",
-                "notes": user.notes
-            }
-        else:
+        columns = parse_fields(fields, NOTE_FIELDS)
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=str(ve)) from ve
+    sort_key = sort.lstrip("-")
+    descending = sort.startswith("-")
+    if updated_after is not None and updated_after.tzinfo is None:
+        updated_after = updated_after.replace(tzinfo=timezone.utc)
+    try:
+        keyset = None
+        if cursor:
+            cursor_sort, timestamp, last_id = decode_cursor(cursor, 3)
+            keyset = (datetime.fromisoformat(timestamp), UUID(last_id))
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail="Invalid cursor") from ve
+    # A keyset from another ordering would silently skip or repeat notes.
+    if keyset and cursor_sort != sort:
+        raise HTTPException(status_code=422,
+                            detail="Cursor was issued for another sort")
+    try:
+        # Every create, update and delete advances the owner's change
+        # sequence, so it identifies the collection state in one lookup.
+        seq, _ = await changes.current_seq(session, UUID(payload.sub))
+        etag = collection_etag(seq, request.url.query)
+        if is_not_modified(request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                            headers={"ETag": etag})
+        user = await _get_user(directory, payload.sub)
+        if user is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail="User not found")
+        # The keyset columns are always selected so the next cursor can be
+        # built, even when the caller did not ask for them.
+        selected = tuple(dict.fromkeys(columns + (sort_key, "id")))
+        # Only pages that return bodies read noteblobmodel.
+        if "content" in columns:
+            selected += ("content_hash",)
+        query = select(*[getattr(Note, name) for name in selected]).where(
+            Note.owner_id == payload.sub)
+        if updated_after is not None:
+            query = query.where(Note.updated_at > updated_after)
+        if tag is not None:
+            # Resolved through ux_tagmodel_owner_id_name and the covering
+            # (tag_id, note_id) index, without reading notetagmodel rows.
+            query = query.where(Note.id.in_(
+                select(NoteTag.note_id).join(Tag, Tag.id == NoteTag.tag_id).where(
+                    Tag.owner_id == payload.sub, Tag.name == tag)))
+        # (owner_id, <sort key>, id) indexes serve both directions.
+        column = getattr(Note, sort_key)
+        if keyset:
+            timestamp, last_id = keyset
+            if descending:
+                query = query.where(
+                    or_(column < timestamp,
+                        and_(column == timestamp, Note.id < last_id)))
+            else:
+                query = query.where(
+                    or_(column > timestamp,
+                        and_(column == timestamp, Note.id > last_id)))
+        if descending:
+            query = query.order_by(column.desc(), Note.id.desc())
+        else:
+            query = query.order_by(column, Note.id)
+        rows = (await session.exec(query.limit(limit + 1))).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(sort,
+                                        last._mapping[sort_key].isoformat(),
+                                        last.id.hex)
+        notes = await blobs.resolve_contents(
+            session, [{name: row._mapping[name] for name in selected}
+                      for row in rows])
+        return ORJSONResponse(
+            {
+                "message": f"All notes from {user['username']}",
+                "notes": [{name: note[name] for name in columns}
+                          for note in notes],
+                "next_cursor": next_cursor,
+            },
+            headers={"ETag": etag})
     except MissingTokenError:
         return HTTPException(status_code=401,
                              detail="Could not validate credentials")
 
 
+@router.get("/notes/search",
+            dependencies=[Depends(access_token_required)])
+async def search_notes(
+        q: str = Query(min_length=1),
+        payload: TokenPayload = Depends(access_token_required),
+        session: AsyncSession = Depends(get_async_read_session),
+        limit: int = Query(default=20, ge=1, le=MAX_PAGE_SIZE),
+        cursor: str | None = None,
+):
+    try:
+        offset = int(decode_cursor(cursor, 1)[0]) if cursor else 0
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail="Invalid cursor") from ve
+    try:
+        hits = await search.search_notes(session, UUID(payload.sub), q, limit + 1,
+                                   offset)
+    except ValueError as ve:
+        raise HTTPException(status_code=422,
+                            detail="Invalid search query") from ve
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_cursor(offset + limit)
+    return ORJSONResponse({
+        "query": q,
+        "results": hits,
+        "next_cursor": next_cursor
+    })
+
+
+@router.get("/notes/changes",
+            dependencies=[Depends(access_token_required)])
+async def get_note_changes(
+        since: int = Query(default=0, ge=0, le=2**63 - 1),
+        payload: TokenPayload = Depends(access_token_required),
+        session: AsyncSession = Depends(get_async_read_session),
+        limit: int = Query(default=100, ge=1, le=MAX_PAGE_SIZE),
+):
+    try:
+        return ORJSONResponse(await changes.list_changes(
+            session, UUID(payload.sub), since, limit, NOTE_FIELDS))
+    except changes.ChangesPurgedError as ex:
+        raise HTTPException(status_code=status.HTTP_410_GONE,
+                            detail="Changes since this cursor were purged, "
+                            "resync from since=0") from ex
+
+
+@router.get("/notes/events",
+            dependencies=[Depends(access_token_required)])
+async def stream_note_events(
+        payload: TokenPayload = Depends(access_token_required)):
+    if note_events.is_full(payload.sub):
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail="Too many event streams")
+    duration = SETTINGS.EVENTS_MAX_DURATION
+    if payload.exp is not None:
+        remaining = payload.expiry_datetime - datetime.now(timezone.utc)
+        duration = min(duration, remaining.total_seconds())
+
+    async def stream():
+        # Subscribed here rather than in the handler so the finally below
+        # always releases it, however the response ends.
+        try:
+            subscription = note_events.subscribe(payload.sub)
+        except TooManyStreamsError:
+            # Another stream of this user took the last slot meanwhile.
+            yield format_event("busy")
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration
+        try:
+            yield format_event("ready")
+            while True:
+                timeout = min(SETTINGS.EVENTS_HEARTBEAT, deadline - loop.time())
+                if timeout <= 0:
+                    break
+                event = await subscription.get(timeout)
+                # A dropped consumer has missed events and has to catch up
+                # from /me/notes/changes before listening again.
+                if subscription.overflowed:
+                    yield format_event("overflow")
+                    break
+                # Heartbeats keep proxies from timing the stream out.
+                yield b": keepalive\n\n" if event is None else format_event(
+                    event["op"], event)
+        finally:
+            note_events.unsubscribe(subscription)
+
+    return StreamingResponse(stream(),
+                             media_type=MEDIA_TYPE,
+                             headers={"Cache-Control": "no-cache",
+                                      "X-Accel-Buffering": "no"})
+
+
 @router.get("/notes/{note_id}",
-            dependencies=[Depends(security.access_token_required)])
-async def get_note(note_id: UUID4, session: Session = Depends(get_session)):
+            dependencies=[Depends(access_token_required)])
+async def get_note(note_id: UUID4,
+                   request: Request,
+                   payload: TokenPayload = Depends(access_token_required),
+                   session: AsyncSession = Depends(get_async_read_session)):
     try:
-        note = session.exec(select(Note).where(Note.id == note_id)).one()
-        if note:
-            return note
+        note = await note_cache.get(note_id)
+        # The cache is keyed by id alone, so ownership is checked on hits.
+        if note is not None and UUID(str(note["owner_id"])) != UUID(payload.sub):
+            raise NoResultFound()
+        if note is None:
+            if has_conditions(request):
+                version, updated_at = (await session.exec(
+                    select(Note.version, Note.updated_at).where(
+                        Note.id == note_id,
+                        Note.owner_id == payload.sub))).one()
+                headers = _cache_headers(note_id, version, updated_at)
+                if is_not_modified(request, headers["ETag"],
+                                   headers["Last-Modified"]):
+                    return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                                    headers=headers)
+            row = (await session.exec(
+                select(*[getattr(Note, name) for name in NOTE_FIELDS],
+                       Note.content_hash).where(
+                           Note.id == note_id,
+                           Note.owner_id == payload.sub))).one()
+            note = (await blobs.resolve_contents(session,
+                                                 [dict(row._mapping)]))[0]
+            # Blob-sized bodies would crowd the count-bounded cache out.
+            if row.content_hash is None:
+                await note_cache.set_if_newer(note_id, note)
+        headers = _cache_headers(note_id, note["version"], note["updated_at"])
+        if is_not_modified(request, headers["ETag"], headers["Last-Modified"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+        return ORJSONResponse(note, headers=headers)
     except NoResultFound as ex:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Note not found") from ex
 
 
-@router.post("/notes", dependencies=[Depends(security.access_token_required)])
+async def _create_note(session: AsyncSession, owner_id: UUID,
+                       data: CreateNoteSchema) -> dict:
+    note = Note(id=uuid4(),
+                title=data.title,
+                content=data.content,
+                owner_id=owner_id)
+    values, blob = blobs.split_content(data.content)
+    if blob:
+        await blobs.store_blobs(session, [blob])
+    # A duplicate (owner_id, title) inserts nothing and returns no row, so
+    # the conflict is detected without a failed statement.
+    statement = (insert(Note).values(
+        **{**note.model_dump(exclude_none=True), **values})
+                 .on_conflict_do_nothing(index_elements=["owner_id", "title"])
+                 .returning(Note))
+    created = (await session.execute(statement)).scalars().first()
+    if created is None:
+        raise HTTPException(status_code=422, detail="Note already exists")
+    return {**created.model_dump(), "content": data.content}
+
+
+async def _replace_note(session: AsyncSession, owner_id: UUID, note_id: UUID,
+                        data: UpdateNoteSchema,
+                        version: int | None = None) -> dict:
+    values, blob = blobs.split_content(data.content)
+    note = (await session.exec(
+        select(Note).where(Note.owner_id == owner_id).where(
+            Note.id == note_id))).one()
+    if version is not None and note.version != version:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED,
+                            detail="Note was modified",
+                            headers={"ETag": note_etag(note_id, note.version)})
+    if blob:
+        await blobs.store_blobs(session, [blob])
+    note.title = data.title
+    note.content = values["content"]
+    note.content_hash = values["content_hash"]
+    note.version += 1
+    session.add(note)
+    await session.flush()
+    return {**note.model_dump(), "content": data.content}
+
+
+async def _delete_note(session: AsyncSession, owner_id: UUID,
+                       note_id: UUID) -> None:
+    note = (await session.exec(
+        select(Note).where(Note.id == note_id,
+                           Note.owner_id == owner_id))).one()
+    await session.delete(note)
+    await session.flush()
+
+
+@router.post("/notes", dependencies=[Depends(access_token_required)])
 async def create_note(
         new_note: CreateNoteSchema,
-        payload: TokenPayload = Depends(security.access_token_required),
-        session: Session = Depends(get_session),
+        payload: TokenPayload = Depends(access_token_required),
+        session: AsyncSession = Depends(get_async_session),
 ):
+
+    async def write(session: AsyncSession) -> dict:
+        return await _create_note(session, UUID(payload.sub), new_note)
+
     try:
-        user = session.exec(select(User).where(User.id == payload.sub)).one()
-        note = Note(id=uuid4(),
-                    title=new_note.title,
-                    content=new_note.content,
-                    owner_id=user.id,
-                    owner=user)
-        session.add(note)
-        session.commit()
-        session.refresh(note)
-        return note
+        note = await run_write(session, write)
+        await note_events.publish(payload.sub, "create", note)
+        return ORJSONResponse(note)
     except ValidationError as ve:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                             detail="Invalid data") from ve
@@ -75,45 +392,292 @@ async def create_note(
                             detail="Note already exists") from ie
 
 
+async def _insert_batch(session: AsyncSession, owner_id: UUID,
+                        batch: list[tuple[int, dict]],
+                        errors: list[dict]) -> int:
+    rows, stored = [], []
+    for _, row in batch:
+        values, blob = blobs.split_content(row["content"])
+        rows.append({**row, **values})
+        if blob:
+            stored.append(blob)
+    await blobs.store_blobs(session, stored)
+    table = Note.__table__
+    statement = (insert(table)
+                 .on_conflict_do_nothing(index_elements=["owner_id", "title"])
+                 .returning(table.c.id, table.c.title, table.c.version,
+                            table.c.updated_at))
+    result = await session.execute(statement, params=rows)
+    created = {row.id: row for row in result}
+    skipped = {row["content_hash"] for row in rows
+               if row["content_hash"] and row["id"] not in created}
+    await blobs.discard_unreferenced(session, skipped)
+    await session.commit()
+    for number, row in batch:
+        if row["id"] not in created:
+            errors.append({"line": number, "error": "Note already exists"})
+    for row in created.values():
+        await note_events.publish(owner_id, "create", row._asdict())
+    return len(created)
+
+
+@router.post("/notes:bulk",
+             dependencies=[Depends(access_token_required)])
+async def bulk_import_notes(
+        request: Request,
+        payload: TokenPayload = Depends(access_token_required),
+        session: AsyncSession = Depends(get_async_session),
+):
+    owner_id = UUID(payload.sub)
+    inserted = 0
+    errors: list[dict] = []
+    batch: list[tuple[int, dict]] = []
+    async for number, line in ndjson.iter_lines(request.stream()):
+        try:
+            data = CreateNoteSchema.model_validate_json(line)
+        except ValidationError:
+            errors.append({"line": number, "error": "Invalid data"})
+            continue
+        note = Note(id=uuid4(),
+                    title=data.title,
+                    content=data.content,
+                    owner_id=owner_id)
+        batch.append((number, note.model_dump(exclude_none=True)))
+        if len(batch) >= SETTINGS.BULK_CHUNK_SIZE:
+            inserted += await _insert_batch(session, owner_id, batch, errors)
+            batch = []
+    if batch:
+        inserted += await _insert_batch(session, owner_id, batch, errors)
+    errors.sort(key=lambda error: error["line"])
+    return ORJSONResponse({"inserted": inserted, "errors": errors})
+
+
+@router.get("/notes:export",
+            dependencies=[Depends(access_token_required)])
+async def export_notes(
+        payload: TokenPayload = Depends(access_token_required),
+        session_factory=Depends(get_async_read_session_factory),
+):
+    query = (select(*[getattr(Note, name) for name in NOTE_FIELDS],
+                    Note.content_hash)
+             .where(Note.owner_id == payload.sub)
+             .order_by(Note.updated_at, Note.id)
+             .execution_options(yield_per=SETTINGS.EXPORT_BATCH_SIZE))
+
+    async def lines():
+        async with session_factory() as session:
+            result = await session.stream(query)
+            async for rows in result.partitions(SETTINGS.EXPORT_BATCH_SIZE):
+                notes = await blobs.resolve_contents(
+                    session, [dict(row._mapping) for row in rows])
+                for note in notes:
+                    yield ndjson.dumps(note)
+
+    return StreamingResponse(lines(), media_type=ndjson.MEDIA_TYPE)
+
+
+@router.post("/notes:batchGet",
+             dependencies=[Depends(access_token_required)])
+async def batch_get_notes(
+        data: BatchGetSchema,
+        payload: TokenPayload = Depends(access_token_required),
+        session: AsyncSession = Depends(get_async_read_session),
+        fields: str | None = None,
+):
+    try:
+        columns = parse_fields(fields, NOTE_FIELDS)
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=str(ve)) from ve
+    selected = tuple(dict.fromkeys(columns + ("id",)))
+    if "content" in columns:
+        selected += ("content_hash",)
+    rows = (await session.exec(
+        select(*[getattr(Note, name) for name in selected]).where(
+            Note.owner_id == payload.sub, Note.id.in_(data.ids)))).all()
+    notes = await blobs.resolve_contents(
+        session, [{name: row._mapping[name] for name in selected}
+                  for row in rows])
+    found = {note["id"]: note for note in notes}
+    ids = list(dict.fromkeys(data.ids))
+    return ORJSONResponse({
+        "notes": [{name: found[note_id][name] for name in columns}
+                  for note_id in ids if note_id in found],
+        "missing": [note_id for note_id in ids if note_id not in found],
+    })
+
+
+@router.post("/notes:batch",
+             dependencies=[Depends(access_token_required)])
+async def batch_write_notes(
+        data: BatchSchema,
+        payload: TokenPayload = Depends(access_token_required),
+        session: AsyncSession = Depends(get_async_session),
+):
+    owner_id = UUID(payload.sub)
+
+    async def write(session: AsyncSession) -> list[dict]:
+        results = []
+        for index, operation in enumerate(data.operations):
+            try:
+                if operation.op == "create":
+                    note = await _create_note(session, owner_id, operation)
+                    results.append({"op": "create", "note": note})
+                elif operation.op == "update":
+                    note = await _replace_note(session, owner_id, operation.id,
+                                               operation, operation.version)
+                    results.append({"op": "update", "note": note})
+                else:
+                    await _delete_note(session, owner_id, operation.id)
+                    results.append({"op": "delete", "id": operation.id})
+            except NoResultFound as ex:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail={"index": index, "detail": "Note not found"}) from ex
+            except IntegrityError as ie:
+                raise HTTPException(
+                    status_code=422,
+                    detail={"index": index,
+                            "detail": "Note already exists"}) from ie
+            except HTTPException as ex:
+                raise HTTPException(status_code=ex.status_code,
+                                    detail={"index": index,
+                                            "detail": ex.detail},
+                                    headers=ex.headers) from ex
+        if any(operation.op == "delete" for operation in data.operations):
+            await changes.purge_tombstones(session, owner_id,
+                                           SETTINGS.TOMBSTONE_RETENTION_DAYS)
+        return results
+
+    # All operations share one transaction: the first failure rolls the
+    # whole batch back and is reported with its index.
+    results = await run_write(session, write)
+    for result in results:
+        if result["op"] == "update":
+            await note_cache.invalidate(result["note"]["id"],
+                                        result["note"]["version"])
+        elif result["op"] == "delete":
+            await note_cache.invalidate(result["id"])
+        await note_events.publish(owner_id, result["op"],
+                                  result.get("note") or {"id": result["id"]})
+    return ORJSONResponse({"results": results})
+
+
 @router.put("/notes/{note_id}",
-            dependencies=[Depends(security.access_token_required)])
+            dependencies=[Depends(access_token_required)])
 async def update_note(
         note_id: UUID4,
         data: UpdateNoteSchema,
-        payload: TokenPayload = Depends(security.access_token_required),
-        session: Session = Depends(get_session),
+        payload: TokenPayload = Depends(access_token_required),
+        session: AsyncSession = Depends(get_async_session),
 ):
+
+    async def write(session: AsyncSession) -> dict:
+        return await _replace_note(session, UUID(payload.sub), note_id, data)
+
     try:
-        note = session.exec(
-            select(Note).where(Note.owner_id == payload.sub).where(
-                Note.id == note_id)).one()
-        note.title = data.title
-        note.content = data.content
-        note.updated_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M")
-        session.add(note)
-        session.commit()
-        session.refresh(note)
-        return note
+        note = await run_write(session, write)
+        await note_cache.invalidate(note_id, note["version"])
+        await note_events.publish(payload.sub, "update", note)
+        return ORJSONResponse(note)
     except ValidationError as ve:
         raise HTTPException(status_code=422, detail="Invalid data") from ve
+    except IntegrityError as ie:
+        raise HTTPException(status_code=422,
+                            detail="Note already exists") from ie
     except NoResultFound as ex:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Note not found") from ex
 
 
+@router.patch("/notes/{note_id}",
+              dependencies=[Depends(access_token_required)])
+async def patch_note(
+        note_id: UUID4,
+        data: PatchNoteSchema,
+        request: Request,
+        payload: TokenPayload = Depends(access_token_required),
+        session: AsyncSession = Depends(get_async_session),
+):
+    if_match = request.headers.get("if-match")
+    if if_match is None:
+        raise HTTPException(status_code=status.HTTP_428_PRECONDITION_REQUIRED,
+                            detail="If-Match header required")
+
+    async def write(session: AsyncSession) -> dict:
+        row = (await session.exec(
+            select(*[getattr(Note, name) for name in NOTE_FIELDS],
+                   Note.content_hash).where(
+                       Note.id == note_id,
+                       Note.owner_id == payload.sub))).first()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail="Note not found")
+        note = dict(row._mapping)
+        base_version = note["version"]
+        if not etag_matches_strong(if_match, note_etag(note_id, base_version)):
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Note was modified",
+                headers={"ETag": note_etag(note_id, base_version)})
+        note = (await blobs.resolve_contents(session, [note]))[0]
+        content = data.content
+        if data.edits is not None:
+            try:
+                content = apply_edits(note["content"], data.edits)
+            except ValueError as ve:
+                raise HTTPException(status_code=422, detail=str(ve)) from ve
+        values = {"version": base_version + 1}
+        if data.title is not None:
+            values["title"] = data.title
+        if content is not None:
+            stored, blob = blobs.split_content(content)
+            if blob:
+                await blobs.store_blobs(session, [blob])
+            values.update(stored)
+        # The version check is repeated in the UPDATE so a concurrent write
+        # between the read above and this statement still fails with 412.
+        updated = (await session.execute(
+            update(Note).where(Note.id == note_id,
+                               Note.version == base_version).values(
+                                   **values).returning(Note.updated_at))).first()
+        if updated is None:
+            raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED,
+                                detail="Note was modified")
+        values.pop("content_hash", None)
+        note.update(values, updated_at=updated.updated_at)
+        if content is not None:
+            note["content"] = content
+        return note
+
+    try:
+        note = await run_write(session, write)
+    except IntegrityError as ie:
+        raise HTTPException(status_code=422,
+                            detail="Note already exists") from ie
+    await note_cache.invalidate(note_id, note["version"])
+    await note_events.publish(payload.sub, "update", note)
+    return ORJSONResponse(note,
+                          headers=_cache_headers(note_id, note["version"],
+                                                 note["updated_at"]))
+
+
 @router.delete("/notes/{note_id}",
-               dependencies=[Depends(security.access_token_required)])
+               dependencies=[Depends(access_token_required)])
 async def delete_note(note_id: UUID4,
                       payload: TokenPayload = Depends(
-                          security.access_token_required),
-                      session: Session = Depends(get_session)):
+                          access_token_required),
+                      session: AsyncSession = Depends(get_async_session)):
+
+    async def write(session: AsyncSession) -> None:
+        await _delete_note(session, UUID(payload.sub), note_id)
+        await changes.purge_tombstones(session, UUID(payload.sub),
+                                       SETTINGS.TOMBSTONE_RETENTION_DAYS)
+
     try:
-        note = session.exec(
-            select(Note).where(Note.id == note_id,
-                               Note.owner_id == payload.sub)).one()
-        session.delete(note)
-        session.commit()
-        return {"message": f"Note #{note_id} deleted"}
+        await run_write(session, write)
+        await note_cache.invalidate(note_id)
+        await note_events.publish(payload.sub, "delete", {"id": note_id})
+        return ORJSONResponse({"message": f"Note #{note_id} deleted"})
     except NoResultFound as result:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Note not found") from result
@@ -0,0 +1,90 @@
+from uuid import UUID
+
+from authx.schema import TokenPayload
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
+from pydantic.types import UUID4
+from sqlalchemy import delete
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.database import tags
+from src.database.db import get_async_read_session, get_async_session
+from src.database.groupcommit import run_write
+from src.models.note import NoteModel as Note
+from src.models.tag import NoteTagModel as NoteTag
+from src.models.tag import TagModel as Tag
+from src.schemas.tags import NoteTagsSchema
+from src.utils.auth import access_token_required
+
+router = APIRouter(prefix="/me",
+                   tags=["Tags"],
+                   default_response_class=ORJSONResponse)
+
+
+async def _owned_note(session: AsyncSession, note_id: UUID, owner_id: str):
+    found = (await session.exec(
+        select(Note.id).where(Note.id == note_id,
+                              Note.owner_id == owner_id))).first()
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Note not found")
+
+
+@router.get("/tags", dependencies=[Depends(access_token_required)])
+async def get_tags(payload: TokenPayload = Depends(access_token_required),
+                   session: AsyncSession = Depends(get_async_read_session)):
+    rows = (await session.exec(
+        select(Tag.name, Tag.note_count).where(
+            Tag.owner_id == payload.sub).order_by(Tag.name))).all()
+    return ORJSONResponse({
+        "tags": [{"name": row.name, "note_count": row.note_count}
+                 for row in rows]
+    })
+
+
+@router.delete("/tags/{name}", dependencies=[Depends(access_token_required)])
+async def delete_tag(name: str,
+                     payload: TokenPayload = Depends(access_token_required),
+                     session: AsyncSession = Depends(get_async_session)):
+
+    async def write(session: AsyncSession) -> None:
+        tag_id = (await session.exec(
+            select(Tag.id).where(Tag.owner_id == payload.sub,
+                                 Tag.name == name))).first()
+        if tag_id is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail="Tag not found")
+        await session.execute(delete(NoteTag).where(NoteTag.tag_id == tag_id))
+        await session.execute(delete(Tag).where(Tag.id == tag_id))
+
+    await run_write(session, write)
+    return ORJSONResponse({"message": f"Tag {name} deleted"})
+
+
+@router.get("/notes/{note_id}/tags",
+            dependencies=[Depends(access_token_required)])
+async def get_note_tags(note_id: UUID4,
+                        payload: TokenPayload = Depends(access_token_required),
+                        session: AsyncSession = Depends(get_async_read_session)):
+    await _owned_note(session, note_id, payload.sub)
+    return ORJSONResponse({
+        "id": note_id,
+        "tags": await tags.note_tags(session, note_id)
+    })
+
+
+@router.put("/notes/{note_id}/tags",
+            dependencies=[Depends(access_token_required)])
+async def set_note_tags(note_id: UUID4,
+                        data: NoteTagsSchema,
+                        payload: TokenPayload = Depends(access_token_required),
+                        session: AsyncSession = Depends(get_async_session)):
+
+    async def write(session: AsyncSession) -> list[str]:
+        await _owned_note(session, note_id, payload.sub)
+        return await tags.set_note_tags(session, UUID(payload.sub), note_id,
+                                        data.tags)
+
+    return ORJSONResponse({"id": note_id,
+                           "tags": await run_write(session, write)})
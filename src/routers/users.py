@@ -2,35 +2,51 @@ from uuid import uuid4
 
 from authx.dependencies import AuthXDependency
 from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.security.http import HTTPBasic
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette import status
 
-from src.database.db import get_session
+from src.database.db import get_directory_session
 from src.models.user import UserModel as User
 from src.schemas.users import RegisterUserSchema
-from src.utils.auth import security
-from src.utils.security_utils import check_password, hash_password
+from src.utils.auth import access_token_required, security
+from src.utils.security_utils import (HashingPoolBusy, check_password_async,
+                                     hash_password_async, needs_rehash)
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users",
+                   tags=["Users"],
+                   default_response_class=ORJSONResponse)
+
+
+def server_busy() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                         detail="Server busy, try again later",
+                         headers={"Retry-After": "1"})
 
 
 @router.post("/register")
 async def register_user(user_registration: RegisterUserSchema,
-                        session: Session = Depends(get_session)):
+                        session: AsyncSession = Depends(get_directory_session)):
+    try:
+        password = await hash_password_async(
+            user_registration.password.get_secret_value())
+    except HashingPoolBusy as ex:
+        raise server_busy() from ex
     new_user = User(
         id=uuid4(),
         username=user_registration.username,
         email=user_registration.email,
-        password=hash_password(user_registration.password.get_secret_value()),
+        password=password,
     )
     try:
         session.add(new_user)
-        session.commit()
-        session.refresh(new_user)
-        return Response(status_code=status.HTTP_201_CREATED,
-                        content=new_user.model_dump_json())
+        await session.commit()
+        await session.refresh(new_user)
+        return ORJSONResponse(status_code=status.HTTP_201_CREATED,
+                              content=new_user.model_dump())
     except Exception as ex:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT,
                             detail="Username already exists") from ex
@@ -39,10 +55,23 @@ async def register_user(user_registration: RegisterUserSchema,
 @router.post("/login")
 async def login_user(response: Response,
                      user_login: OAuth2PasswordRequestForm = Depends(HTTPBasic()),
-                     session: Session = Depends(get_session)):
-    user = session.exec(
-        select(User).where(User.username == user_login.username)).first()
-    if user and check_password(user_login.password, user.password):
+                     session: AsyncSession = Depends(get_directory_session)):
+    user = (await session.exec(
+        select(User).where(User.username == user_login.username))).first()
+    try:
+        valid = user is not None and await check_password_async(
+            user_login.password, user.password)
+    except HashingPoolBusy as ex:
+        raise server_busy() from ex
+    if valid:
+        if needs_rehash(user.password):
+            try:
+                user.password = await hash_password_async(user_login.password)
+                session.add(user)
+                await session.commit()
+            except HashingPoolBusy:
+                # The login already succeeded; upgrade the hash next time.
+                pass
         token = security.create_access_token(uid=str(user.id))
         response.headers['Authorization'] = f"Bearer {token}"
         response.status_code = 200
@@ -52,7 +81,7 @@ async def login_user(response: Response,
                             detail="Bad credentials")
 
 
-@router.post('/logout', dependencies=[Depends(security.access_token_required)])
+@router.post('/logout', dependencies=[Depends(access_token_required)])
 def logout(deps: AuthXDependency = Depends(security.get_dependency)):
     deps.unset_access_cookies()
     return Response(status_code=status.HTTP_200_OK,
@@ -1,6 +1,10 @@
 from datetime import datetime
+from typing import Annotated, Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
+from pydantic.types import UUID4
+
+MAX_BATCH_SIZE = 200
 
 
 class CreateNoteSchema(BaseModel):
@@ -12,3 +16,57 @@ class CreateNoteSchema(BaseModel):
 class UpdateNoteSchema(BaseModel):
   title:str
   content:str
+
+
+class TextEdit(BaseModel):
+  # Replaces content[start:end] of the version named by If-Match, in
+  # Unicode code points.
+  start:int = Field(ge=0)
+  end:int = Field(ge=0)
+  text:str = ""
+
+  @model_validator(mode="after")
+  def check_range(self):
+    if self.end < self.start:
+      raise ValueError("end must not be before start")
+    return self
+
+
+class PatchNoteSchema(BaseModel):
+  title:str | None = None
+  content:str | None = None
+  edits:list[TextEdit] | None = None
+
+  @model_validator(mode="after")
+  def check_fields(self):
+    if self.content is not None and self.edits is not None:
+      raise ValueError("Send either content or edits, not both")
+    if self.title is None and self.content is None and self.edits is None:
+      raise ValueError("Nothing to update")
+    return self
+
+
+class BatchGetSchema(BaseModel):
+  ids:list[UUID4] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class CreateOperation(CreateNoteSchema):
+  op:Literal["create"]
+
+
+class UpdateOperation(UpdateNoteSchema):
+  op:Literal["update"]
+  id:UUID4
+  # When set, the batch fails with 412 unless the note is at this version.
+  version:int | None = None
+
+
+class DeleteOperation(BaseModel):
+  op:Literal["delete"]
+  id:UUID4
+
+
+class BatchSchema(BaseModel):
+  operations:list[Annotated[CreateOperation | UpdateOperation | DeleteOperation,
+                            Field(discriminator="op")]] = Field(
+                                min_length=1, max_length=MAX_BATCH_SIZE)
@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field, field_validator
+
+
+class NoteTagsSchema(BaseModel):
+  tags:list[str] = Field(max_length=64)
+
+  @field_validator("tags")
+  @classmethod
+  def check_names(cls, tags):
+    names = list(dict.fromkeys(tag.strip() for tag in tags))
+    if any(not name or len(name) > 64 for name in names):
+      raise ValueError("Tag names must be 1 to 64 characters")
+    return names
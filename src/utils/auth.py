@@ -1,10 +1,58 @@
-from authx import AuthX, AuthXConfig
+from datetime import datetime, timezone
+
+from authx import AuthX, AuthXConfig, RequestToken, TokenPayload
+from authx.exceptions import AuthXException, RevokedTokenError
+from fastapi import Request
 
 from src.config.cfg import SETTINGS
+from src.utils.cache import TTLCache
+from src.utils.metrics import TOKEN_VERIFY_LATENCY
 
 config = AuthXConfig()
 config.JWT_ALGORITHM = "HS256"
 config.JWT_SECRET_KEY = SETTINGS.SECRET_KEY
 config.JWT_TOKEN_LOCATION = ['headers']
 
-security = AuthX(config=config)
\ No newline at end of file
+security = AuthX(config=config)
+
+# Verified payloads are cached per process by raw token: verifying an HS256
+# token locally is cheaper than a round-trip to a shared cache.
+token_cache = TTLCache(SETTINGS.TOKEN_CACHE_SIZE, SETTINGS.TOKEN_CACHE_TTL)
+
+
+def verify_header_token(request_token: RequestToken) -> TokenPayload:
+    payload = token_cache.get(request_token.token)
+    if payload is None:
+        with TOKEN_VERIFY_LATENCY.time():
+            payload = security.verify_token(request_token,
+                                            verify_type=True,
+                                            verify_fresh=False,
+                                            verify_csrf=False)
+        ttl = SETTINGS.TOKEN_CACHE_TTL
+        if payload.exp is not None:
+            remaining = payload.expiry_datetime - datetime.now(timezone.utc)
+            ttl = min(ttl, remaining.total_seconds())
+        token_cache.set(request_token.token, payload, ttl)
+    return payload
+
+
+def token_subject(token: str) -> str | None:
+    """Returns the subject of a valid, unrevoked access token, else None."""
+    if security.is_token_in_blocklist(token):
+        return None
+    try:
+        return verify_header_token(
+            RequestToken(token=token, location="headers")).sub
+    except (AuthXException, ValueError):
+        return None
+
+
+async def access_token_required(request: Request) -> TokenPayload:
+    request_token = await security.get_access_token_from_request(request)
+    if security.is_token_in_blocklist(request_token.token):
+        raise RevokedTokenError("Token has been revoked")
+    if request_token.location == "cookies":
+        # CSRF is checked against each request, so cookie tokens are never
+        # served from the cache.
+        return await security.access_token_required(request)
+    return verify_header_token(request_token)
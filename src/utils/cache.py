@@ -0,0 +1,220 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Protocol
+
+from src.config.cfg import SETTINGS
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries also expire after a TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+class CacheBackend(Protocol):
+
+    async def get(self, key: str) -> Any | None:
+        ...
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    async def delete(self, key: str) -> None:
+        ...
+
+    async def set_if_newer(self, key: str, value: dict, ttl: float) -> bool:
+        """Stores a versioned ``value`` unless the entry already holds a
+        newer version, or a marker left for a newer one."""
+        ...
+
+
+# Versioned entries are invalidated by a marker carrying the version the
+# write committed, so a read that raced the write cannot put back the row
+# it saw before it.
+DELETED_VERSION = 2**62
+
+
+def _is_newer(value: dict, current: dict | None) -> bool:
+    if current is None:
+        return True
+    if current.get("stale"):
+        return value["version"] >= current["version"]
+    return value["version"] > current["version"]
+
+
+class MemoryBackend:
+
+    def __init__(self, maxsize: int):
+        self._cache = TTLCache(maxsize, ttl=0)
+
+    async def get(self, key: str) -> Any | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+    async def set_if_newer(self, key: str, value: dict, ttl: float) -> bool:
+        # Nothing awaits between the read and the write, so no other request
+        # on this worker's loop can interleave.
+        if not _is_newer(value, self._cache.get(key)):
+            return False
+        self._cache.set(key, value, ttl)
+        return True
+
+
+def _json_default(value: Any) -> str:
+    # Timestamps are stored as the API renders them; UUIDs as plain strings.
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+# Compare and set in one round-trip, mirroring _is_newer.
+_SET_IF_NEWER = """
+local current = redis.call('GET', KEYS[1])
+if current then
+    local entry = cjson.decode(current)
+    local version = tonumber(ARGV[2])
+    if entry.version > version or (entry.version == version and not entry.stale) then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[3])
+return 1
+"""
+
+
+class RedisBackend:
+    """Shares entries between uvicorn workers. Values must be JSON-able."""
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError as ex:
+            raise RuntimeError(
+                "CACHE_BACKEND=redis requires the 'redis' package") from ex
+        self._client = redis.from_url(url)
+        self._set_if_newer = self._client.register_script(_SET_IF_NEWER)
+
+    async def get(self, key: str) -> Any | None:
+        raw = await self._client.get(key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self._client.set(key, json.dumps(value, default=_json_default),
+                               px=max(1, int(ttl * 1000)))
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(key)
+
+    async def set_if_newer(self, key: str, value: dict, ttl: float) -> bool:
+        return bool(await self._set_if_newer(
+            keys=[key],
+            args=[json.dumps(value, default=_json_default), value["version"],
+                  max(1, int(ttl * 1000))]))
+
+
+class Cache:
+
+    def __init__(self, name: str, backend: CacheBackend, ttl: float,
+                 enabled: bool = True):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: object) -> str:
+        return f"{self.name}:{key}"
+
+    async def get(self, key: object) -> Any | None:
+        if not self.enabled:
+            return None
+        value = await self.backend.get(self._key(key))
+        if isinstance(value, dict) and value.get("stale"):
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: object, value: Any) -> None:
+        await self.backend.set(self._key(key), value, self.ttl)
+
+    async def delete(self, key: object) -> None:
+        await self.backend.delete(self._key(key))
+
+    async def set_if_newer(self, key: object, value: dict) -> None:
+        """Read-through fill for entries that carry a ``version``."""
+        if self.enabled:
+            await self.backend.set_if_newer(self._key(key), value, self.ttl)
+
+    async def invalidate(self, key: object,
+                         version: int = DELETED_VERSION) -> None:
+        """Drops a versioned entry after a write that committed ``version``;
+        the default is for deletes, which no earlier read may undo."""
+        if self.enabled:
+            await self.backend.set(self._key(key), {
+                "version": version,
+                "stale": True
+            }, self.ttl)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def build_backend() -> CacheBackend:
+    if SETTINGS.CACHE_BACKEND == "redis":
+        return RedisBackend(SETTINGS.CACHE_URL)
+    return MemoryBackend(SETTINGS.CACHE_MAX_ENTRIES)
+
+
+_backend = build_backend()
+user_cache = Cache("user", _backend, SETTINGS.USER_CACHE_TTL)
+# A per-worker cache would miss invalidations from the other workers.
+note_cache = Cache("note", _backend, SETTINGS.NOTE_CACHE_TTL,
+                   enabled=(SETTINGS.CACHE_BACKEND == "redis" or
+                            SETTINGS.NOTE_CACHE_LOCAL))
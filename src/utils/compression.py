@@ -0,0 +1,184 @@
+import zlib
+from typing import NoReturn, Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is an optional extra
+    brotli = None
+
+# Event streams must reach the client as soon as each event is written.
+EXCLUDED_MEDIA_TYPES = ("text/event-stream",)
+
+
+class Compressor(Protocol):
+
+    def compress(self, data: bytes) -> bytes:
+        ...
+
+    def flush(self) -> bytes:
+        ...
+
+    def finish(self) -> bytes:
+        ...
+
+
+class GzipCompressor:
+
+    def __init__(self, level: int):
+        self._stream = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._stream.compress(data)
+
+    def flush(self) -> bytes:
+        return self._stream.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._stream.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+
+    def __init__(self, quality: int):
+        self._stream = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._stream.process(data)
+
+    def flush(self) -> bytes:
+        return self._stream.flush()
+
+    def finish(self) -> bytes:
+        return self._stream.finish()
+
+
+def _accepted_encodings(accept_encoding: str) -> set[str]:
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """Compresses responses with brotli or gzip, streaming included.
+
+    Bodies smaller than ``minimum_size`` are sent as is. Streamed bodies are
+    compressed chunk by chunk and flushed after each one, so clients see
+    every chunk as soon as the application sends it.
+    """
+
+    def __init__(self,
+                 app: ASGIApp,
+                 minimum_size: int = 1024,
+                 encodings: tuple[str, ...] = ("br", "gzip"),
+                 gzip_level: int = 6,
+                 brotli_quality: int = 4) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = tuple(
+            name for name in encodings if name != "br" or brotli is not None)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _negotiate(self, scope: Scope) -> str | None:
+        accepted = _accepted_encodings(
+            Headers(scope=scope).get("accept-encoding", ""))
+        for name in self.encodings:
+            if name in accepted:
+                return name
+        return None
+
+    def _compressor(self, encoding: str) -> Compressor:
+        if encoding == "br":
+            return BrotliCompressor(self.brotli_quality)
+        return GzipCompressor(self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = self._negotiate(scope) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = CompressionResponder(self.app, encoding,
+                                         self._compressor(encoding),
+                                         self.minimum_size)
+        await responder(scope, receive, send)
+
+
+class CompressionResponder:
+
+    def __init__(self, app: ASGIApp, encoding: str, compressor: Compressor,
+                 minimum_size: int) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.compressor = compressor
+        self.minimum_size = minimum_size
+        self.send: Send = unattached_send
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Hold the headers back until the first body chunk shows whether
+            # the response is worth compressing.
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = ("content-encoding" in headers or
+                                headers.get("content-type", "").startswith(
+                                    EXCLUDED_MEDIA_TYPES))
+        elif message_type != "http.response.body":
+            await self.send(message)
+        elif self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+        elif not self.started:
+            self.started = True
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(body) < self.minimum_size and not more_body:
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+                message["body"] = (self.compressor.compress(body) +
+                                   self.compressor.flush())
+            else:
+                message["body"] = (self.compressor.compress(body) +
+                                   self.compressor.finish())
+                headers["Content-Length"] = str(len(message["body"]))
+            await self.send(self.initial_message)
+            await self.send(message)
+        else:
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            compressed = self.compressor.compress(body)
+            if more_body:
+                message["body"] = compressed + self.compressor.flush()
+            else:
+                message["body"] = compressed + self.compressor.finish()
+            await self.send(message)
+
+
+async def unattached_send(_message: Message) -> NoReturn:
+    raise RuntimeError("send awaitable not set")  # pragma: no cover
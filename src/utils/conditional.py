@@ -0,0 +1,62 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from uuid import UUID
+
+from fastapi import Request
+
+
+def note_etag(note_id: UUID, version: int) -> str:
+    return f'"{note_id.hex}-{version}"'
+
+
+def collection_etag(*parts: object) -> str:
+    digest = hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def http_date(timestamp: datetime | str) -> str:
+    # Cached notes may hold the ISO string a shared cache stored.
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return format_datetime(timestamp.astimezone(timezone.utc).replace(
+        microsecond=0), usegmt=True)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison function.
+    candidates = (tag.strip().removeprefix("W/")
+                  for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+def etag_matches_strong(if_match: str, etag: str) -> bool:
+    if if_match.strip() == "*":
+        return True
+    # If-Match uses the strong comparison function: weak tags never match.
+    return etag in (tag.strip() for tag in if_match.split(","))
+
+
+def is_not_modified(request: Request, etag: str,
+                    last_modified: str | None = None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates are always GMT; a date sent without a zone is read as such.
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return parsedate_to_datetime(last_modified) <= since
+
+
+def has_conditions(request: Request) -> bool:
+    return ("if-none-match" in request.headers
+            or "if-modified-since" in request.headers)
@@ -0,0 +1,173 @@
+import asyncio
+from collections import defaultdict
+from collections.abc import Callable
+from typing import Any, Protocol
+
+import orjson
+
+from src.config.cfg import SETTINGS
+
+MEDIA_TYPE = "text/event-stream"
+
+Deliver = Callable[[str, dict], None]
+
+NOTE_EVENT_FIELDS = ("id", "title", "version", "updated_at")
+
+# Wakes a consumer waiting on a queue that was just dropped.
+_OVERFLOW: dict = {}
+
+
+def note_event(op: str, note: dict) -> dict:
+    """The payload pushed for a note write: metadata only, never the body,
+    and just the id once the note is gone."""
+    if op == "delete":
+        return {"op": op, "id": note["id"]}
+    return {"op": op, **{name: note[name] for name in NOTE_EVENT_FIELDS}}
+
+
+def format_event(event: str, data: dict[str, Any] | None = None) -> bytes:
+    payload = b"" if data is None else orjson.dumps(data)
+    return b"event: " + event.encode() + b"\ndata: " + payload + b"\n\n"
+
+
+class Subscription:
+    """Events for one stream. The queue is bounded: a consumer that falls
+    ``size`` events behind is marked overflowed and its pending events are
+    discarded, so it must resync instead of holding memory on the server."""
+
+    def __init__(self, owner_id: str, size: int):
+        self.owner_id = owner_id
+        self.overflowed = False
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=size)
+
+    def put(self, event: dict) -> bool:
+        if self.overflowed:
+            return False
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(_OVERFLOW)
+            return False
+        return True
+
+    async def get(self, timeout: float) -> dict | None:
+        """Waits up to ``timeout`` seconds for the next event; None on a
+        timeout or once the subscription has overflowed."""
+        try:
+            event = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return None if event is _OVERFLOW else event
+
+
+class EventBus(Protocol):
+
+    async def publish(self, owner_id: str, event: dict) -> None:
+        ...
+
+    def start(self, deliver: Deliver) -> None:
+        """Delivers events published by any worker to ``deliver``."""
+        ...
+
+
+class MemoryBus:
+    """Fans events out within this worker only."""
+
+    def __init__(self):
+        self._deliver: Deliver | None = None
+
+    async def publish(self, owner_id: str, event: dict) -> None:
+        if self._deliver is not None:
+            self._deliver(owner_id, event)
+
+    def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+
+class RedisBus:
+    """Relays events between uvicorn workers over one Redis channel; each
+    worker fans them out to its own streams."""
+
+    def __init__(self, url: str, channel: str = "note-events"):
+        try:
+            from redis import asyncio as redis
+        except ImportError as ex:
+            raise RuntimeError(
+                "EVENTS_BACKEND=redis requires the 'redis' package") from ex
+        self._client = redis.from_url(url)
+        self.channel = channel
+        self._task: asyncio.Task | None = None
+
+    async def publish(self, owner_id: str, event: dict) -> None:
+        await self._client.publish(
+            self.channel, orjson.dumps({"owner_id": owner_id, "event": event}))
+
+    def start(self, deliver: Deliver) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._listen(deliver))
+
+    async def _listen(self, deliver: Deliver) -> None:
+        async with self._client.pubsub() as pubsub:
+            await pubsub.subscribe(self.channel)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                data = orjson.loads(message["data"])
+                deliver(data["owner_id"], data["event"])
+
+
+def build_bus() -> EventBus:
+    if SETTINGS.EVENTS_BACKEND == "redis":
+        return RedisBus(SETTINGS.EVENTS_URL)
+    return MemoryBus()
+
+
+class TooManyStreamsError(Exception):
+    pass
+
+
+class Broker:
+    """Per-owner fan-out of note events to the streams open in this worker."""
+
+    def __init__(self, bus: EventBus, queue_size: int, max_streams: int):
+        self.bus = bus
+        self.queue_size = queue_size
+        self.max_streams = max_streams
+        self.dropped = 0
+        self._subscriptions: defaultdict[str, set[Subscription]] = defaultdict(set)
+
+    def is_full(self, owner_id: str) -> bool:
+        return len(self._subscriptions.get(owner_id, ())) >= self.max_streams
+
+    def subscribe(self, owner_id: str) -> Subscription:
+        if self.is_full(owner_id):
+            raise TooManyStreamsError(owner_id)
+        self.bus.start(self.deliver)
+        subscription = Subscription(owner_id, self.queue_size)
+        self._subscriptions[owner_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.owner_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.owner_id]
+
+    def deliver(self, owner_id: str, event: dict) -> None:
+        for subscription in list(self._subscriptions.get(owner_id, ())):
+            if not subscription.put(event):
+                self.dropped += 1
+                self.unsubscribe(subscription)
+
+    async def publish(self, owner_id: object, op: str, note: dict) -> None:
+        await self.bus.publish(str(owner_id), note_event(op, note))
+
+
+note_events = Broker(build_bus(), SETTINGS.EVENTS_QUEUE_SIZE,
+                     SETTINGS.EVENTS_MAX_STREAMS)
@@ -0,0 +1,318 @@
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config.cfg import SETTINGS
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0)
+
+OVERFLOW_LABEL = "other"
+
+
+class Histogram:
+    """Cumulative latency histogram keyed by label values."""
+
+    kind = "histogram"
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+                 max_series: int | None = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.max_series = max_series
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        if (self.max_series is not None and key not in self._series and
+                len(self._series) >= self.max_series):
+            # Bound the label cardinality instead of growing without limit.
+            key = tuple(OVERFLOW_LABEL for _ in self.labelnames)
+        return key
+
+    def observe(self, value: float, **labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            key = self._key(labels)
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "documentation": self.documentation,
+                "labelnames": list(self.labelnames),
+                "buckets": list(self.buckets),
+                "series": [[list(key), list(values)]
+                           for key, values in self._series.items()],
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics: dict[str, Histogram] = {}
+
+    def histogram(self, name: str, documentation: str,
+                  labelnames: tuple[str, ...] = (), **kwargs) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, **kwargs)
+        self.metrics[name] = metric
+        return metric
+
+    def snapshot(self) -> dict:
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def clear(self) -> None:
+        for metric in self.metrics.values():
+            metric.clear()
+
+
+def merge_snapshots(snapshots: list[dict]) -> dict:
+    merged: dict = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "series": {}})
+            for key, values in metric["series"]:
+                current = target["series"].get(tuple(key))
+                target["series"][tuple(key)] = (
+                    values if current is None else
+                    [a + b for a, b in zip(current, values, strict=True)])
+    for metric in merged.values():
+        metric["series"] = [[list(key), values]
+                            for key, values in metric["series"].items()]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+
+
+def _labels(names: list[str], values: list[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"'
+             for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value % 1 else str(int(value))
+
+
+def render(snapshot: dict) -> str:
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {metric['documentation']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric["labelnames"]
+        for key, values in sorted(metric["series"]):
+            cumulative = 0.0
+            for bound, count in zip([*metric["buckets"], "+Inf"], values[:-1],
+                                    strict=True):
+                cumulative += count
+                le = 'le="%s"' % (bound if bound == "+Inf" else _number(bound))
+                lines.append(f"{name}_bucket{_labels(names, key, le)} "
+                             f"{_number(cumulative)}")
+            lines.append(f"{name}_sum{_labels(names, key)} {values[-1]!r}")
+            lines.append(f"{name}_count{_labels(names, key)} "
+                         f"{_number(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+class MultiprocessStore:
+    """Shares metrics between uvicorn workers through snapshot files.
+
+    Each worker periodically writes its own snapshot to ``directory`` and a
+    scrape merges every file, so /metrics reports the whole server whichever
+    worker answers it. Files of exited workers are kept so counts never go
+    backwards; clear the directory when the server restarts.
+    """
+
+    def __init__(self, registry: Registry, directory: str,
+                 flush_interval: float):
+        self.registry = registry
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self._flushed_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"metrics-{os.getpid()}.json"
+
+    def flush(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(self.registry.snapshot()))
+        os.replace(temporary, self.path)
+        self._flushed_at = time.monotonic()
+
+    def maybe_flush(self) -> None:
+        if time.monotonic() - self._flushed_at < self.flush_interval:
+            return
+        if self._lock.acquire(blocking=False):
+            try:
+                self.flush()
+            finally:
+                self._lock.release()
+
+    def collect(self) -> dict:
+        snapshots = [self.registry.snapshot()]
+        for path in self.directory.glob("metrics-*.json"):
+            if path == self.path:
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return merge_snapshots(snapshots)
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.",
+    ("method", "route", "status"))
+QUERY_LATENCY = REGISTRY.histogram(
+    "db_query_duration_seconds", "SQL statement latency by fingerprint.",
+    ("statement",),
+    max_series=SETTINGS.METRICS_MAX_STATEMENTS)
+POOL_WAIT = REGISTRY.histogram("db_pool_checkout_wait_seconds",
+                               "Time spent waiting for a pooled connection.",
+                               ("pool",))
+PASSWORD_HASH_LATENCY = REGISTRY.histogram(
+    "password_hash_duration_seconds", "bcrypt hash and check time.",
+    ("operation",))
+TOKEN_VERIFY_LATENCY = REGISTRY.histogram(
+    "auth_token_verify_duration_seconds",
+    "JWT decode and verification time on token cache misses.")
+
+store = (MultiprocessStore(REGISTRY, SETTINGS.METRICS_DIR,
+                           SETTINGS.METRICS_FLUSH_INTERVAL)
+         if SETTINGS.METRICS_DIR else None)
+
+
+def collect() -> dict:
+    return store.collect() if store else REGISTRY.snapshot()
+
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|\bx'[0-9a-f]*'",
+                       re.IGNORECASE)
+_PLACEHOLDER_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+_VALUE_ROWS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str, limit: int = 200) -> str:
+    """Normalizes a statement so its label does not depend on parameters."""
+    statement = _LITERALS.sub("?", statement)
+    statement = _PLACEHOLDER_LISTS.sub("?", statement)
+    statement = _VALUE_ROWS.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()[:limit]
+
+
+def _before_cursor_execute(conn, _cursor, _statement, _parameters, _context,
+                           _executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, _cursor, statement, _parameters, _context,
+                          _executemany):
+    started = conn.info.pop("query_started", None)
+    if started is not None:
+        QUERY_LATENCY.observe(time.perf_counter() - started,
+                              statement=fingerprint(statement))
+
+
+def instrument_engine(engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class _TimedCheckout:
+    # SQLAlchemy has no "before checkout" event, so the wait is measured
+    # around the pool's own _do_get.
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started,
+                              pool=self._orig_logging_name or "default")
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+class MetricsMiddleware:
+    """Times every HTTP request under its route template."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(time.perf_counter() - started,
+                                    method=scope["method"],
+                                    route=getattr(route, "path", "unmatched"),
+                                    status=str(status))
+            if store:
+                store.maybe_flush()
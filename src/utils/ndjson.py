@@ -0,0 +1,25 @@
+from collections.abc import AsyncIterable, AsyncIterator
+from typing import Any
+
+import orjson
+
+MEDIA_TYPE = "application/x-ndjson"
+
+
+async def iter_lines(
+        chunks: AsyncIterable[bytes]) -> AsyncIterator[tuple[int, bytes]]:
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+    if buffer.strip():
+        yield number + 1, buffer
+
+
+def dumps(record: dict[str, Any]) -> bytes:
+    return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
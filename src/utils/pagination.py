@@ -0,0 +1,35 @@
+import base64
+import json
+from typing import Any
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps([str(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list[str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as ex:
+        raise InvalidCursorError("Invalid cursor") from ex
+    # encode_cursor only emits strings; anything else was not made here.
+    if (not isinstance(values, list) or len(values) != size or
+            not all(isinstance(value, str) for value in values)):
+        raise InvalidCursorError("Invalid cursor")
+    return values
+
+
+def parse_fields(fields: str | None, allowed: tuple[str, ...]) -> tuple[str, ...]:
+    if not fields:
+        return allowed
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in allowed]
+    if unknown or not requested:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return requested
@@ -0,0 +1,255 @@
+import asyncio
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from types import FrameType
+
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config.cfg import SETTINGS
+
+_ROOT = os.getcwd() + os.sep
+
+
+def _frame_label(frame: FrameType) -> str:
+    filename = frame.f_code.co_filename
+    if filename.startswith(_ROOT):
+        filename = filename[len(_ROOT):]
+    else:
+        filename = os.sep.join(filename.split(os.sep)[-2:])
+    return f"{frame.f_code.co_name} ({filename}:{frame.f_lineno})"
+
+
+def _coroutine_frames(coro) -> list[FrameType]:
+    # Task.get_stack() only returns the outermost frame of a suspended task,
+    # so the await chain is followed by hand.
+    frames = []
+    while coro is not None:
+        frame = (getattr(coro, "cr_frame", None) or
+                 getattr(coro, "gi_frame", None) or
+                 getattr(coro, "ag_frame", None))
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = (getattr(coro, "cr_await", None) or
+                getattr(coro, "gi_yieldfrom", None) or
+                getattr(coro, "ag_await", None))
+    return frames
+
+
+def _thread_frames(frame: FrameType | None, root: FrameType | None) -> list[FrameType]:
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        if frame is root:
+            break
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+class Capture:
+
+    def __init__(self, scope: Scope):
+        self.id = 0
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.route: str | None = None
+        self.status = 500
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.duration_ms = 0.0
+        # folded stack ("outer;...;inner") -> sampled wall time in ms
+        self.samples: dict[str, float] = {}
+        self.statements: list[dict] = []
+        self.dropped_statements = 0
+        self.last_sample = time.perf_counter()
+
+    def add_statement(self, statement: str, duration: float) -> None:
+        if len(self.statements) >= SETTINGS.PROFILER_MAX_STATEMENTS:
+            self.dropped_statements += 1
+            return
+        self.statements.append({
+            "statement": statement,
+            "duration_ms": round(duration * 1000, 3),
+        })
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "statements": len(self.statements) + self.dropped_statements,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            **self.summary(),
+            "sql": self.statements,
+            "dropped_statements": self.dropped_statements,
+            "samples": self.samples,
+        }
+
+    def folded(self) -> str:
+        """Stacks in the folded format read by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {max(1, round(weight))}\n"
+                       for stack, weight in self.samples.items())
+
+
+class StackSampler:
+    """Samples the stacks of in-flight profiled requests from a thread.
+
+    A request running on the event loop is read from the loop thread's real
+    stack, so CPU-bound work is attributed where it happens; a suspended one
+    is read from its await chain. Each sample is weighted by the wall time
+    since the previous one.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._active: dict[Capture, tuple] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add(self, capture: Capture) -> None:
+        loop = asyncio.get_running_loop()
+        entry = (loop, asyncio.current_task(), threading.get_ident())
+        with self._lock:
+            self._active[capture] = entry
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name="profiler",
+                                                daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def remove(self, capture: Capture) -> None:
+        with self._lock:
+            self._active.pop(capture, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                idle = not self._active
+                if idle:
+                    self._wake.clear()
+            if idle:
+                self._wake.wait()
+            time.sleep(self.interval)
+            self.sample()
+
+    def sample(self) -> None:
+        with self._lock:
+            active = list(self._active.items())
+        if not active:
+            return
+        thread_frames = sys._current_frames()
+        now = time.perf_counter()
+        for capture, (loop, task, thread_id) in active:
+            running = getattr(asyncio.tasks, "_current_tasks", {}).get(loop)
+            task_frames = _coroutine_frames(task.get_coro())
+            if running is task and task_frames:
+                frames = _thread_frames(thread_frames.get(thread_id),
+                                        task_frames[0])
+            else:
+                frames = task_frames
+            stack = ";".join(_frame_label(frame) for frame in frames)
+            weight = (now - capture.last_sample) * 1000
+            capture.last_sample = now
+            capture.samples[stack] = capture.samples.get(stack, 0.0) + weight
+
+
+class Profiler:
+
+    def __init__(self, sample_rate: float, threshold_ms: float,
+                 interval_ms: float, size: int):
+        self.sample_rate = sample_rate
+        self.threshold_ms = threshold_ms
+        self.sampler = StackSampler(interval_ms / 1000)
+        self.captures: deque[Capture] = deque(maxlen=size)
+        self._ids = itertools.count(1)
+
+    def should_profile(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def keep(self, capture: Capture) -> bool:
+        if capture.duration_ms < self.threshold_ms:
+            return False
+        capture.id = next(self._ids)
+        self.captures.append(capture)
+        return True
+
+    def get(self, capture_id: int) -> Capture | None:
+        for capture in self.captures:
+            if capture.id == capture_id:
+                return capture
+        return None
+
+
+profiler = Profiler(SETTINGS.PROFILER_SAMPLE_RATE, SETTINGS.PROFILER_THRESHOLD_MS,
+                    SETTINGS.PROFILER_INTERVAL_MS, SETTINGS.PROFILER_CAPTURES)
+
+_current_capture: ContextVar[Capture | None] = ContextVar("profiler_capture",
+                                                          default=None)
+
+
+def _before_cursor_execute(conn, _cursor, _statement, _parameters, _context,
+                           _executemany):
+    if _current_capture.get() is not None:
+        conn.info["profile_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, _cursor, statement, _parameters, _context,
+                          _executemany):
+    capture = _current_capture.get()
+    started = conn.info.pop("profile_started", None)
+    if capture is not None and started is not None:
+        capture.add_statement(statement, time.perf_counter() - started)
+
+
+def instrument_engine(engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ProfilerMiddleware:
+    """Profiles a sample of requests and keeps the ones slower than the
+    threshold, together with the SQL they issued."""
+
+    def __init__(self, app: ASGIApp, profiler: Profiler = profiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.profiler.should_profile():
+            await self.app(scope, receive, send)
+            return
+        capture = Capture(scope)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                capture.status = message["status"]
+            await send(message)
+
+        token = _current_capture.set(capture)
+        self.profiler.sampler.add(capture)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            capture.duration_ms = (time.perf_counter() - started) * 1000
+            self.profiler.sampler.remove(capture)
+            _current_capture.reset(token)
+            capture.route = getattr(scope.get("route"), "path", None)
+            self.profiler.keep(capture)
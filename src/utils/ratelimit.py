@@ -0,0 +1,222 @@
+import base64
+import binascii
+import math
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Protocol
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.config.cfg import SETTINGS
+from src.utils.auth import token_subject
+
+# Held open for minutes; capped per user by EVENTS_MAX_STREAMS instead of the
+# in-flight quota.
+STREAM_PATHS = ("/me/notes/events",)
+
+
+@dataclass(frozen=True)
+class Budget:
+    rate: float  # tokens refilled per second
+    burst: float  # bucket capacity
+
+    def scaled(self, factor: float) -> "Budget":
+        return Budget(self.rate * factor, self.burst * factor)
+
+
+class RateLimitBackend(Protocol):
+
+    async def acquire(self, key: str, budget: Budget) -> float:
+        """Takes one token; returns 0 or the seconds until one is free."""
+        ...
+
+
+class MemoryBackend:
+    """Per-worker buckets. Least recently used keys are evicted past
+    ``max_keys``, which only ever resets a bucket to full."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def acquire(self, key: str, budget: Budget) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (budget.burst, now))
+        tokens = min(budget.burst, tokens + (now - updated_at) * budget.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / budget.rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+# Refill and take in one round-trip, on the Redis clock, so every worker
+# (and host) sees the same bucket.
+_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBackend:
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError as ex:
+            raise RuntimeError(
+                "RATE_LIMIT_BACKEND=redis requires the 'redis' package") from ex
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(_TOKEN_BUCKET)
+
+    async def acquire(self, key: str, budget: Budget) -> float:
+        return float(await self._script(keys=[key],
+                                        args=[budget.rate, budget.burst]))
+
+
+def build_backend() -> RateLimitBackend:
+    if SETTINGS.RATE_LIMIT_BACKEND == "redis":
+        return RedisBackend(SETTINGS.RATE_LIMIT_URL)
+    return MemoryBackend(SETTINGS.RATE_LIMIT_MAX_KEYS)
+
+
+def route_class(method: str, path: str) -> str | None:
+    if path in ("/users/login", "/users/register"):
+        return "auth"
+    if path == "/me" or path.startswith("/me/"):
+        return "read" if method in ("GET", "HEAD") else "write"
+    return None
+
+
+def _basic_username(authorization: str) -> str | None:
+    scheme, _, credentials = authorization.partition(" ")
+    if scheme.lower() != "basic":
+        return None
+    try:
+        decoded = base64.b64decode(credentials, validate=True).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    return decoded.partition(":")[0] or None
+
+
+def _client_ip(scope: Scope, headers: Headers, trust_forwarded: bool) -> str:
+    if trust_forwarded and "x-forwarded-for" in headers:
+        return headers["x-forwarded-for"].split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _too_many_requests(retry_after: float, detail: str) -> JSONResponse:
+    return JSONResponse({"detail": detail},
+                        status_code=429,
+                        headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+class RateLimitMiddleware:
+    """Token buckets per client IP and per user for each route class.
+
+    Authenticated reads and writes are keyed by the verified JWT subject;
+    login attempts by the client IP and the username they target, so
+    password guessing is slowed down without letting anyone who knows a
+    username lock its owner out. The IP bucket gets ``ip_factor`` times
+    the user budget to leave room for clients behind one NAT.
+    Requests outside the classes (health, metrics, admin) are not limited,
+    and event streams do not count against the in-flight quota.
+    """
+
+    def __init__(self,
+                 app: ASGIApp,
+                 budgets: dict[str, Budget] | None = None,
+                 backend: RateLimitBackend | None = None,
+                 ip_factor: float | None = None,
+                 max_concurrent: int | None = None,
+                 trust_forwarded: bool | None = None) -> None:
+        self.app = app
+        self.budgets = budgets or {
+            "auth": Budget(SETTINGS.RATE_LIMIT_AUTH_RATE,
+                           SETTINGS.RATE_LIMIT_AUTH_BURST),
+            "read": Budget(SETTINGS.RATE_LIMIT_READ_RATE,
+                           SETTINGS.RATE_LIMIT_READ_BURST),
+            "write": Budget(SETTINGS.RATE_LIMIT_WRITE_RATE,
+                            SETTINGS.RATE_LIMIT_WRITE_BURST),
+        }
+        self.backend = backend or build_backend()
+        self.ip_factor = (SETTINGS.RATE_LIMIT_IP_FACTOR
+                          if ip_factor is None else ip_factor)
+        self.max_concurrent = (SETTINGS.RATE_LIMIT_MAX_CONCURRENT
+                               if max_concurrent is None else max_concurrent)
+        self.trust_forwarded = (SETTINGS.RATE_LIMIT_TRUST_FORWARDED
+                                if trust_forwarded is None else trust_forwarded)
+        # In-flight requests per user, in this worker.
+        self.in_flight: defaultdict[str, int] = defaultdict(int)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        kind = (route_class(scope["method"], scope["path"])
+                if scope["type"] == "http" and SETTINGS.RATE_LIMIT_ENABLED
+                else None)
+        if kind is None:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        authorization = headers.get("authorization", "")
+        ip = _client_ip(scope, headers, self.trust_forwarded)
+        if kind == "auth":
+            user = _basic_username(authorization)
+            bucket = None if user is None else f"{ip}:{user}"
+        else:
+            scheme, _, token = authorization.partition(" ")
+            user = token_subject(token) if scheme.lower() == "bearer" else None
+            bucket = user
+
+        budget = self.budgets[kind]
+        wait = await self.backend.acquire(f"ratelimit:{kind}:ip:{ip}",
+                                          budget.scaled(self.ip_factor))
+        if bucket is not None and not wait:
+            wait = await self.backend.acquire(f"ratelimit:{kind}:user:{bucket}",
+                                              budget)
+        if wait:
+            await _too_many_requests(wait, "Too many requests")(scope, receive,
+                                                                send)
+            return
+
+        if (user is None or kind == "auth" or not self.max_concurrent or
+                scope["path"] in STREAM_PATHS):
+            await self.app(scope, receive, send)
+            return
+        if self.in_flight[user] >= self.max_concurrent:
+            await _too_many_requests(1, "Too many concurrent requests")(
+                scope, receive, send)
+            return
+        self.in_flight[user] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight[user] -= 1
+            if not self.in_flight[user]:
+                del self.in_flight[user]
@@ -1,10 +1,50 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
 import bcrypt
 
+from src.config.cfg import SETTINGS
+from src.utils.metrics import PASSWORD_HASH_LATENCY
+
+T = TypeVar("T")
+
+
+class HashingPoolBusy(RuntimeError):
+    pass
+
+
+class HashingPool:
+
+    def __init__(self, workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="bcrypt")
+        self.max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HashingPoolBusy("Password hashing queue is full")
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+hashing_pool = HashingPool(SETTINGS.HASH_WORKERS, SETTINGS.HASH_QUEUE_DEPTH)
 
-def hash_password(password: str) -> str:
+
+def hash_password(password: str, rounds: int | None = None) -> str:
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(password_bytes, salt)
+    salt = bcrypt.gensalt(rounds or SETTINGS.BCRYPT_ROUNDS)
+    with PASSWORD_HASH_LATENCY.time(operation="hash"):
+        hashed_password = bcrypt.hashpw(password_bytes, salt)
     return hashed_password.decode('utf-8')
 
 
@@ -12,10 +52,29 @@ def check_password(input_password: str, hashed_password: str) -> bool:
     try:
         input_password_bytes = input_password.encode('utf-8')
         hashed_password_bytes = hashed_password.encode('utf-8')
-        return bcrypt.checkpw(input_password_bytes, hashed_password_bytes)
+        with PASSWORD_HASH_LATENCY.time(operation="check"):
+            return bcrypt.checkpw(input_password_bytes, hashed_password_bytes)
     except (ValueError, TypeError) as e:
         print(f"Error checking password: {e}")
         return False
     except Exception as e:
         print(f"Unexpected error: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    # bcrypt hashes look like $2b$<cost>$<salt+digest>
+    try:
+        return int(hashed_password.split('$')[2]) != SETTINGS.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+async def hash_password_async(password: str) -> str:
+    return await hashing_pool.run(hash_password, password)
+
+
+async def check_password_async(input_password: str,
+                               hashed_password: str) -> bool:
+    return await hashing_pool.run(check_password, input_password,
+                                  hashed_password)
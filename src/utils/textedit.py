@@ -0,0 +1,30 @@
+from collections.abc import Iterable
+from typing import Protocol
+
+
+class Edit(Protocol):
+    start: int
+    end: int
+    text: str
+
+
+def apply_edits(content: str, edits: Iterable[Edit]) -> str:
+    """Applies range replacements that all refer to the original ``content``.
+
+    Ranges may be given in any order but must not overlap, so the result
+    does not depend on the order the client listed them in.
+    """
+    ordered = sorted(edits, key=lambda edit: (edit.start, edit.end))
+    parts = []
+    position = 0
+    for edit in ordered:
+        if edit.end > len(content):
+            raise ValueError(f"Edit range {edit.start}-{edit.end} is past the "
+                             f"end of the content ({len(content)})")
+        if edit.start < position:
+            raise ValueError("Edit ranges overlap")
+        parts.append(content[position:edit.start])
+        parts.append(edit.text)
+        position = edit.end
+    parts.append(content[position:])
+    return "".join(parts)
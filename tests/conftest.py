@@ -0,0 +1,97 @@
+from contextlib import asynccontextmanager
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, StaticPool, create_engine, select
+
+from src.database.blobs import register_functions
+from src.database.db import (
+    get_async_read_session,
+    get_async_read_session_factory,
+    get_async_session,
+    get_directory_read_session,
+    get_directory_session,
+)
+from src.database.sessions import ThreadedSession
+from src.main import app
+from src.models.user import UserModel as User
+from src.utils.auth import security
+from src.utils.security_utils import hash_password
+
+SESSION_DEPENDENCIES = (get_async_session, get_async_read_session,
+                        get_directory_session, get_directory_read_session)
+
+USERNAME = "test_user"
+PASSWORD = "test_password"
+
+
+def create_test_engine(path):
+    engine = create_engine(f"sqlite:///{path}",
+                           connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
+    event.listen(engine, "connect", register_functions)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture(name="override_sessions")
+def override_sessions_fixture():
+    """Serves every session dependency from the given scope until the test
+    ends."""
+
+    def override(session_scope):
+
+        async def get_session():
+            async with session_scope() as session:
+                yield session
+
+        for dependency in SESSION_DEPENDENCIES:
+            app.dependency_overrides[dependency] = get_session
+        app.dependency_overrides[get_async_read_session_factory] = (
+            lambda: session_scope)
+
+    yield override
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="engine")
+def engine_fixture(tmp_path):
+    return create_test_engine(tmp_path / "test.sqlite")
+
+
+@pytest.fixture(name="session")
+def session_fixture(engine):
+    with Session(engine, expire_on_commit=False) as session:
+        yield session
+
+
+@pytest.fixture(name="client")
+def client_fixture(session: Session, override_sessions):
+
+    @asynccontextmanager
+    async def session_scope():
+        yield ThreadedSession(session)
+
+    override_sessions(session_scope)
+    # Entering the client runs the lifespan and keeps one event loop for
+    # every request, as a server would.
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def headers(session: Session):
+    """Authorizes as USERNAME, creating the user on first use. The token is
+    issued directly so tests do not spend the login rate limit."""
+    user = session.exec(select(User).where(User.username == USERNAME)).first()
+    if user is None:
+        user = User(id=uuid4(),
+                    username=USERNAME,
+                    email=f"{USERNAME}@example.com",
+                    password=hash_password(PASSWORD))
+        session.add(user)
+        session.commit()
+    token = security.create_access_token(uid=str(user.id))
+    return {"Authorization": f"Bearer {token}"}
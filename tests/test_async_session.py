@@ -0,0 +1,82 @@
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.database.blobs import register_functions
+from src.main import app
+
+
+@pytest.fixture(name="client")
+async def client_fixture(tmp_path, override_sessions):
+    """Serve the app through a real aiosqlite AsyncSession."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/async.sqlite")
+    event.listen(engine.sync_engine, "connect", register_functions)
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+    @asynccontextmanager
+    async def session_scope():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    override_sessions(session_scope)
+    async with AsyncClient(transport=ASGITransport(app=app),
+                           base_url="http://test") as client:
+        yield client
+    await engine.dispose()
+
+
+async def test_async_note_lifecycle(client: AsyncClient):
+    response = await client.post("/users/register",
+                                 json={
+                                     "username": "async_user",
+                                     "email": "async_user@example.com",
+                                     "password": "async_password"
+                                 })
+    assert response.status_code == 201
+    response = await client.post("/users/login",
+                                 auth=('async_user', 'async_password'))
+    assert response.status_code == 200
+    headers = {"Authorization": response.headers['Authorization']}
+
+    response = await client.post('/me/notes',
+                                 json={
+                                     "title": "Async",
+                                     "content": "Served by aiosqlite"
+                                 },
+                                 headers=headers)
+    assert response.status_code == 200
+    note_id = response.json()['id']
+
+    response = await client.put(f'/me/notes/{note_id}',
+                                json={
+                                    "title": "Async updated",
+                                    "content": "Still aiosqlite"
+                                },
+                                headers=headers)
+    assert response.status_code == 200
+    assert response.json()['title'] == 'Async updated'
+
+    response = await client.get('/me/notes', headers=headers)
+    assert [note['id'] for note in response.json()['notes']] == [note_id]
+
+    response = await client.get('/me/notes/search',
+                                params={"q": "aiosqlite"},
+                                headers=headers)
+    assert [hit['id'] for hit in response.json()['results']] == [note_id]
+
+    response = await client.get('/me/notes:export', headers=headers)
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert [note['id'] for note in exported] == [note_id]
+    assert exported[0]['content'] == 'Still aiosqlite'
+
+    response = await client.delete(f'/me/notes/{note_id}', headers=headers)
+    assert response.status_code == 200
+    response = await client.get(f'/me/notes/{note_id}', headers=headers)
+    assert response.status_code == 404
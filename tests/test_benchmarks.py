@@ -0,0 +1,44 @@
+import random
+
+from benchmarks.report import compare, percentile, summarize
+from benchmarks.seed import generate_notes, generate_users
+from benchmarks.workload import MIXES, parse_mix
+
+
+def test_percentile_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([], 50) == 0.0
+
+
+def test_generator_is_deterministic():
+
+    def generate(seed):
+        rng = random.Random(seed)
+        users = generate_users(rng, 2)
+        return users, [generate_notes(rng, user, 3, (5, 10)) for user in users]
+
+    assert generate(1) == generate(1)
+    assert generate(1) != generate(2)
+    users, notes = generate(1)
+    assert users[0].note_ids == [note["id"] for note in notes[0]]
+
+
+def test_summarize_and_compare():
+    samples = {"get": [(0.010, 200), (0.020, 200), (0.030, 404)],
+               "list": [(0.040, 200)]}
+    summary = summarize(samples, elapsed=2.0)
+    assert summary["total"]["requests"] == 4
+    assert summary["total"]["rps"] == 2.0
+    assert summary["operations"]["get"]["errors"] == 1
+    assert summary["operations"]["get"]["p50_ms"] == 20.0
+    table = compare({"summary": summary}, {"summary": summary})
+    assert "+0.0%" in table
+
+
+def test_parse_mix():
+    assert parse_mix("read") == MIXES["read"]
+    assert parse_mix("get=3,list") == {"get": 3, "list": 1}
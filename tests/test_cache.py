@@ -0,0 +1,105 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from src.config.cfg import SETTINGS
+from src.utils.auth import token_cache
+from src.utils.cache import Cache, MemoryBackend, TTLCache, note_cache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats() == {"hits": 2, "misses": 1, "size": 2}
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+async def test_memory_backend_round_trip():
+    backend = MemoryBackend(maxsize=4)
+    await backend.set("key", {"value": 1}, ttl=60)
+    assert await backend.get("key") == {"value": 1}
+    await backend.delete("key")
+    assert await backend.get("key") is None
+
+
+async def test_stale_fill_cannot_undo_invalidation():
+    cache = Cache("note", MemoryBackend(maxsize=4), ttl=60)
+    await cache.set_if_newer("a", {"version": 1})
+    # A read that saw version 1 finishes after the write of version 2.
+    await cache.invalidate("a", 2)
+    await cache.set_if_newer("a", {"version": 1})
+    assert await cache.get("a") is None
+    await cache.set_if_newer("a", {"version": 2})
+    assert await cache.get("a") == {"version": 2}
+
+    await cache.invalidate("a")
+    await cache.set_if_newer("a", {"version": 2})
+    assert await cache.get("a") is None
+
+
+def test_note_cache_needs_shared_backend():
+    assert note_cache.enabled == (SETTINGS.CACHE_BACKEND == "redis" or
+                                  SETTINGS.NOTE_CACHE_LOCAL)
+
+
+def test_get_note_read_through(client: TestClient, headers, monkeypatch):
+    monkeypatch.setattr(note_cache, "enabled", True)
+    response = client.post('/me/notes',
+                           json={
+                               "title": "Hot",
+                               "content": "Read often"
+                           },
+                           headers=headers)
+    note_id = response.json()['id']
+    token_hits = token_cache.hits
+    note_hits = note_cache.hits
+    first = client.get(f'/me/notes/{note_id}', headers=headers)
+    second = client.get(f'/me/notes/{note_id}', headers=headers)
+    assert first.json() == second.json()
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert note_cache.hits == note_hits + 1
+    assert token_cache.hits > token_hits
+
+    client.put(f'/me/notes/{note_id}',
+               json={
+                   "title": "Hot",
+                   "content": "Edited"
+               },
+               headers=headers)
+    response = client.get(f'/me/notes/{note_id}', headers=headers)
+    assert response.json()['content'] == 'Edited'
+
+    client.delete(f'/me/notes/{note_id}', headers=headers)
+    response = client.get(f'/me/notes/{note_id}', headers=headers)
+    assert response.status_code == 404
+
+    stats = client.get('/health/cache').json()
+    assert set(stats) == {"token", "user", "note"}
+    assert stats["note"]["hits"] == note_cache.hits
+
+
+def test_blob_bodies_are_not_cached(client: TestClient, headers, monkeypatch):
+    monkeypatch.setattr(note_cache, "enabled", True)
+    response = client.post('/me/notes',
+                           json={
+                               "title": "Large",
+                               "content": "x" * SETTINGS.NOTE_BLOB_THRESHOLD
+                           },
+                           headers=headers)
+    note_id = response.json()['id']
+    client.get(f'/me/notes/{note_id}', headers=headers)
+    note_hits = note_cache.hits
+    response = client.get(f'/me/notes/{note_id}', headers=headers)
+    assert response.json()['content'] == "x" * SETTINGS.NOTE_BLOB_THRESHOLD
+    assert note_cache.hits == note_hits
@@ -0,0 +1,205 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlmodel import SQLModel
+
+from src.config.cfg import SETTINGS
+from src.database.blobs import split_content
+from src.database.db import build_async_engine, build_engine
+from src.database.migrations import MIGRATIONS, run_migrations
+from src.main import app  # noqa: F401  registers every table model
+
+
+def pragma(connection, name: str):
+    return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_engine_profile_pragmas(tmp_path):
+    engine = build_engine(tmp_path / "profile.sqlite")
+    with engine.connect() as connection:
+        assert pragma(connection, "journal_mode") == "wal"
+        assert pragma(connection, "synchronous") == 1
+        assert pragma(connection, "busy_timeout") == SETTINGS.DB_BUSY_TIMEOUT_MS
+        assert pragma(connection, "cache_size") == SETTINGS.DB_CACHE_SIZE
+        assert pragma(connection, "query_only") == 0
+    assert engine.pool.size() == SETTINGS.DB_POOL_SIZE
+    assert engine.echo is False
+
+
+def test_read_only_engine_rejects_writes(tmp_path):
+    path = tmp_path / "read_only.sqlite"
+    with build_engine(path).begin() as connection:
+        connection.execute(text("CREATE TABLE t (x INTEGER)"))
+    with build_engine(path, read_only=True).connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM t")).scalar() == 0
+        with pytest.raises(OperationalError):
+            connection.execute(text("INSERT INTO t VALUES (1)"))
+
+
+async def test_async_engine_profile(tmp_path):
+    engine = build_async_engine(tmp_path / "async_profile.sqlite",
+                                read_only=True)
+    async with engine.connect() as connection:
+        journal = await connection.execute(text("PRAGMA journal_mode"))
+        query_only = await connection.execute(text("PRAGMA query_only"))
+        assert journal.scalar() == "wal"
+        assert query_only.scalar() == 1
+    await engine.dispose()
+
+
+def create_legacy_notes(connection):
+    connection.execute(text(
+        "CREATE TABLE usermodel (id CHAR(32) PRIMARY KEY, username VARCHAR, "
+        "email VARCHAR, password VARCHAR NOT NULL)"))
+    connection.execute(text(
+        "CREATE TABLE notemodel (id CHAR(32) PRIMARY KEY, "
+        "title VARCHAR UNIQUE, content VARCHAR NOT NULL, "
+        "created_at VARCHAR NOT NULL, updated_at VARCHAR NOT NULL, "
+        "owner_id CHAR(32) REFERENCES usermodel (id))"))
+    connection.execute(text(
+        "INSERT INTO notemodel VALUES ('0000000000000000000000000000000a', "
+        "'Legacy', 'Legacy body', '2024-01-01 10:00', '2024-01-01 10:00', "
+        "'00000000000000000000000000000001')"))
+
+
+def test_migrations_upgrade_legacy_database(tmp_path):
+    engine = build_engine(tmp_path / "legacy.sqlite")
+    with engine.begin() as connection:
+        create_legacy_notes(connection)
+    SQLModel.metadata.create_all(engine)
+    with engine.connect() as connection:
+        applied = connection.execute(
+            text("SELECT name FROM schema_migrations")).scalars().all()
+        assert [name for name, _ in MIGRATIONS] == applied
+        hits = connection.execute(
+            text("SELECT title FROM note_fts WHERE note_fts MATCH 'body'"))
+        assert hits.scalars().all() == ['Legacy']
+        plan = connection.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id, title FROM notemodel "
+            "WHERE owner_id = :owner ORDER BY updated_at DESC, id DESC"),
+            {"owner": "00000000000000000000000000000001"}).all()
+        assert "ix_notemodel_owner_id_updated_at" in plan[0].detail
+        sequence = connection.execute(
+            text("SELECT seq FROM changesequencemodel")).scalars().all()
+        assert sequence == [1]
+        timestamps = connection.execute(
+            text("SELECT created_at, updated_at FROM notemodel")).one()
+        assert tuple(timestamps) == ("2024-01-01 10:00:00.000000",) * 2
+    with engine.begin() as connection:
+        assert run_migrations(connection) == []
+        owner = "00000000000000000000000000000002"
+        connection.execute(text(
+            "INSERT INTO notemodel (id, title, content, created_at, "
+            "updated_at, owner_id) VALUES ('0000000000000000000000000000000b', "
+            "'Legacy', 'Same title, other owner', '2024-01-01 10:00', "
+            "'2024-01-01 10:00', :owner)"), {"owner": owner})
+        with pytest.raises(IntegrityError):
+            connection.execute(text(
+                "INSERT INTO notemodel (id, title, content, created_at, "
+                "updated_at, owner_id) VALUES "
+                "('0000000000000000000000000000000c', 'Legacy', 'Duplicate', "
+                "'2024-01-01 10:00', '2024-01-01 10:00', :owner)"),
+                {"owner": owner})
+        hits = connection.execute(
+            text("SELECT count(*) FROM note_fts WHERE note_fts MATCH 'owner'"))
+        assert hits.scalar() == 1
+        connection.execute(text(
+            "INSERT INTO notemodel (id, title, content, owner_id) VALUES "
+            "('0000000000000000000000000000000e', 'Defaults', 'Body', :owner)"),
+            {"owner": owner})
+        row = connection.execute(text(
+            "SELECT created_at, updated_at, seq FROM notemodel "
+            "WHERE title = 'Defaults'")).one()
+        assert row.created_at == row.updated_at > "2024-01-01 10:00:00.000000"
+        assert row.seq == 2
+
+
+def test_blob_migration_moves_large_bodies(tmp_path, monkeypatch):
+    engine = build_engine(tmp_path / "blobs.sqlite")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(SETTINGS, "NOTE_BLOB_THRESHOLD", 64)
+    body = "archived paragraph " * 10
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO notemodel (id, title, content, created_at, "
+            "updated_at, owner_id, version) VALUES "
+            "('0000000000000000000000000000000d', 'Archive', :body, "
+            "'2024-01-01 10:00', '2024-01-01 10:00', "
+            "'00000000000000000000000000000001', 1)"), {"body": body})
+        connection.execute(text("DELETE FROM schema_migrations "
+                                "WHERE name = '0006_note_blob_storage'"))
+        assert run_migrations(connection) == ["0006_note_blob_storage"]
+        row = connection.execute(
+            text("SELECT content, content_hash FROM notemodel")).one()
+        assert row.content == "" and row.content_hash is not None
+        restored = connection.execute(text(
+            "SELECT note_body(codec, data) FROM noteblobmodel "
+            "WHERE hash = :hash"), {"hash": row.content_hash}).scalar()
+        assert restored == body
+        hits = connection.execute(
+            text("SELECT title FROM note_fts WHERE note_fts MATCH 'archived'"))
+        assert hits.scalars().all() == ["Archive"]
+        connection.execute(text("DELETE FROM notemodel"))
+        blobs = connection.execute(text("SELECT count(*) FROM noteblobmodel"))
+        assert blobs.scalar() == 0
+
+
+def test_tombstone_migration_converts_timestamps(tmp_path):
+    engine = build_engine(tmp_path / "tombstones.sqlite")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO notetombstonemodel (note_id, owner_id, seq, "
+            "deleted_at) VALUES ('0000000000000000000000000000000f', "
+            "'00000000000000000000000000000001', 1, '2024-01-01 10:00:00')"))
+        connection.execute(text("DELETE FROM schema_migrations "
+                                "WHERE name = '0009_tombstone_datetime'"))
+        assert run_migrations(connection) == ["0009_tombstone_datetime"]
+        deleted_at = connection.execute(
+            text("SELECT deleted_at FROM notetombstonemodel")).scalar()
+        assert deleted_at == "2024-01-01 10:00:00.000000"
+
+
+def test_search_index_reads_blob_bodies_from_notemodel(tmp_path, monkeypatch):
+    engine = build_engine(tmp_path / "fts.sqlite")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(SETTINGS, "NOTE_BLOB_THRESHOLD", 64)
+
+    def write(connection, statement, body):
+        values, blob = split_content(body)
+        if blob:
+            connection.execute(
+                text("INSERT OR IGNORE INTO noteblobmodel (hash, codec, size, "
+                     "data) VALUES (:hash, :codec, :size, :data)"), blob)
+        connection.execute(text(statement), values)
+
+    def matches(connection, term):
+        return connection.execute(
+            text("SELECT title FROM note_fts WHERE note_fts MATCH :term"),
+            {"term": term}).scalars().all()
+
+    with engine.begin() as connection:
+        write(connection,
+              "INSERT INTO notemodel (id, title, content, content_hash, "
+              "owner_id, version) VALUES ('00000000000000000000000000000010', "
+              "'Big', :content, :content_hash, "
+              "'00000000000000000000000000000001', 1)",
+              "archived paragraph " * 10)
+        assert matches(connection, "archived") == ["Big"]
+        # The index holds no copy of the body; it is read back through the
+        # view for snippets.
+        stored = connection.execute(
+            text("SELECT count(*) FROM sqlite_master "
+                 "WHERE name = 'note_fts_content'")).scalar()
+        assert stored == 0
+
+        write(connection,
+              "UPDATE notemodel SET content = :content, "
+              "content_hash = :content_hash",
+              "rewritten chapter " * 10)
+        assert matches(connection, "archived") == []
+        assert matches(connection, "rewritten") == ["Big"]
+        connection.execute(text("DELETE FROM notemodel"))
+        assert matches(connection, "rewritten") == []
+        connection.execute(
+            text("INSERT INTO note_fts (note_fts) VALUES ('integrity-check')"))
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.config.cfg import SETTINGS
+from src.utils.events import (
+    Broker,
+    MemoryBus,
+    TooManyStreamsError,
+    format_event,
+    note_events,
+)
+
+
+def parse_events(body: str) -> list[tuple[str, str]]:
+    events = []
+    for block in body.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines()
+                     if not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], lines["data"]))
+    return events
+
+
+def test_broker_fans_out_per_owner():
+
+    async def scenario():
+        broker = Broker(MemoryBus(), queue_size=10, max_streams=2)
+        first = broker.subscribe("alice")
+        second = broker.subscribe("alice")
+        other = broker.subscribe("bob")
+        with pytest.raises(TooManyStreamsError):
+            broker.subscribe("alice")
+        await broker.publish("alice", "update", {
+            "id": 1, "title": "Note", "version": 2, "updated_at": "now",
+            "content": "not sent"})
+        expected = {"op": "update", "id": 1, "title": "Note", "version": 2,
+                    "updated_at": "now"}
+        assert await first.get(1) == expected
+        assert await second.get(1) == expected
+        assert await other.get(0.01) is None
+        await broker.publish("alice", "delete", {"id": 1, "title": "Note"})
+        assert await first.get(1) == {"op": "delete", "id": 1}
+
+        broker.unsubscribe(second)
+        broker.subscribe("alice")
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_is_dropped():
+
+    async def scenario():
+        broker = Broker(MemoryBus(), queue_size=2, max_streams=1)
+        subscription = broker.subscribe("alice")
+        for version in range(3):
+            await broker.publish("alice", "update", {
+                "id": 1, "title": "Note", "version": version,
+                "updated_at": "now"})
+        assert subscription.overflowed
+        # The pending events are gone and the consumer is woken at once.
+        assert await asyncio.wait_for(subscription.get(60), 1) is None
+        assert broker.dropped == 1
+        # The slot is freed for a reconnect.
+        broker.subscribe("alice")
+
+    asyncio.run(scenario())
+
+
+def test_format_event():
+    assert format_event("delete", {"id": 1}) == (
+        b'event: delete\ndata: {"id":1}\n\n')
+
+
+def test_stream_pushes_note_changes(client: TestClient, headers, monkeypatch):
+    monkeypatch.setattr(SETTINGS, "EVENTS_MAX_DURATION", 1.5)
+    monkeypatch.setattr(SETTINGS, "EVENTS_HEARTBEAT", 0.2)
+    created = {}
+
+    def write():
+        time.sleep(0.3)
+        note = client.post("/me/notes",
+                           json={"title": "Pushed", "content": "Body"},
+                           headers=headers).json()
+        created.update(note)
+        client.put(f"/me/notes/{note['id']}",
+                   json={"title": "Pushed", "content": "Edited"},
+                   headers=headers)
+        client.delete(f"/me/notes/{note['id']}", headers=headers)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    response = client.get("/me/notes/events", headers=headers)
+    writer.join()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "content-encoding" not in response.headers
+    assert ": keepalive" in response.text
+    events = parse_events(response.text)
+    assert [name for name, _ in events] == ["ready", "create", "update",
+                                            "delete"]
+    assert f'"id":"{created["id"]}"' in events[1][1]
+    assert '"version":2' in events[2][1]
+    assert '"content"' not in events[2][1]
+    assert not note_events._subscriptions
+
+
+def test_stream_limit_per_user(client: TestClient, headers, monkeypatch):
+    monkeypatch.setattr(SETTINGS, "EVENTS_MAX_DURATION", 0.1)
+    monkeypatch.setattr(note_events, "max_streams", 0)
+    response = client.get("/me/notes/events", headers=headers)
+    assert response.status_code == 429
+
+    monkeypatch.setattr(note_events, "max_streams", 1)
+    for _ in range(2):
+        response = client.get("/me/notes/events", headers=headers)
+        assert parse_events(response.text)[0][0] == "ready"
+    # Each finished stream gave its slot back.
+    assert not note_events._subscriptions
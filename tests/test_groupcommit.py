@@ -0,0 +1,161 @@
+import asyncio
+from contextlib import asynccontextmanager
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config.cfg import SETTINGS
+from src.database import groupcommit
+from src.database.db import build_async_engine, build_engine
+from src.database.groupcommit import GroupCommitter
+from src.main import app
+from src.models.note import NoteModel as Note
+from src.models.user import UserModel as User
+
+
+@pytest.fixture(name="engine")
+def engine_fixture(tmp_path):
+    path = tmp_path / "group.sqlite"
+    SQLModel.metadata.create_all(build_engine(path))
+    return build_async_engine(path, explicit_begin=True)
+
+
+def session_factory(engine):
+
+    @asynccontextmanager
+    async def scope():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    return scope
+
+
+def insert_note(owner_id, title):
+
+    async def operation(session):
+        session.add(Note(id=uuid4(), title=title, content="x",
+                         owner_id=owner_id))
+        await session.flush()
+        return title
+
+    return operation
+
+
+async def add_user(engine):
+    user_id = uuid4()
+    async with AsyncSession(engine) as session:
+        session.add(User(id=user_id, username="group",
+                         email="group@example.com", password="hash"))
+        await session.commit()
+    return user_id
+
+
+async def count_notes(engine):
+    async with AsyncSession(engine) as session:
+        return (await session.exec(select(func.count()).select_from(Note))).one()
+
+
+async def test_concurrent_writes_share_commits(engine):
+    owner_id = await add_user(engine)
+    committer = GroupCommitter(session_factory(engine), max_batch=8,
+                               max_delay=0.01)
+    titles = await asyncio.gather(*(committer.submit(
+        insert_note(owner_id, f"note {i}")) for i in range(20)))
+
+    assert titles == [f"note {i}" for i in range(20)]
+    assert committer.operations == 20
+    assert committer.batches < committer.operations
+    # Acknowledged writes are already committed.
+    assert await count_notes(engine) == 20
+    await committer.stop()
+
+
+async def test_stop_commits_queued_writes(engine):
+    owner_id = await add_user(engine)
+    committer = GroupCommitter(session_factory(engine), max_batch=8,
+                               max_delay=10)
+    pending = [asyncio.ensure_future(committer.submit(
+        insert_note(owner_id, f"queued {i}"))) for i in range(3)]
+    await asyncio.sleep(0)
+    await committer.stop()
+
+    assert [await future for future in pending] == [
+        f"queued {i}" for i in range(3)]
+    assert committer.batches == 1
+    assert await count_notes(engine) == 3
+
+
+async def test_failing_operation_is_rolled_back_alone(engine):
+    owner_id = await add_user(engine)
+    committer = GroupCommitter(session_factory(engine), max_batch=8,
+                               max_delay=0.01)
+
+    async def failing(session):
+        await insert_note(owner_id, "partial")(session)
+        raise HTTPException(status_code=404)
+
+    results = await asyncio.gather(committer.submit(insert_note(owner_id, "a")),
+                                   committer.submit(failing),
+                                   committer.submit(insert_note(owner_id, "a")),
+                                   committer.submit(insert_note(owner_id, "b")),
+                                   return_exceptions=True)
+
+    assert results[0] == "a" and results[3] == "b"
+    assert isinstance(results[1], HTTPException)
+    # The duplicate title violates the unique constraint on its own.
+    assert type(results[2]).__name__ == "IntegrityError"
+    assert committer.batches == 1
+    async with AsyncSession(engine) as session:
+        titles = (await session.exec(select(Note.title))).all()
+    assert sorted(titles) == ["a", "b"]
+    await committer.stop()
+
+
+@pytest.fixture(name="client")
+def client_fixture(tmp_path, monkeypatch, override_sessions):
+    path = tmp_path / "routes.sqlite"
+    SQLModel.metadata.create_all(build_engine(path))
+    override_sessions(session_factory(build_async_engine(path)))
+    monkeypatch.setattr(SETTINGS, "GROUP_COMMIT", True)
+    monkeypatch.setattr(
+        groupcommit, "committer",
+        GroupCommitter(
+            session_factory(build_async_engine(path, explicit_begin=True)), 8,
+            0.002))
+    # The lifespan starts the committer and stops it on exit.
+    with TestClient(app) as client:
+        yield client
+
+
+def test_note_routes_with_group_commit(client: TestClient):
+    client.post("/users/register",
+                json={
+                    "username": "group_user",
+                    "email": "group_user@example.com",
+                    "password": "group_password"
+                })
+    response = client.post("/users/login",
+                           auth=("group_user", "group_password"))
+    headers = {"Authorization": response.headers["Authorization"]}
+
+    response = client.post("/me/notes",
+                           json={"title": "Grouped", "content": "Body"},
+                           headers=headers)
+    assert response.status_code == 200
+    note_id = response.json()["id"]
+    assert client.post("/me/notes",
+                       json={"title": "Grouped", "content": "Body"},
+                       headers=headers).status_code == 422
+    response = client.put(f"/me/notes/{note_id}",
+                          json={"title": "Grouped", "content": "Changed"},
+                          headers=headers)
+    assert response.json()["content"] == "Changed"
+    assert client.delete(f"/me/notes/{note_id}",
+                         headers=headers).status_code == 200
+    assert client.delete(f"/me/notes/{note_id}",
+                         headers=headers).status_code == 404
+    assert groupcommit.committer.operations == 5
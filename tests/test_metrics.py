@@ -0,0 +1,88 @@
+import json
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src.database.db import build_engine
+from src.main import app
+from src.utils.metrics import (
+    POOL_WAIT,
+    QUERY_LATENCY,
+    MultiprocessStore,
+    Registry,
+    fingerprint,
+    render,
+)
+
+
+def test_histogram_render():
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency.", ("route",),
+                                   buckets=(0.1, 1.0))
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.5, route="/a")
+    histogram.observe(5, route="/a")
+    output = render(registry.snapshot())
+    assert "# TYPE latency_seconds histogram" in output
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in output
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in output
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in output
+    assert 'latency_seconds_count{route="/a"} 3' in output
+    assert 'latency_seconds_sum{route="/a"} 5.55' in output
+
+
+def test_histogram_bounds_series():
+    registry = Registry()
+    histogram = registry.histogram("q", "Q.", ("statement",), max_series=2)
+    for statement in ("a", "b", "c", "d"):
+        histogram.observe(0.01, statement=statement)
+    keys = [key for key, _ in registry.snapshot()["q"]["series"]]
+    assert keys == [["a"], ["b"], ["other"]]
+
+
+def test_fingerprint():
+    assert fingerprint("SELECT * FROM t WHERE id = 42 AND name = 'x''y'") == (
+        "SELECT * FROM t WHERE id = ? AND name = ?")
+    assert fingerprint("SELECT * FROM t WHERE id IN (?, ?, ?)") == (
+        "SELECT * FROM t WHERE id IN (?)")
+    assert fingerprint("INSERT INTO t (a) VALUES (?), (?),\n (?)") == (
+        "INSERT INTO t (a) VALUES (?)")
+
+
+def test_multiprocess_store_merges_workers(tmp_path):
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency.",
+                                   buckets=(1.0,))
+    histogram.observe(0.5)
+    other_worker = Registry()
+    other_worker.histogram("latency_seconds", "Latency.",
+                           buckets=(1.0,)).observe(2.0)
+    (tmp_path / "metrics-1.json").write_text(
+        json.dumps(other_worker.snapshot()))
+
+    store = MultiprocessStore(registry, tmp_path, 0)
+    store.flush()
+    output = render(store.collect())
+    assert 'latency_seconds_bucket{le="1"} 1' in output
+    assert "latency_seconds_count 2" in output
+
+
+def test_engine_records_queries_and_pool_wait(tmp_path):
+    engine = build_engine(tmp_path / "metrics.sqlite")
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 12345"))
+    statements = [key[0] for key, _ in QUERY_LATENCY.snapshot()["series"]]
+    assert "SELECT ?" in statements
+    pools = [key[0] for key, _ in POOL_WAIT.snapshot()["series"]]
+    assert "write" in pools
+
+
+def test_metrics_endpoint():
+    client = TestClient(app)
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert ('http_request_duration_seconds_count'
+            '{method="GET",route="/health",status="200"}') in response.text
+    assert "# TYPE db_query_duration_seconds histogram" in response.text
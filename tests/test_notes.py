@@ -1,76 +1,38 @@
+import base64
+import json
 from datetime import datetime, timezone
 from uuid import UUID
 
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.util.typing import NoneFwd
-from sqlmodel import Session, SQLModel, StaticPool, create_engine, select
+from sqlmodel import Session, select
 
-from src.database.db import get_session
+from src.config.cfg import SETTINGS
 from src.main import app
+from src.models.blob import NoteBlobModel as NoteBlob
 from src.models.note import NoteModel as Note
+from tests.conftest import create_test_engine
 
-registered_user = False
-cached_headers = None
 post_note_id = None  
 
-@pytest.fixture(name="session")
-def session_fixture():
-    engine = create_engine("sqlite:///testing.sqlite",
-                           connect_args={"check_same_thread": False},
-                           poolclass=StaticPool)
-    SQLModel.metadata.create_all(engine)
-    with Session(engine) as session:
-        yield session
 
+@pytest.fixture(name="engine", scope="module")
+def engine_fixture(tmp_path_factory):
+    # The tests below build on each other's notes, so they share a database.
+    return create_test_engine(tmp_path_factory.mktemp("notes") / "notes.sqlite")
 
-@pytest.fixture(name="client")
-def client_fixture(session: Session):
 
-    def get_session_override():
-        return session
-
-    app.dependency_overrides[get_session] = get_session_override
-    client = TestClient(app)
-    yield client
-    app.dependency_overrides.clear()
-
-
-def register_user(client: TestClient):
-    global registered_user
-    if not registered_user:
-        client.post("/users/register",
-                    json={
-                        "username": "test_user2",
-                        "email": "test_user2@example.com",
-                        "password": "test_password2"
-                    })
-        registered_user = True
-
-
-@pytest.fixture
-def get_headers(client: TestClient):
-    register_user(client)
-    global cached_headers
-    if cached_headers is None:
-        response = client.post("/users/login",
-                               auth=('test_user2', 'test_password2'))
-        cached_headers = {"Authorization": response.headers['Authorization']}
-    return cached_headers
-
-
-def test_get_no_notes(client: TestClient, get_headers):
-    headers = get_headers
+def test_get_no_notes(client: TestClient, headers):
     response = client.get('/me/notes', headers=headers)
     app.dependency_overrides.clear()
     assert response.status_code == 200
     data = response.json()
-    assert data['message'] == 'All notes from test_user2'
+    assert data['message'] == 'All notes from test_user'
     assert data['notes'] == []
 
 
-def test_post_note(client: TestClient, get_headers):
-    headers = get_headers
+def test_post_note(client: TestClient, headers):
     global post_note_id
     response = client.post('/me/notes',
                            json={
@@ -84,12 +46,12 @@ def test_post_note(client: TestClient, get_headers):
     assert type(UUID(data['id'])) == UUID
     assert data['title'] == 'Test'
     assert data['content'] == 'Test'
-    assert data['created_at'] == datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M")
-    assert data['updated_at'] == datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M")
+    created_at = datetime.fromisoformat(data['created_at'])
+    assert abs(datetime.now(timezone.utc) - created_at).total_seconds() < 60
+    assert data['updated_at'] == data['created_at']
     post_note_id = data['id'] 
     
-def test_post_note_wrong_data(client: TestClient, get_headers):
-    headers = get_headers
+def test_post_note_wrong_data(client: TestClient, headers):
     response = client.post('/me/notes',
                            json={
                                "title": 45,
@@ -115,17 +77,15 @@ def test_post_note_wrong_data(client: TestClient, get_headers):
     }
 
 
-def test_get_all_notes(client: TestClient, get_headers):
-    headers = get_headers
+def test_get_all_notes(client: TestClient, headers):
     response = client.get('/me/notes', headers=headers)
     app.dependency_overrides.clear()
     assert response.status_code == 200
     data = response.json()
-    assert data['message'] == 'All notes from test_user2'
+    assert data['message'] == 'All notes from test_user'
     assert len(data['notes']) >= 1
 
-def test_get_note(client: TestClient, get_headers):
-    headers = get_headers
+def test_get_note(client: TestClient, headers):
     global post_note_id
     response = client.get(f'/me/notes/{post_note_id}', headers=headers)
     data = response.json()
@@ -135,14 +95,12 @@ def test_get_note(client: TestClient, get_headers):
     assert data['content'] == 'Test'
 
 
-def test_get_note_wrong_id(client: TestClient, get_headers):
-    headers = get_headers
+def test_get_note_wrong_id(client: TestClient, headers):
     response = client.get('/me/notes/asfasg', headers=headers)
     assert response.status_code == 422
 
 
-def test_put_note(client: TestClient, get_headers):
-    headers = get_headers
+def test_put_note(client: TestClient, headers):
     global post_note_id
     response = client.put(f'/me/notes/{post_note_id}',
                           json={
@@ -154,11 +112,10 @@ def test_put_note(client: TestClient, get_headers):
     data = response.json()
     assert data['title'] == 'Updated Test'
     assert data['content'] == 'Updated Content'
-    assert data['updated_at'] == datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M")
+    assert data['updated_at'] > data['created_at']
 
 
-def test_put_note_wrong_data(client: TestClient, get_headers):
-    headers = get_headers
+def test_put_note_wrong_data(client: TestClient, headers):
     response = client.put('/me/notes/asdfqwr',
                           json={
                               "tittle": "Updated Test",
@@ -168,8 +125,7 @@ def test_put_note_wrong_data(client: TestClient, get_headers):
     assert response.status_code == 422
 
 
-def test_delete_note(client: TestClient,session, get_headers):
-    headers = get_headers
+def test_delete_note(client: TestClient,session, headers):
     global post_note_id
     response = client.delete(f"/me/notes/{post_note_id}", headers=headers)
     assert response.status_code == 200
@@ -178,9 +134,565 @@ def test_delete_note(client: TestClient,session, get_headers):
     assert note is None
 
 
-def test_delete_note_wrong_id(client: TestClient,session, get_headers):
-    headers = get_headers
+def test_delete_note_wrong_id(client: TestClient,session, headers):
     global post_note_id
     response = client.delete(f"/me/notes/{post_note_id}", headers=headers)
     assert response.status_code == 404
-    assert response.json() == {'detail': 'Note not found'}
\ No newline at end of file
+    assert response.json() == {'detail': 'Note not found'}
+
+def test_get_all_notes_paginated(client: TestClient, headers):
+    for index in range(3):
+        client.post('/me/notes',
+                    json={
+                        "title": f"Page {index}",
+                        "content": "Paged content"
+                    },
+                    headers=headers)
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get('/me/notes', params=params, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data['notes']) <= 2
+        seen.extend(note['id'] for note in data['notes'])
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen))
+    assert len(seen) >= 3
+
+
+def test_get_all_notes_recently_updated(client: TestClient, headers):
+    ids = [
+        client.post('/me/notes',
+                    json={
+                        "title": f"Recent {index}",
+                        "content": "Recent content"
+                    },
+                    headers=headers).json()['id'] for index in range(3)
+    ]
+    # Timestamps are per row, so notes created back to back differ.
+    response = client.get('/me/notes', params={"sort": "created_at"},
+                          headers=headers)
+    created = [note['created_at'] for note in response.json()['notes']]
+    assert created == sorted(created)
+    assert len(set(created)) == len(created)
+
+    since = client.get(f'/me/notes/{ids[1]}',
+                       headers=headers).json()['updated_at']
+    client.put(f'/me/notes/{ids[0]}',
+               json={"title": "Recent 0", "content": "Touched"},
+               headers=headers)
+    seen, cursor = [], None
+    while True:
+        params = {"updated_after": since, "sort": "updated_at", "limit": 1}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get('/me/notes', params=params, headers=headers).json()
+        seen.extend(note['id'] for note in data['notes'])
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+    assert seen == [ids[2], ids[0]]
+
+
+def test_get_all_notes_projection(client: TestClient, headers):
+    response = client.get('/me/notes',
+                          params={"fields": "id,title,updated_at"},
+                          headers=headers)
+    assert response.status_code == 200
+    for note in response.json()['notes']:
+        assert set(note) == {'id', 'title', 'updated_at'}
+
+
+def test_get_all_notes_bad_params(client: TestClient, headers):
+    response = client.get('/me/notes',
+                          params={"fields": "id,password"},
+                          headers=headers)
+    assert response.status_code == 422
+    response = client.get('/me/notes',
+                          params={"cursor": "not-a-cursor"},
+                          headers=headers)
+    assert response.status_code == 422
+    response = client.get('/me/notes',
+                          params={"sort": "title"},
+                          headers=headers)
+    assert response.status_code == 422
+    # Well-formed cursors that encode_cursor could not have produced.
+    for values in ([1, 2, 3], [None, "x", "y"]):
+        crafted = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+        response = client.get('/me/notes',
+                              params={"cursor": crafted},
+                              headers=headers)
+        assert response.status_code == 422
+    for title in ("Sorted one", "Sorted two"):
+        client.post('/me/notes',
+                    json={"title": title, "content": "Sorted"},
+                    headers=headers)
+    cursor = client.get('/me/notes',
+                        params={"limit": 1},
+                        headers=headers).json()['next_cursor']
+    response = client.get('/me/notes',
+                          params={"cursor": cursor, "sort": "created_at"},
+                          headers=headers)
+    assert response.status_code == 422
+
+
+def test_search_notes(client: TestClient, headers):
+    client.post('/me/notes',
+                json={
+                    "title": "Grocery list",
+                    "content": "Buy apples, oranges and bread"
+                },
+                headers=headers)
+    client.post('/me/notes',
+                json={
+                    "title": "Apples",
+                    "content": "Varieties worth trying"
+                },
+                headers=headers)
+    response = client.get('/me/notes/search',
+                          params={"q": "apples"},
+                          headers=headers)
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert [hit['title'] for hit in results] == ['Apples', 'Grocery list']
+    assert '<mark>apples</mark>' in results[1]['snippet']
+
+    response = client.get('/me/notes/search',
+                          params={"q": "orang*", "limit": 1},
+                          headers=headers)
+    data = response.json()
+    assert [hit['title'] for hit in data['results']] == ['Grocery list']
+    assert data['next_cursor'] is None
+
+
+def test_search_notes_other_owner(client: TestClient):
+    client.post("/users/register",
+                json={
+                    "username": "search_user",
+                    "email": "search_user@example.com",
+                    "password": "search_password"
+                })
+    response = client.post("/users/login",
+                           auth=('search_user', 'search_password'))
+    headers = {"Authorization": response.headers['Authorization']}
+    response = client.get('/me/notes/search',
+                          params={"q": "apples"},
+                          headers=headers)
+    assert response.status_code == 200
+    assert response.json()['results'] == []
+    response = client.get('/me/notes/search',
+                          params={"q": "***"},
+                          headers=headers)
+    assert response.status_code == 422
+
+
+def test_post_note_duplicate_title(client: TestClient, headers):
+    note = {"title": "Duplicate", "content": "First"}
+    response = client.post('/me/notes', json=note, headers=headers)
+    assert response.status_code == 200
+    response = client.post('/me/notes', json=note, headers=headers)
+    assert response.status_code == 422
+    assert response.json() == {'detail': 'Note already exists'}
+
+
+def test_post_note_same_title_other_owner(client: TestClient):
+    response = client.post("/users/login",
+                           auth=('search_user', 'search_password'))
+    headers = {"Authorization": response.headers['Authorization']}
+    response = client.post('/me/notes',
+                           json={
+                               "title": "Duplicate",
+                               "content": "Other owner"
+                           },
+                           headers=headers)
+    assert response.status_code == 200
+    assert response.json()['content'] == 'Other owner'
+
+
+def test_bulk_import_notes(client: TestClient, headers, monkeypatch):
+    monkeypatch.setattr(SETTINGS, "BULK_CHUNK_SIZE", 2)
+    lines = [
+        json.dumps({"title": "Bulk 1", "content": "One"}),
+        json.dumps({"title": "Bulk 2", "content": "Two"}),
+        "",
+        "{not json",
+        json.dumps({"title": "Bulk 1", "content": "Duplicate"}),
+        json.dumps({"title": "Bulk 3"}),
+        json.dumps({"title": "Bulk 3", "content": "Three"}),
+    ]
+    response = client.post('/me/notes:bulk',
+                           content="\n".join(lines).encode(),
+                           headers={**headers,
+                                    "Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.json() == {
+        "inserted": 3,
+        "errors": [
+            {"line": 4, "error": "Invalid data"},
+            {"line": 5, "error": "Note already exists"},
+            {"line": 6, "error": "Invalid data"},
+        ]
+    }
+
+
+def test_export_notes(client: TestClient, headers):
+    response = client.get('/me/notes:export', headers=headers)
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    titles = [note['title'] for note in exported]
+    assert {"Bulk 1", "Bulk 2", "Bulk 3"} <= set(titles)
+    assert exported[titles.index("Bulk 1")]['content'] == 'One'
+
+
+def test_export_notes_gzip(client: TestClient, headers):
+    headers = {**headers, "Accept-Encoding": "gzip"}
+    response = client.get('/me/notes:export', headers=headers)
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'content-length' not in response.headers
+    titles = [json.loads(line)['title'] for line in response.text.splitlines()]
+    assert {"Bulk 1", "Bulk 2", "Bulk 3"} <= set(titles)
+
+
+def test_compression_threshold(client: TestClient, headers):
+    headers = {**headers, "Accept-Encoding": "gzip"}
+    response = client.post('/me/notes',
+                           json={
+                               "title": "Large",
+                               "content": "lorem ipsum " * 500
+                           },
+                           headers=headers)
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['vary']
+    assert response.json()['content'] == "lorem ipsum " * 500
+    note_id = response.json()['id']
+
+    response = client.delete(f'/me/notes/{note_id}', headers=headers)
+    assert response.status_code == 200
+    assert 'content-encoding' not in response.headers
+
+
+def test_large_note_blob_storage(client: TestClient, headers,
+                                 session: Session):
+    body = "zebra crossing " * 400
+    first = client.post('/me/notes',
+                        json={"title": "Large 1", "content": body},
+                        headers=headers).json()
+    second = client.post('/me/notes',
+                         json={"title": "Large 2", "content": body},
+                         headers=headers).json()
+    assert first['content'] == body
+
+    stored = session.exec(
+        select(Note.content, Note.content_hash).where(
+            Note.id == UUID(first['id']))).one()
+    assert stored.content == ""
+    blob = session.exec(
+        select(NoteBlob).where(NoteBlob.hash == stored.content_hash)).one()
+    assert blob.size == len(body) and len(blob.data) < len(body) // 10
+
+    response = client.get(f"/me/notes/{first['id']}", headers=headers)
+    assert response.json()['content'] == body
+    response = client.get('/me/notes/search', params={"q": "zebra"},
+                          headers=headers)
+    assert {hit['title'] for hit in response.json()['results']} == {
+        "Large 1", "Large 2"}
+    response = client.get('/me/notes', params={"fields": "title,content"},
+                          headers=headers)
+    notes = {note['title']: note for note in response.json()['notes']}
+    assert notes["Large 2"]['content'] == body
+
+    # Both notes share one blob, which goes away with the last of them.
+    client.delete(f"/me/notes/{first['id']}", headers=headers)
+    assert session.get(NoteBlob, stored.content_hash) is not None
+    client.put(f"/me/notes/{second['id']}",
+               json={"title": "Large 2", "content": "now small"},
+               headers=headers)
+    session.expire_all()
+    assert session.get(NoteBlob, stored.content_hash) is None
+
+
+def test_patch_note(client: TestClient, headers):
+    note = client.post('/me/notes',
+                       json={"title": "Draft", "content": "Hello world"},
+                       headers=headers).json()
+    url = f"/me/notes/{note['id']}"
+    etag = client.get(url, headers=headers).headers['ETag']
+    edits = {"edits": [{"start": 6, "end": 11, "text": "there"},
+                       {"start": 0, "end": 0, "text": ">> "}]}
+
+    assert client.patch(url, json=edits, headers=headers).status_code == 428
+    response = client.patch(url, json=edits,
+                            headers={**headers, "If-Match": etag})
+    assert response.status_code == 200
+    assert response.json()['content'] == ">> Hello there"
+    assert response.json()['version'] == 2
+    assert response.headers['ETag'] == f'"{UUID(note["id"]).hex}-2"'
+
+    # The same base version cannot be applied twice.
+    response = client.patch(url, json=edits,
+                            headers={**headers, "If-Match": etag})
+    assert response.status_code == 412
+    etag = response.headers['ETag']
+
+    response = client.patch(url, json={"title": "Final"},
+                            headers={**headers, "If-Match": etag})
+    assert response.json()['title'] == "Final"
+    assert response.json()['content'] == ">> Hello there"
+    assert client.get(url, headers=headers).json()['title'] == "Final"
+    etag = response.headers['ETag']
+
+    for body in ({"edits": [{"start": 0, "end": 5, "text": ""},
+                            {"start": 3, "end": 6, "text": ""}]},
+                 {"edits": [{"start": 0, "end": 99, "text": ""}]},
+                 {"content": "x", "edits": []},
+                 {}):
+        response = client.patch(url, json=body,
+                                headers={**headers, "If-Match": etag})
+        assert response.status_code == 422
+
+
+def test_patch_large_note(client: TestClient, headers):
+    body = "paragraph of text. " * 400
+    note = client.post('/me/notes',
+                       json={"title": "Large draft", "content": body},
+                       headers=headers).json()
+    response = client.patch(
+        f"/me/notes/{note['id']}",
+        json={"edits": [{"start": len(body), "end": len(body),
+                         "text": "The end."}]},
+        headers={**headers, "If-Match": f'"{UUID(note["id"]).hex}-1"'})
+    assert response.status_code == 200
+    response = client.get(f"/me/notes/{note['id']}", headers=headers)
+    assert response.json()['content'] == body + "The end."
+
+
+def test_get_note_conditional(client: TestClient, headers):
+    response = client.post('/me/notes',
+                           json={
+                               "title": "Cached",
+                               "content": "Cache me"
+                           },
+                           headers=headers)
+    note_id = response.json()['id']
+    response = client.get(f'/me/notes/{note_id}', headers=headers)
+    etag = response.headers['ETag']
+    last_modified = response.headers['Last-Modified']
+    assert etag == f'"{UUID(note_id).hex}-1"'
+
+    response = client.get(f'/me/notes/{note_id}',
+                          headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    response = client.get(f'/me/notes/{note_id}',
+                          headers={**headers, "If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    # A date without a zone is taken as GMT rather than failing to compare.
+    response = client.get(f'/me/notes/{note_id}',
+                          headers={**headers,
+                                   "If-Modified-Since":
+                                   last_modified.removesuffix(" GMT")})
+    assert response.status_code == 304
+
+    client.put(f'/me/notes/{note_id}',
+               json={
+                   "title": "Cached",
+                   "content": "Changed"
+               },
+               headers=headers)
+    response = client.get(f'/me/notes/{note_id}',
+                          headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()['content'] == 'Changed'
+    assert response.headers['ETag'] == f'"{UUID(note_id).hex}-2"'
+
+
+def test_get_all_notes_conditional(client: TestClient, headers):
+    response = client.get('/me/notes', headers=headers)
+    etag = response.headers['ETag']
+    response = client.get('/me/notes',
+                          headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    response = client.get('/me/notes',
+                          params={"limit": 1},
+                          headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+
+    client.post('/me/notes',
+                json={
+                    "title": "Invalidates list",
+                    "content": "New"
+                },
+                headers=headers)
+    response = client.get('/me/notes',
+                          headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_note_changes_feed(client: TestClient, monkeypatch):
+    client.post("/users/register",
+                json={
+                    "username": "sync_user",
+                    "email": "sync_user@example.com",
+                    "password": "sync_password"
+                })
+    response = client.post("/users/login", auth=('sync_user', 'sync_password'))
+    headers = {"Authorization": response.headers['Authorization']}
+    ids = [
+        client.post('/me/notes',
+                    json={
+                        "title": f"Sync {index}",
+                        "content": "Body"
+                    },
+                    headers=headers).json()['id'] for index in range(2)
+    ]
+    response = client.get('/me/notes/changes', headers=headers)
+    data = response.json()
+    assert [(c['seq'], c['op'], c['note']['id']) for c in data['changes']] == [
+        (1, 'upsert', ids[0]), (2, 'upsert', ids[1])
+    ]
+    assert data['cursor'] == 2
+    assert data['has_more'] is False
+
+    client.put(f'/me/notes/{ids[0]}',
+               json={
+                   "title": "Sync 0",
+                   "content": "Edited"
+               },
+               headers=headers)
+    client.delete(f'/me/notes/{ids[1]}', headers=headers)
+    response = client.get('/me/notes/changes',
+                          params={"since": 2, "limit": 1},
+                          headers=headers)
+    data = response.json()
+    assert data['changes'][0]['op'] == 'upsert'
+    assert data['changes'][0]['note']['content'] == 'Edited'
+    assert data['has_more'] is True
+    response = client.get('/me/notes/changes',
+                          params={"since": data['cursor']},
+                          headers=headers)
+    data = response.json()
+    deleted_at = data['changes'][0].pop('deleted_at')
+    assert datetime.fromisoformat(deleted_at).tzinfo == timezone.utc
+    assert data['changes'] == [{'seq': 4, 'op': 'delete', 'id': ids[1]}]
+    assert data['cursor'] == 4
+    response = client.get('/me/notes/changes',
+                          params={"since": 10**20},
+                          headers=headers)
+    assert response.status_code == 422
+
+    # Tombstones past the retention window are purged on the next delete,
+    # and clients behind the purge horizon must resync.
+    monkeypatch.setattr(SETTINGS, "TOMBSTONE_RETENTION_DAYS", -1)
+    client.delete(f'/me/notes/{ids[0]}', headers=headers)
+    response = client.get('/me/notes/changes',
+                          params={"since": 2},
+                          headers=headers)
+    assert response.status_code == 410
+    response = client.get('/me/notes/changes', headers=headers)
+    assert response.json() == {"changes": [], "cursor": 5, "has_more": False}
+
+
+def test_batch_get_notes(client: TestClient, headers):
+    ids = [
+        client.post('/me/notes',
+                    json={
+                        "title": f"Batch get {index}",
+                        "content": f"Body {index}"
+                    },
+                    headers=headers).json()['id'] for index in range(2)
+    ]
+    response = client.post("/users/login",
+                           auth=('search_user', 'search_password'))
+    other_headers = {"Authorization": response.headers['Authorization']}
+    other_id = client.post('/me/notes',
+                           json={
+                               "title": "Not yours",
+                               "content": "Private"
+                           },
+                           headers=other_headers).json()['id']
+    missing = "00000000-0000-4000-8000-000000000000"
+
+    response = client.post('/me/notes:batchGet',
+                           params={"fields": "id,content"},
+                           json={"ids": [ids[1], other_id, ids[0], missing]},
+                           headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data['notes'] == [{"id": ids[1], "content": "Body 1"},
+                             {"id": ids[0], "content": "Body 0"}]
+    assert data['missing'] == [other_id, missing]
+    # Single reads are owner-scoped too, cached or not.
+    client.get(f'/me/notes/{other_id}', headers=other_headers)
+    assert client.get(f'/me/notes/{other_id}',
+                      headers=headers).status_code == 404
+    assert client.post('/me/notes:batchGet', json={"ids": []},
+                       headers=headers).status_code == 422
+
+
+def test_batch_write_notes(client: TestClient, headers):
+    kept = client.post('/me/notes',
+                       json={
+                           "title": "Batch kept",
+                           "content": "Original"
+                       },
+                       headers=headers).json()
+    removed = client.post('/me/notes',
+                          json={
+                              "title": "Batch removed",
+                              "content": "Gone soon"
+                          },
+                          headers=headers).json()
+    response = client.post('/me/notes:batch',
+                           json={
+                               "operations": [
+                                   {"op": "create", "title": "Batch new",
+                                    "content": "Fresh"},
+                                   {"op": "update", "id": kept['id'],
+                                    "title": "Batch kept", "content": "Edited",
+                                    "version": kept['version']},
+                                   {"op": "delete", "id": removed['id']},
+                               ]
+                           },
+                           headers=headers)
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert [result['op'] for result in results] == ["create", "update", "delete"]
+    assert results[0]['note']['content'] == 'Fresh'
+    assert results[1]['note']['version'] == kept['version'] + 1
+    assert results[2]['id'] == removed['id']
+    assert client.get(f"/me/notes/{kept['id']}",
+                      headers=headers).json()['content'] == 'Edited'
+
+    # A failing operation rolls the whole batch back.
+    response = client.post('/me/notes:batch',
+                           json={
+                               "operations": [
+                                   {"op": "create", "title": "Batch rolled back",
+                                    "content": "Never stored"},
+                                   {"op": "update", "id": kept['id'],
+                                    "title": "Batch kept", "content": "Stale",
+                                    "version": kept['version']},
+                               ]
+                           },
+                           headers=headers)
+    assert response.status_code == 412
+    assert response.json()['detail']['index'] == 1
+    response = client.get('/me/notes', params={"fields": "title"},
+                          headers=headers)
+    titles = {note['title'] for note in response.json()['notes']}
+    assert "Batch rolled back" not in titles and "Batch new" in titles
+    response = client.post('/me/notes:batch',
+                           json={"operations": [{"op": "delete",
+                                                 "id": removed['id']}]},
+                           headers=headers)
+    assert response.status_code == 404
+    assert response.json()['detail'] == {"index": 0, "detail": "Note not found"}
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src.config.cfg import SETTINGS
+from src.database.db import build_engine
+from src.main import app
+from src.utils.profiler import Profiler, ProfilerMiddleware, profiler
+
+
+def build_profiled_app(tmp_path, threshold_ms: float) -> tuple[FastAPI, Profiler]:
+    engine = build_engine(tmp_path / "profile.sqlite")
+    test_profiler = Profiler(sample_rate=1.0,
+                             threshold_ms=threshold_ms,
+                             interval_ms=1,
+                             size=2)
+    test_app = FastAPI()
+    test_app.add_middleware(ProfilerMiddleware, profiler=test_profiler)
+
+    @test_app.get("/slow")
+    async def slow_endpoint():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        await asyncio.sleep(0.02)
+        deadline = time.perf_counter() + 0.02
+        while time.perf_counter() < deadline:
+            pass
+        return {"ok": True}
+
+    return test_app, test_profiler
+
+
+def test_slow_request_is_captured(tmp_path):
+    test_app, test_profiler = build_profiled_app(tmp_path, threshold_ms=10)
+    client = TestClient(test_app)
+    for _ in range(3):
+        assert client.get("/slow").status_code == 200
+
+    # The ring buffer keeps the most recent captures only.
+    assert [capture.id for capture in test_profiler.captures] == [2, 3]
+    capture = test_profiler.get(3).to_dict()
+    assert capture["route"] == "/slow"
+    assert capture["status"] == 200
+    assert capture["duration_ms"] >= 40
+    assert [sql["statement"] for sql in capture["sql"]] == ["SELECT 1"]
+    assert any("slow_endpoint" in stack for stack in capture["samples"])
+    assert "slow_endpoint" in test_profiler.get(3).folded()
+
+
+def test_fast_request_is_not_kept(tmp_path):
+    test_app, test_profiler = build_profiled_app(tmp_path, threshold_ms=10_000)
+    assert TestClient(test_app).get("/slow").status_code == 200
+    assert not test_profiler.captures
+
+
+def test_admin_profiles_require_token(tmp_path, monkeypatch):
+    client = TestClient(app)
+    assert client.get("/admin/profiles").status_code == 403
+
+    test_app, test_profiler = build_profiled_app(tmp_path, threshold_ms=0)
+    TestClient(test_app).get("/slow")
+    monkeypatch.setattr(SETTINGS, "ADMIN_TOKEN", "admin-secret")
+    monkeypatch.setattr(profiler, "captures", test_profiler.captures)
+    headers = {"X-Admin-Token": "admin-secret"}
+    assert client.get("/admin/profiles",
+                      headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    response = client.get("/admin/profiles", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["profiles"][0]["route"] == "/slow"
+    response = client.get("/admin/profiles/1", headers=headers)
+    assert response.json()["sql"][0]["statement"] == "SELECT 1"
+    response = client.get("/admin/profiles/1/folded", headers=headers)
+    assert response.headers["content-type"].startswith("text/plain")
+    assert client.get("/admin/profiles/99", headers=headers).status_code == 404
@@ -0,0 +1,111 @@
+import asyncio
+import base64
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+
+from src.utils.auth import security
+from src.utils.ratelimit import Budget, MemoryBackend, RateLimitMiddleware, route_class
+
+
+def build_app(**options) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware,
+                       budgets={
+                           "auth": Budget(0.001, 2),
+                           "read": Budget(0.001, 3),
+                           "write": Budget(0.001, 1),
+                       },
+                       backend=MemoryBackend(100),
+                       **{"ip_factor": 10, "max_concurrent": 0, **options})
+
+    @app.post("/users/login")
+    def login():
+        return {}
+
+    @app.get("/me/notes")
+    async def list_notes():
+        await asyncio.sleep(0.05)
+        return {}
+
+    @app.post("/me/notes")
+    def create_note():
+        return {}
+
+    @app.get("/health")
+    def health():
+        return {}
+
+    return app
+
+
+def bearer(uid: str) -> dict:
+    return {"Authorization": f"Bearer {security.create_access_token(uid=uid)}"}
+
+
+def basic(username: str) -> dict:
+    token = base64.b64encode(f"{username}:password".encode()).decode()
+    return {"Authorization": f"Basic {token}"}
+
+
+def test_route_classes():
+    assert route_class("POST", "/users/login") == "auth"
+    assert route_class("GET", "/me/notes/1") == "read"
+    assert route_class("PATCH", "/me/notes/1") == "write"
+    assert route_class("GET", "/health") is None
+
+
+def test_user_buckets_per_route_class():
+    client = TestClient(build_app())
+    alice, bob = bearer("alice"), bearer("bob")
+    for _ in range(3):
+        assert client.get("/me/notes", headers=alice).status_code == 200
+    response = client.get("/me/notes", headers=alice)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    # Other users and other route classes have their own budgets.
+    assert client.get("/me/notes", headers=bob).status_code == 200
+    assert client.post("/me/notes", headers=alice).status_code == 200
+    assert client.post("/me/notes", headers=alice).status_code == 429
+    assert client.get("/health").status_code == 200
+
+
+def test_login_attempts_limited_per_username():
+    client = TestClient(build_app(trust_forwarded=True))
+    for _ in range(2):
+        assert client.post("/users/login", headers=basic("alice")).status_code == 200
+    assert client.post("/users/login", headers=basic("alice")).status_code == 429
+    assert client.post("/users/login", headers=basic("bob")).status_code == 200
+    # Attempts from one address do not lock the account out elsewhere.
+    response = client.post("/users/login",
+                           headers={**basic("alice"),
+                                    "X-Forwarded-For": "203.0.113.7"})
+    assert response.status_code == 200
+
+
+def test_ip_bucket_limits_anonymous_clients():
+    client = TestClient(build_app(ip_factor=1))
+    for _ in range(3):
+        client.get("/me/notes")
+    assert client.get("/me/notes").status_code == 429
+
+
+def test_invalid_token_falls_back_to_ip_bucket():
+    client = TestClient(build_app(ip_factor=1))
+    for _ in range(3):
+        client.get("/me/notes", headers={"Authorization": "Bearer forged"})
+    assert client.get("/me/notes", headers=bearer("carol")).status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_concurrency_quota():
+    app = build_app(max_concurrent=2)
+    headers = bearer("dave")
+    async with AsyncClient(transport=ASGITransport(app=app),
+                           base_url="http://test") as client:
+        responses = await asyncio.gather(
+            *(client.get("/me/notes", headers=headers) for _ in range(3)))
+    assert sorted(response.status_code for response in responses) == [
+        200, 200, 429]
@@ -0,0 +1,141 @@
+import random
+from uuid import UUID
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src.config.cfg import SETTINGS
+from src.database import db, shards
+from src.database.rebalance import plan_moves, rebalance
+from src.database.shards import HashRing, parse_shards
+from src.main import app
+
+
+def owners(count: int) -> list[UUID]:
+    rng = random.Random(0)
+    return [UUID(int=rng.getrandbits(128), version=4) for _ in range(count)]
+
+
+def test_ring_spreads_and_moves_few_owners():
+    ids = owners(4000)
+    ring = HashRing(["a", "b", "c", "d"], vnodes=64)
+    placed = [ring.shard_for(owner_id) for owner_id in ids]
+    for shard in ring.shards:
+        assert 0.15 < placed.count(shard) / len(ids) < 0.35
+    # String and UUID forms of an owner land on the same shard.
+    assert ring.shard_for(str(ids[0])) == placed[0]
+
+    grown = HashRing(["a", "b", "c", "d", "e"], vnodes=64)
+    moved = [(before, grown.shard_for(owner_id))
+             for owner_id, before in zip(ids, placed, strict=True)
+             if grown.shard_for(owner_id) != before]
+    assert all(after == "e" for _, after in moved)
+    assert 0.1 < len(moved) / len(ids) < 0.3
+
+
+def test_parse_shards():
+    assert parse_shards(" a=/tmp/a.sqlite, b=/tmp/b.sqlite,") == {
+        "a": "/tmp/a.sqlite",
+        "b": "/tmp/b.sqlite"
+    }
+    assert parse_shards("") == {}
+    with pytest.raises(ValueError):
+        parse_shards("/tmp/a.sqlite")
+
+
+def test_plan_moves(monkeypatch):
+    monkeypatch.setattr(SETTINGS, "DB_URL", "directory.sqlite")
+    ids = owners(100)
+    layout = {"a": "a.sqlite", "b": "b.sqlite"}
+    moves = plan_moves(ids, {}, layout, 64, 64)
+    assert len(moves) == 100
+    assert {move.source for move in moves} == {"directory.sqlite"}
+    assert {move.target for move in moves} == {"a.sqlite", "b.sqlite"}
+    assert plan_moves(ids, layout, layout, 64, 64) == []
+
+
+@pytest.fixture
+def configure(tmp_path, monkeypatch):
+    monkeypatch.setattr(SETTINGS, "DB_URL", str(tmp_path / "directory.sqlite"))
+    monkeypatch.setattr(db, "_engines", {})
+
+    def configure_shards(names: list[str]) -> dict[str, str]:
+        layout = {name: str(tmp_path / f"{name}.sqlite") for name in names}
+        monkeypatch.setattr(shards, "SHARDS", layout)
+        monkeypatch.setattr(
+            shards, "ring",
+            HashRing(layout, SETTINGS.DB_SHARD_VNODES) if layout else None)
+        db.create_db_and_tables()
+        return layout
+
+    yield configure_shards
+    for engine in db._engines.values():
+        if hasattr(engine, "sync_engine"):
+            engine.sync_engine.dispose()
+        else:
+            engine.dispose()
+
+
+def count(path: str, table: str) -> int:
+    with db.build_engine(path).connect() as connection:
+        return connection.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+
+def test_rebalance_moves_owner_to_its_shard(configure, monkeypatch):
+    monkeypatch.setattr(SETTINGS, "NOTE_BLOB_THRESHOLD", 64)
+    configure([])
+    with TestClient(app) as client:
+        client.post("/users/register",
+                    json={
+                        "username": "shard_user",
+                        "email": "shard_user@example.com",
+                        "password": "shard_password"
+                    })
+        response = client.post("/users/login",
+                               auth=("shard_user", "shard_password"))
+        headers = {"Authorization": response.headers["Authorization"]}
+        ids = [
+            client.post("/me/notes",
+                        json={"title": title, "content": content},
+                        headers=headers).json()["id"]
+            for title, content in (("Short", "Sharded body"),
+                                   ("Long", "sharded paragraph " * 10),
+                                   ("Gone", "Deleted body"))
+        ]
+        client.put(f"/me/notes/{ids[0]}/tags", json={"tags": ["moved"]},
+                   headers=headers)
+        client.delete(f"/me/notes/{ids[2]}", headers=headers)
+        cursor = client.get("/me/notes/changes",
+                            headers=headers).json()["cursor"]
+
+        layout = configure(["a", "b"])
+        moves = rebalance({}, SETTINGS.DB_SHARD_VNODES)
+        assert len(moves) == 1
+        target = moves[0].target
+        assert target == layout[shards.shard_for(moves[0].owner_id)]
+        assert count(SETTINGS.DB_URL, "notemodel") == 0
+        assert count(SETTINGS.DB_URL, "noteblobmodel") == 0
+        assert count(SETTINGS.DB_URL, "usermodel") == 1
+        assert count(target, "notemodel") == 2
+        assert count(target, "noteblobmodel") == 1
+        other = next(path for path in layout.values() if path != target)
+        assert count(other, "notemodel") == 0
+
+        # The app now serves the owner from the shard.
+        response = client.get("/me/notes", headers=headers)
+        assert response.json()["message"] == "All notes from shard_user"
+        assert {note["id"] for note in response.json()["notes"]} == set(ids[:2])
+        response = client.get("/me/notes/search", params={"q": "paragraph"},
+                              headers=headers)
+        assert [hit["id"] for hit in response.json()["results"]] == [ids[1]]
+        response = client.get("/me/tags", headers=headers)
+        assert response.json()["tags"] == [{"name": "moved", "note_count": 1}]
+        changes = client.get("/me/notes/changes", params={"since": cursor},
+                             headers=headers).json()["changes"]
+        assert {change["note"]["id"] for change in changes} == set(ids[:2])
+        response = client.post("/me/notes",
+                               json={"title": "After", "content": "New"},
+                               headers=headers)
+        assert response.status_code == 200
+        assert count(target, "notemodel") == 3
@@ -0,0 +1,83 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session
+
+
+def create_note(client: TestClient, headers: dict, title: str) -> str:
+    response = client.post("/me/notes",
+                           json={"title": title, "content": "Tagged body"},
+                           headers=headers)
+    return response.json()["id"]
+
+
+def tag_counts(client: TestClient, headers: dict) -> dict:
+    response = client.get("/me/tags", headers=headers)
+    return {tag["name"]: tag["note_count"] for tag in response.json()["tags"]}
+
+
+def test_note_tags_and_counts(client: TestClient, headers):
+    first = create_note(client, headers, "First")
+    second = create_note(client, headers, "Second")
+
+    response = client.put(f"/me/notes/{first}/tags",
+                          json={"tags": ["work", " ideas ", "work"]},
+                          headers=headers)
+    assert response.status_code == 200
+    assert response.json()["tags"] == ["ideas", "work"]
+    client.put(f"/me/notes/{second}/tags", json={"tags": ["work"]},
+               headers=headers)
+    assert tag_counts(client, headers) == {"ideas": 1, "work": 2}
+
+    response = client.get(f"/me/notes/{first}/tags", headers=headers)
+    assert response.json()["tags"] == ["ideas", "work"]
+    client.put(f"/me/notes/{first}/tags", json={"tags": ["ideas"]},
+               headers=headers)
+    assert tag_counts(client, headers) == {"ideas": 1, "work": 1}
+
+    client.delete(f"/me/notes/{second}", headers=headers)
+    assert tag_counts(client, headers) == {"ideas": 1, "work": 0}
+    assert client.delete("/me/tags/ideas", headers=headers).status_code == 200
+    assert tag_counts(client, headers) == {"work": 0}
+    assert client.delete("/me/tags/ideas", headers=headers).status_code == 404
+
+
+def test_filter_notes_by_tag(client: TestClient, headers):
+    tagged = create_note(client, headers, "Tagged")
+    create_note(client, headers, "Untagged")
+    response = client.get("/me/notes", params={"tag": "reading"},
+                          headers=headers)
+    assert response.json()["notes"] == []
+    etag = response.headers["ETag"]
+
+    client.put(f"/me/notes/{tagged}/tags", json={"tags": ["reading"]},
+               headers=headers)
+    # Tagging advances the change sequence, so the filtered list is fresh.
+    response = client.get("/me/notes",
+                          params={"tag": "reading"},
+                          headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert [note["id"] for note in response.json()["notes"]] == [tagged]
+
+
+def test_tag_errors(client: TestClient, headers):
+    note_id = create_note(client, headers, "Errors")
+    response = client.put(f"/me/notes/{note_id}/tags", json={"tags": [" "]},
+                          headers=headers)
+    assert response.status_code == 422
+    missing = "00000000-0000-4000-8000-000000000000"
+    response = client.put(f"/me/notes/{missing}/tags", json={"tags": ["x"]},
+                          headers=headers)
+    assert response.status_code == 404
+    assert client.get(f"/me/notes/{missing}/tags",
+                      headers=headers).status_code == 404
+
+
+def test_tag_filter_uses_covering_index(session: Session):
+    plan = session.exec(text(
+        "EXPLAIN QUERY PLAN SELECT note_id FROM notetagmodel "
+        "JOIN tagmodel ON tagmodel.id = notetagmodel.tag_id "
+        "WHERE tagmodel.owner_id = :owner AND tagmodel.name = :name"),
+        params={"owner": "0" * 32, "name": "work"}).all()
+    details = " ".join(row.detail for row in plan)
+    assert "ux_tagmodel_owner_id_name" in details
+    assert "COVERING INDEX ix_notetagmodel_tag_id_note_id" in details
@@ -1,31 +1,19 @@
-
 from uuid import UUID
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session, SQLModel, StaticPool, create_engine
-
-from src.database.db import get_session
-from src.main import app
-from src.utils.security_utils import check_password
-
+from sqlmodel import select
 
-@pytest.fixture(name="session")
-def session_fixture():
-    engine = create_engine("sqlite:///testing.sqlite",
-                           connect_args={"check_same_thread": False},
-                           poolclass=StaticPool)
-    SQLModel.metadata.create_all(engine)
-    with Session(engine) as session:
-        yield session
+from src.config.cfg import SETTINGS
+from src.models.user import UserModel as User
+from src.utils.security_utils import check_password, hashing_pool
+from tests.conftest import create_test_engine
 
 
-@pytest.fixture(name="client")
-def client_fixture(session: Session):
-    app.dependency_overrides[get_session] = lambda: session
-    client = TestClient(app)
-    yield client
-    app.dependency_overrides.clear()
+@pytest.fixture(name="engine", scope="module")
+def engine_fixture(tmp_path_factory):
+    # Registration and login run in order against the same users.
+    return create_test_engine(tmp_path_factory.mktemp("users") / "users.sqlite")
 
 
 @pytest.mark.asyncio
@@ -82,3 +70,23 @@ async def test_logout(client: TestClient):
     assert response.status_code == 200
     assert 'Authorization' not in response.headers
     assert response.content.decode('utf-8') == 'Logout successful'
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_outdated_cost(client: TestClient, session,
+                                            monkeypatch):
+    monkeypatch.setattr(SETTINGS, "BCRYPT_ROUNDS", 4)
+    response = client.post("/users/login", auth=('test_user', 'test_password'))
+    assert response.status_code == 200
+    user = session.exec(select(User).where(User.username == 'test_user')).one()
+    session.refresh(user)
+    assert user.password.startswith('$2b$04$')
+    assert check_password('test_password', user.password) is True
+
+
+@pytest.mark.asyncio
+async def test_login_hashing_pool_full(client: TestClient, monkeypatch):
+    monkeypatch.setattr(hashing_pool, "max_pending", 0)
+    response = client.post("/users/login", auth=('test_user', 'test_password'))
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'